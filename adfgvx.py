@@ -1,17 +1,26 @@
+import operator
+import permutation
+
 from ciphers import Cipher
 
 CODE = "ADFGVX"
+# In this cipher, numerals are inserted after the first ten letters.
+NUM_DICT = {
+    "A": "1", "B": "2", "C": "3", "D": "4", "E": "5", "F": "6", "G": "7",
+    "H": "8", "I": "9", "J": "0"}
 
 
 class Adfgvx(Cipher):
     
     """This class implements the ADFGVX Cipher."""
     
-    def __init__(self, mode, text):
+    def __init__(self, mode, text, options=None):
         """At initialization, the mode of the object is set and the
-        appropriate attribute is set to the original text.
+        appropriate attribute is set to the original text.  If options
+        are given, the cipher runs headless (see Cipher).
         """
         self.mode = mode
+        self.options = options
         self.name = "ADFGVX"
         self.code_dict = {}
         self.keyword = ""
@@ -41,10 +50,11 @@ class Adfgvx(Cipher):
         # Get the keyword for the cipher.
         self.keyword = self._get_keyword(
             "Please enter the keyword or phrase that was used to encrypt " +
-            "this message:  ")
+            "this message:  ", option="keyword")
         # Get a permutation key.
         self.perm_key = self._get_keyword(
-            "This cipher also requires a permutation keyword:  ")
+            "This cipher also requires a permutation keyword:  ",
+            option="perm_key")
         # Before doing anything with the ciphertext, strip it of any
         #  spaces (if entered in five-character blocks) and turn it into
         #  all upper-case.
@@ -54,48 +64,21 @@ class Adfgvx(Cipher):
         invalid_msg = self._validate()
         if invalid_msg:
             # If the ciphertext is not valid, inform the user and abort.
-            print(invalid_msg)
-            self.plaintext = ""
+            self._abort(invalid_msg)
             return
         # end if (function exits)
-        # Sort the letters of the permutation key into alphabetical
-        #  order.
-        perm_key_list = list(self.perm_key)
-        for x in range(len(perm_key_list)):
-            perm_key_list[x] += str(x).zfill(2)
-        # end for
-        perm_key_list.sort()
-        # Slice the ciphertext into columns (lists).
-        col_length = len(self.ciphertext) // len(self.perm_key)
-        working_list = ["" for letter in self.perm_key]
-        index = 0
-        for pos in range(0, len(self.ciphertext), col_length):
-            working_list[index] = self.ciphertext[pos:pos + col_length]
-            index += 1
-        # Rearrange the columns (lists) back into their correct order.
-        correct_order_list = ["" for letter in self.perm_key]
-        for x, pos in enumerate(perm_key_list):
-            correct_order_list[int(pos[1:])] = str(working_list[x])
-        # end for
-        # Take each row to form a single string.
-        working_string = ""
-        for col in range(col_length):
-            for row in range(len(correct_order_list)):
-                working_string += correct_order_list[row][col]
-            # end for
-        # end for
-        # Strip off any trailing nulls.
-        while working_string[-1] == "V":
-            working_string = working_string[: -1]
-        # end while
+        # Put the columns back in their original order (the last row
+        #  may be short), and read the bigrams off row by row.
+        working_string = permutation.apply(
+            self.ciphertext, permutation.columnar(
+                len(self.ciphertext), len(self.perm_key), self.perm_key,
+                inverse=True))
         # Build the code dictionary.
         self._build_code_dict()
-        # Go through the encrypted text two characters at a time.
-        for pos in range(0, len(working_string), 2):
-            # Turn each bigram back into a letter.
-            bigram = working_string[pos:pos + 2]
-            self.plaintext += (self.code_dict[bigram])
-        # end for
+        # Turn each bigram back into a letter.
+        self.plaintext = "".join(map(
+            self.code_dict.__getitem__,
+            map(operator.add, working_string[0::2], working_string[1::2])))
         # Allow the user to enter a one-time pad code, if one was used
         #  to encrpyt the message.
         self._one_time_pad()
@@ -113,11 +96,12 @@ class Adfgvx(Cipher):
         # Get the keyword for the cipher.
         self.keyword = self._get_keyword(
             "Please enter a keyword or phrase (no spaces) for " +
-            "your text.\nAvoid words with repeating letters:  ")
+            "your text.\nAvoid words with repeating letters:  ",
+            option="keyword")
         # Get a permutation key.
         self.perm_key = self._get_keyword(
             "This cipher also requires a permutation " +
-            "keyword:  ")
+            "keyword:  ", option="perm_key")
         # Present the option to perform intelligent encryption.
         self._intelligent_encrypt()
         # Format the plaintext for processing.
@@ -127,42 +111,16 @@ class Adfgvx(Cipher):
         # Build the code dictionary.
         self._build_code_dict()
         # Convert the plaintext into bigrams.
-        working_string = ""
-        for letter in self.plaintext:
-            working_string += (self.code_dict[letter])
-        # end for
-        # Pad with nulls if needed to make columns equal length.
-        if len(working_string) % len(self.perm_key) > 0:
-            # Calculate the number of nulls needed.
-            nulls = (len(self.perm_key) -
-                     (len(working_string) % len(self.perm_key)))
-            # For simplicity's sake this function pads the matrix with
-            #  V characters.
-            for _ in range(nulls):
-                working_string += "V"
-            # end for
-        # end if
-        # Sort the working string into columns (lists).
-        working_list = ["" for letter in self.perm_key]
-        index = 0
-        for letter in working_string:
-            working_list[index] += letter
-            index += 1
-            if index == len(self.perm_key):
-                index = 0
-            # end if
-        # end for
-        # Sort the letters of the permutation key into alphabetical
-        #  order.
-        perm_key_list = list(self.perm_key)
-        for x in range(len(perm_key_list)):
-            perm_key_list[x] += str(x).zfill(2)
-        # end for
-        perm_key_list.sort()
-        # Merge the rearranged columns (lists) into the ciphertext.
-        for item in perm_key_list:
-            self.ciphertext += working_list[int(item[1:])]
-        # end for
+        working_string = "".join(map(self.code_dict.__getitem__,
+                                     self.plaintext))
+        # Write the working string into rows as long as the permutation
+        #  key, and read the columns off in the alphabetical order of
+        #  the key's letters.  The last row is left short rather than
+        #  padded with nulls, which could not be told apart from
+        #  bigrams ending in the same letter.
+        self.ciphertext = permutation.apply(
+            working_string, permutation.columnar(
+                len(working_string), len(self.perm_key), self.perm_key))
         # Finally, separate into five-character blocks if the user
         #  chooses.
         self._block_output()
@@ -170,40 +128,46 @@ class Adfgvx(Cipher):
     # end method
     
     def _build_code_dict(self):
-        """Builds the dictionary for encoding/decoding letters.
+        """Builds the dictionary for encoding/decoding letters, from
+        the key schedule.
         
         Arguments:  none.
         
         Returns:  nothing.
         """
-        # Build an initial alphabet from the keyword.  Do not include
-        # numbers at the end.
-        code_alphabet = self._alphabet_from_keyword(self.keyword)
-        # In this cipher, numerals are inserted after the first ten
-        #  letters.
-        num_dict = {
-            "A": "1", "B": "2", "C": "3", "D": "4", "E": "5", "F": "6",
-            "G": "7", "H": "8", "I": "9", "J": "0"}
-        # Break the code alphabet apart and insert the numerals.
-        alpha_list = list(code_alphabet)
-        for x, letter in enumerate(alpha_list):
-            if letter in num_dict:
-                alpha_list.insert(x + 1, num_dict[letter])
-        # end for
-        # Create the bi-gram equivalents for each letter/number.
-        for row in CODE:
-            for col in CODE:
-                if self.mode == "Encrypt":
-                    # For encryption, letters as keys.
-                    self.code_dict[alpha_list.pop(0)] = row + col
-                else:
-                    # For decryption, bigrams as keys.
-                    self.code_dict[row + col] = alpha_list.pop(0)
-            # end for
-        # end for
+        schedule = self._key_schedule(self.keyword)
+        if self.mode == "Encrypt":
+            # For encryption, letters as keys.
+            self.code_dict = dict(schedule.encode)
+        else:
+            # For decryption, bigrams as keys.
+            self.code_dict = dict(schedule.decode)
+        # end if
         return
     # end method
     
+    @classmethod
+    def _build_schedule(cls, keyword):
+        """Builds the code alphabet from the keyword, and pairs each of
+        its characters with a bigram.
+        
+        Arguments:
+        - keyword -- the keyword for the cipher.
+        
+        Returns:  the code alphabet, and tuples of (character, bigram)
+         and (bigram, character) pairs.
+        """
+        # Build an initial alphabet from the keyword (without numbers),
+        #  then insert the numerals after the first ten letters.
+        code_alphabet = "".join(
+            letter + NUM_DICT.get(letter, "")
+            for letter in cls._alphabet_from_keyword(keyword))
+        # Create the bi-gram equivalents for each letter/number.
+        bigrams = [row + col for row in CODE for col in CODE]
+        return (code_alphabet, tuple(zip(code_alphabet, bigrams)),
+                tuple(zip(bigrams, code_alphabet)))
+    # end method
+    
     def _validate(self):
         """Checks encrypted data to ensure that it contains only valid
         characters, and is a valid length.
@@ -213,19 +177,15 @@ class Adfgvx(Cipher):
         Returns:  True if the data is valid; False otherwise.
         """
         msg = ""
-        # The length of the ciphertext must be a multiple of the length
-        #  of the permutation key (the encryption method makes it so).
-        #  If it is not, either the ciphertext or the permutation key is
-        #  incorrect.
-        if len(self.ciphertext) % len(self.perm_key) > 0:
+        # The ciphertext is made of whole bigrams, so its length must
+        #  be even.
+        if len(self.ciphertext) % 2 > 0:
             return "The encrypted text is incompatible with the specified key."
-        # Loop through each character in the ciphertext to make sure
-        #  that only the characters in the ADFGVX cipher are present.
-        for char in self.ciphertext:
-            if not (char.upper() in CODE):
-                return "The encrypted text contains invalid characters."
-            # end if (function exits)
-        # end for
+        # Make sure that only the characters in the ADFGVX cipher are
+        #  present.
+        if not set(self.ciphertext.upper()) <= set(CODE):
+            return "The encrypted text contains invalid characters."
+        # end if (function exits)
         # If none of the characters failed, return True.
         return msg
     # end method
@@ -1,19 +1,32 @@
+import re
+
+import tables
+
 from ciphers import Cipher
 
 ALPHANUM = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+# The first key must be coprime with 36, or the cipher cannot be
+#  reversed.
+KEY1_LIST = [5, 7, 11, 13, 17, 19, 23, 25, 29, 31, 35]
+NOT_ALPHANUM = re.compile("[^" + ALPHANUM + "]+")
 
 
 class Affine(Cipher):
     
     """This class implements the Affine Cipher"""
     
-    def __init__(self, mode, text):
+    # Each character is substituted on its own.
+    block_length = 1
+    
+    def __init__(self, mode, text, options=None):
         """At initialization, the mode of the object is set and the
-        appropriate attribute is set to the original text.
+        appropriate attribute is set to the original text.  If options
+        are given, the cipher runs headless (see Cipher).
         """
         self.mode = mode
+        self.options = options
         self.name = "Affine"
-        self.code_dict = {}
+        self.table = None
         self.key1 = 0
         self.key2 = 0
         if mode == "Encrypt":
@@ -37,25 +50,17 @@ class Affine(Cipher):
         
         Returns:  nothing.
         """
-        # Get the keynumbers from the user.
-        self.key1 = self._get_keynumber(
-            "Please enter the first number that was used to encrypt " +
-            "this message:  ")
-        # Get a permutation key.
-        self.key2 = self._get_keynumber(
-            "Please enter the second number for this message:  ")
+        # Get the keynumbers from the user, and build the code
+        #  dictionary.
+        self._get_keys()
         # Before doing anything with the ciphertext, strip it of any
         #  spaces (if entered in five-character blocks) and turn it into
         #  all upper-case.
         self._block_input()
         # Then validate the encrypted data.
         self._validate()
-        # Build the code dictionary.
-        self._build_code_dict()
         # Convert the ciphertext into plaintext.
-        for char in self.ciphertext:
-            self.plaintext += self.code_dict[char]
-        # end for
+        self.plaintext = self._decrypt_text(self.ciphertext)
         # Allow for one-time pad use.
         self._one_time_pad()
         self._intelligent_decrypt()
@@ -69,52 +74,100 @@ class Affine(Cipher):
         
         Returns:  nothing.
         """
-        # Get the keynumbers for the cipher.
-        self.key1 = self._get_keynumber(
-            "Please enter the first key number for this cipher.  This key\n" +
-            " must be one of the following: 5, 7, 11, 13, 17, 19, 23, 25,\n" +
-            "29, 31, or 35. >>")
-        self.key2 = self._get_keynumber(
-            "Please enter the second key number for this cipher.  This key\n" +
-            " can be any number.  >>")
+        # Get the keynumbers for the cipher, and build the code
+        #  dictionary.
+        self._get_keys()
         # Present the option to perform intelligent encryption.
         self._intelligent_encrypt()
         # Format the plaintext for processing.
         self._format_plaintext()
         # Present the option to use a one-time pad.
         self._one_time_pad()
-        # Build the code dictionary.
-        self._build_code_dict()
         # Convert the plaintext to ciphertext.
-        for char in self.plaintext:
-            self.ciphertext += self.code_dict[char]
-        # end for
+        self.ciphertext = self._encrypt_text(self.plaintext)
         # Finally, separate into five-character blocks if the user
         #  chooses.
         self._block_output()
         return
     # end method
     
-    def _build_code_dict(self):
-        """Builds the dictionary for encoding/decoding letters.
+    @classmethod
+    def _build_schedule(cls, key1, key2):
+        """Builds the code alphabet (the character each character of
+        the alphabet is encrypted to) from the keynumbers, and the
+        translation tables to and from it.
+        
+        Arguments:
+        - key1 -- the first keynumber.
+        - key2 -- the second keynumber.
+        
+        Returns:  the code alphabet and the two tables.
+        """
+        # Cycle through the alphanumeric string.
+        code_alphabet = "".join(
+            ALPHANUM[((key1 * plain) + key2) % 36]
+            for plain in range(len(ALPHANUM)))
+        return (code_alphabet,
+                tables.substitution_table(ALPHANUM, code_alphabet),
+                tables.substitution_table(code_alphabet, ALPHANUM))
+    # end method
+    
+    def _decrypt_text(self, text):
+        """Decrypts a string using the translation table.
+        
+        Arguments:
+        - text -- the string to decrypt.
+        
+        Returns:  the decrypted string.
+        """
+        return tables.translate(text, self.table)
+    # end method
+    
+    def _encrypt_text(self, text):
+        """Encrypts a string using the translation table.
+        
+        Arguments:
+        - text -- the string to encrypt.
+        
+        Returns:  the encrypted string.
+        """
+        return tables.translate(text, self.table)
+    # end method
+    
+    def _get_keys(self):
+        """Gets the keynumbers for the cipher, and the translation table
+        for the mode from its key schedule.
         
         Arguments:  none.
         
         Returns:  nothing.
         """
-        # Cycle through the alphanumeric string.
-        for plain, char in enumerate(ALPHANUM):
-            crypt = ((self.key1 * plain) + self.key2) % 36
-            if self.mode == "Encrypt":
-                # For encryption, keys are plaintext.
-                self.code_dict[char] = ALPHANUM[crypt]
-            else:
-                # For decryption, keys are ciphertext.
-                self.code_dict[ALPHANUM[crypt]] = char
-            # end if
-        # end for
+        if self.mode == "Encrypt":
+            self.key1 = self._get_keynumber(
+                "Please enter the first key number for this cipher.  This " +
+                "key\n must be one of the following: 5, 7, 11, 13, 17, 19, " +
+                "23, 25,\n29, 31, or 35. >>", keylist=KEY1_LIST,
+                option="key1")
+            self.key2 = self._get_keynumber(
+                "Please enter the second key number for this cipher.  This " +
+                "key\n can be any number.  >>", option="key2")
+        else:
+            self.key1 = self._get_keynumber(
+                "Please enter the first number that was used to encrypt " +
+                "this message:  ", keylist=KEY1_LIST, option="key1")
+            # Get a permutation key.
+            self.key2 = self._get_keynumber(
+                "Please enter the second number for this message:  ",
+                option="key2")
+        # end if
+        schedule = self._key_schedule(self.key1, self.key2)
+        if self.mode == "Encrypt":
+            self.table = schedule.encode
+        else:
+            self.table = schedule.decode
+        # end if
         return
-    #end method
+    # end method
     
     def _validate(self):
         """The validate method for this cipher just strips any non-
@@ -125,14 +178,7 @@ class Affine(Cipher):
         
         Returns:  nothing.
         """
-        # Cycle through the ciphertext, discarding any non-alphanumeric
-        #  characters.
-        new_string = ""
-        for char in self.ciphertext:
-            if char in ALPHANUM:
-                new_string += char
-            # end if
-        # end for
-        self.ciphertext = new_string
+        # Discard any non-alphanumeric characters.
+        self.ciphertext = NOT_ALPHANUM.sub("", self.ciphertext)
         return
     # end method
@@ -1,4 +1,5 @@
 import random
+import re
 
 from ciphers import Cipher
 
@@ -10,17 +11,56 @@ CHAR_MAP = {"H": "I", "J": "G", "K": "C", "U": "V", "W": "X", "Y": "Z",
 CHAR_MAP_REV = {"I": "H", "G": "J", "C": "K", "V": "U", "X": "W", "Z": "Y",
                 "O": "0", "F": "4", "S": "5", "B": "6", "A": "7", "M": "8",
                 "R": "9"}
+# The numeral 4 is the escape character:  each letter and number missing
+#  from the stabilis alphabet is encoded as 4 and a letter (see
+#  CHAR_MAP).  ESCAPE_TABLE does so in one pass; UNESCAPE maps what
+#  follows each escape character back (nothing, after a run of escape
+#  characters or at the end of the text).
+ESCAPE = "4"
+ESCAPE_TABLE = str.maketrans(
+    {char: ESCAPE + mapped for char, mapped in CHAR_MAP.items()})
+UNESCAPE = {**CHAR_MAP_REV, "": ""}
+# Each key letter (a capital letter in the ciphertext) sets the offset
+#  of the mobilis alphabet until the next one, so each has its own pair
+#  of translation tables.  Only the letters of the stabilis alphabet
+#  are chosen as keys.
+KEY_LETTERS = STABILIS[:20]
+ENCRYPT_TABLES = [
+    str.maketrans(STABILIS, MOBILIS[key:] + MOBILIS[:key])
+    for key in range(len(STABILIS))]
+DECRYPT_TABLES = {
+    STABILIS[key]: str.maketrans(MOBILIS[key:] + MOBILIS[:key], STABILIS)
+    for key in range(len(STABILIS))}
+# Matches a key letter (any capital letter; only those in DECRYPT_TABLES
+#  are valid), capturing it so that the ciphertext can be split into
+#  alternating key letters and the segments they encrypt.
+KEY_PATTERN = re.compile("([A-Z])")
+NOT_CIPHER = re.compile(
+    "[^" + re.escape(MOBILIS + MOBILIS.upper()) + "]+")
 
 
 class Alberti(Cipher):
     
-    """This class implements the Alberti Cipher"""
+    """This class implements the Alberti Cipher.
     
-    def __init__(self, mode, text):
+    The ciphertext is made of segments, each starting with a key letter
+    (in upper-case) that sets the offset of the cipher for the rest of
+    the segment.  Each segment can therefore be decrypted on its own,
+    with the translation table for its key letter, and a long
+    ciphertext can be split between segments and decrypted on several
+    processes at once (see parallel).
+    """
+    
+    # The ciphertext can be split at its key letters.
+    segmented = True
+    
+    def __init__(self, mode, text, options=None):
         """At initialization, the mode of the object is set and the
-        appropriate attribute is set to the original text.
+        appropriate attribute is set to the original text.  If options
+        are given, the cipher runs headless (see Cipher).
         """
         self.mode = mode
+        self.options = options
         self.name = "Alberti"
         if mode == "Encrypt":
             self.plaintext = text
@@ -43,32 +83,21 @@ class Alberti(Cipher):
         Returns:  nothing.
         """
         # First get the index letter for the cipher.
-        # Need to pass an upper-case version of the mobilis alphabet
-        #  because _get_keyword expects keywords to be upper-case.
-        index_letter = self._get_keyword(
-            "Please enter the index letter that was used to encrypt this\n" +
-            "cipher.  The index letter can be:  a, b, c, d, e, f, g, h, i,\n" +
-            "k, l, m, n, o, p, q, r, s, t, v, x, y, z, or &:  ",
-            keylist=MOBILIS.upper(), max_length=1)
-        # Now set the index, which is the offset for the cipher.
-        self.index = MOBILIS.find(index_letter.lower())
+        self._get_keys()
         # Before doing anything with the ciphertext, strip it of any
         #  spaces (if entered in five-character blocks).
         self._block_input()
-        # Cycle through the ciphertext, converting into plaintext.
-        for char in self.ciphertext:
-            # The & will pass this test for capital letters, so exclude
-            #  it.
-            if (char != "&") and (char.upper() == char):
-                # If a capital letter, set a new key.
-                key = STABILIS.index(char)
-            else:
-                self.plaintext += STABILIS[(MOBILIS.index(char) - key) % 24]
-            # end if
-        # end for
-        # Now the plaintext needs to be reprocessed to decode excluded
-        #  letters and numbers.
-        self.__postprocess()
+        # Decrypt each segment with the table for its key letter, then
+        #  decode excluded letters and numbers.
+        text = self._decrypt_text(self.ciphertext)
+        if text is not None:
+            text = self._decrypt_final(text)
+        # end if
+        if text is None:
+            # The text was invalid (and the user has been told).
+            return
+        # end if (method exits)
+        self.plaintext = text
         # Allow the user to ender a one-time pad code, if one was used.
         self._one_time_pad()
         # Call _intelligent_decrypt
@@ -84,15 +113,7 @@ class Alberti(Cipher):
         Returns:  nothing.
         """
         # First get the index letter for the cipher.
-        # Need to pass an upper-case version of the mobilis alphabet
-        #  because _get_keyword expects keywords to be upper-case.
-        index_letter = self._get_keyword(
-            "Please enter the index letter for this cipher.  The index\n" +
-            "letter can be:  a, b, c, d, e, f, g, h, i, k, l, m, n, o,\n" +
-            "p, q, r, s, t, v, x, y, z, or &:  ", keylist=MOBILIS.upper(),
-            max_length=1)
-        # Now set the index, which is the offset for the cipher.
-        self.index = MOBILIS.find(index_letter.lower())
+        self._get_keys()
         # Present the option to perform intelligent encryption.
         self._intelligent_encrypt()
         # Format the plaintext for processing.
@@ -102,27 +123,10 @@ class Alberti(Cipher):
         # Because the Alberti Cipher does not include all letters and
         #  numbers, special processing has to be done to convert any
         #  excluded  characters.
-        self.__preprocess()
+        self.plaintext = self.__preprocess(self.plaintext)
         # Now that all letters and numbers are accounted for, encryption
         #  can begin.
-        # First pick a random letter (NOT number) as the first key.
-        key = random.randint(0, 19)
-        self.ciphertext += STABILIS[key]
-        # Set a counter to change the key letter.
-        counter = random.randint(10, 20)
-        # Cycle through the plaintext, converting to ciphertext.
-        for char in self.plaintext:
-            # Find the corresponding cipher character and append it to
-            #  the cipher text.
-            self.ciphertext += MOBILIS[(STABILIS.index(char) + key) % 24]
-            counter -= 1
-            if counter == 0:
-                # Get a new key and reset the counter.
-                key = random.randint(0, 19)
-                self.ciphertext += STABILIS[key]
-                counter = random.randint(10, 20)
-            # end if
-        # end for
+        self.ciphertext = self._encrypt_text(self.plaintext)
         # Finally, separate into five-character blocks if the user
         #  chooses.
         self._block_output()
@@ -140,75 +144,188 @@ class Alberti(Cipher):
         
         Returns:  nothing.
         """
-        new_text = ""
-        for char in self.ciphertext:
-            # Discard any space and any noncipher characters.
-            if (char.upper() in MOBILIS.upper()):
-                new_text += char
-            # end if
-        # end for
-        self.ciphertext = new_text
-        # end if
+        self.ciphertext = self._strip_ciphertext(self.ciphertext)
         return
-        # end function
+    # end function
     
-    def __postprocess(self):
-        """This is the counterpart to __preprocess.  If scans the
-        decrypted text for escape characters and numbers and converts
-        them back into their original forms.
+    def _decrypt_final(self, text):
+        """Internal method that decodes excluded letters and numbers in
+        the decrypted text (see __postprocess).
+        
+        Arguments:
+        - text -- the decrypted text (the whole message).
+        
+        Returns:  the decoded text, or None if it is invalid.
+        """
+        return self.__postprocess(text)
+    # end method
+    
+    def _decrypt_text(self, text):
+        """Internal method that decrypts ciphertext, a segment at a
+        time, each with the table for its key letter.
+        
+        Arguments:
+        - text -- the ciphertext, which must start with a key letter.
+        
+        Returns:  the decrypted text, or None if the ciphertext is
+         invalid.
+        """
+        # Split the text into the text before the first key letter (at
+        #  index 0, which must be empty), and the key letters (at odd
+        #  indices) each followed by its segment.
+        parts = KEY_PATTERN.split(text)
+        if parts[0]:
+            self._abort(
+                "The encrypted text does not start with a key letter.")
+            return None
+        # end if (method exits)
+        try:
+            tables = [DECRYPT_TABLES[key] for key in parts[1::2]]
+        except KeyError:
+            self._abort("The encrypted text includes an invalid key letter.")
+            return None
+        # end try (method exits)
+        return "".join(map(str.translate, parts[2::2], tables))
+    # end method
+    
+    def _encrypt_text(self, text):
+        """Internal method that encrypts text (already preprocessed),
+        changing the key at random every 10 to 20 characters.  Each key
+        letter is written into the ciphertext before the segment it
+        encrypts.
+        
+        Arguments:
+        - text -- the text.
+        
+        Returns:  the ciphertext.
+        """
+        ciphertext = []
+        # First pick a random letter (NOT number) as the first key, and
+        #  the number of characters before the next.
+        key = random.randint(0, 19)
+        ciphertext.append(KEY_LETTERS[key])
+        counter = random.randint(10, 20)
+        pos = 0
+        while len(text) - pos >= counter:
+            ciphertext.append(
+                text[pos:pos + counter].translate(ENCRYPT_TABLES[key]))
+            pos += counter
+            # Get a new key and reset the counter.  (A segment that
+            #  ends the text is still followed by a new key letter.)
+            key = random.randint(0, 19)
+            ciphertext.append(KEY_LETTERS[key])
+            counter = random.randint(10, 20)
+        # end while
+        ciphertext.append(text[pos:].translate(ENCRYPT_TABLES[key]))
+        return "".join(ciphertext)
+    # end method
+    
+    def _get_keys(self):
+        """Internal method that gets the index letter for the cipher,
+        and sets the index from it.
         
         Arguments:  none.
         
         Returns:  nothing.
         """
-        new_string = ""
-        # Go through the plaintext, scanning for the escape character 4.
-        escape = False
-        for char in self.plaintext:
-            if char == "4":
-                # If we hit the escape character, immediately get the
-                #  next character.
-                escape = True
-            else:
-                if escape:
-                    # If escape is true the last character was a 4.
-                    #  This character changes according to the map and
-                    #  is added to the string.
-                    new_string += CHAR_MAP_REV[char]
-                    # Reset the escape flag.
-                    escape = False
-                else:
-                    # Just pass through any non-numeric character.
-                    new_string += char
-                # end if
-            # end if
-        # end for
-        # Put the result in plaintext.
-        self.plaintext = new_string
+        if self.mode == "Encrypt":
+            prompt = (
+                "Please enter the index letter for this cipher.  The " +
+                "index\nletter can be:  a, b, c, d, e, f, g, h, i, k, l, " +
+                "m, n, o,\np, q, r, s, t, v, x, y, z, or &:  ")
+        else:
+            prompt = (
+                "Please enter the index letter that was used to encrypt " +
+                "this\ncipher.  The index letter can be:  a, b, c, d, e, " +
+                "f, g, h, i,\nk, l, m, n, o, p, q, r, s, t, v, x, y, z, " +
+                "or &:  ")
+        # end if
+        # Need to pass an upper-case version of the mobilis alphabet
+        #  because _get_keyword expects keywords to be upper-case.
+        index_letter = self._get_keyword(
+            prompt, keylist=MOBILIS.upper(), max_length=1,
+            option="index_letter")
+        # Now set the index, which is the offset for the cipher.
+        self.index = MOBILIS.find(index_letter.lower())
         return
-    # end function
+    # end method
     
-    def __preprocess(self):
-        """This internal function maps missing letters and numbers to
-        existing letter/number sequences.
+    def _split_ciphertext(self, text, size):
+        """Internal method that splits ciphertext into pieces of at
+        least size characters (except the last), each starting at a key
+        letter, so that they can be decrypted independently.
         
-        Arguments:  none.
+        Called by parallel.
         
-        Returns:  nothing.
+        Arguments:
+        - text -- the ciphertext.
+        - size -- the length of a piece.
+        
+        Returns:  a list of the pieces.
         """
-        new_string = ""
-        # For missing letters and numbers, the numeral 4 is an escape
-        #  character, with the letter or number mapped to an existing
-        #  letter.
-        for char in self.plaintext:
-            if char in "HJKUWY0456789":
-                new_string += "4" + CHAR_MAP[char]
-            else:
-                new_string += char
+        pieces = []
+        start = 0
+        while len(text) - start > size:
+            # Break at the first key letter past the end of the piece.
+            match = KEY_PATTERN.search(text, start + size)
+            if match is None:
+                break
             # end if
+            pieces.append(text[start:match.start()])
+            start = match.start()
         # end while
-        # Put the result in plaintext.
-        self.plaintext = new_string
-        return
-    # end function
-    
\ No newline at end of file
+        pieces.append(text[start:])
+        return pieces
+    # end method
+    
+    def _strip_ciphertext(self, text):
+        """Internal method that strips a piece of ciphertext of anything
+        but the characters of the mobilis alphabet (in either case).
+        
+        Called by _block_input.
+        
+        Arguments:
+        - text -- the ciphertext.
+        
+        Returns:  the stripped ciphertext.
+        """
+        return NOT_CIPHER.sub("", text)
+    # end method
+    
+    def __postprocess(self, text):
+        """This is the counterpart to __preprocess.  If scans the
+        decrypted text for escape characters and converts what follows
+        each back into its original form.
+        
+        Arguments:
+        - text -- the decrypted text.
+        
+        Returns:  the decoded text, or None if it includes an invalid
+         escape sequence.
+        """
+        # Each part after the first follows an escape character; only
+        #  its first character changes.
+        parts = text.split(ESCAPE)
+        try:
+            parts[1:] = [UNESCAPE[part[:1]] + part[1:]
+                         for part in parts[1:]]
+        except KeyError:
+            self._abort(
+                "The decrypted text includes an invalid escape sequence.")
+            return None
+        # end try (method exits)
+        return "".join(parts)
+    # end method
+    
+    def __preprocess(self, text):
+        """This internal function maps missing letters and numbers to
+        existing letter/number sequences.
+        
+        Arguments:
+        - text -- the formatted plaintext.
+        
+        Returns:  the text, with each missing letter and number replaced
+         by the escape character and a letter.
+        """
+        return text.translate(ESCAPE_TABLE)
+    # end method
@@ -1,17 +1,27 @@
+import tables
+
 from ciphers import Cipher
 
 ALPHANUM = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+# The Atbash Cipher reverses the alphabet, so the same table works both
+#  ways.
+TABLE = tables.substitution_table(ALPHANUM, ALPHANUM[::-1])
 
 
 class Atbash(Cipher):
 
     """This class implements the Atbash Cipher"""
     
-    def __init__(self, mode, text):
+    # Each character is reversed on its own.
+    block_length = 1
+    
+    def __init__(self, mode, text, options=None):
         """At initialization, the mode of the object is set and the
-        appropriate attribute is set to the original text.
+        appropriate attribute is set to the original text.  If options
+        are given, the cipher runs headless (see Cipher).
         """
         self.mode = mode
+        self.options = options
         self.name = "Atbash"
         if mode == "Encrypt":
             self.plaintext = text
@@ -37,10 +47,7 @@ class Atbash(Cipher):
         # First format the ciphertext for decryption.
         self._block_input()
         # Decrypt according to the standard formula.
-        for char in self.ciphertext:
-            plain_index = (len(ALPHANUM) - 1) - ALPHANUM.index(char)
-            self.plaintext += ALPHANUM[plain_index]
-        # end for
+        self.plaintext = self._decrypt_text(self.ciphertext)
         # Finally, allow for a one-time pad.
         self._one_time_pad()
         self._intelligent_decrypt()
@@ -62,12 +69,30 @@ class Atbash(Cipher):
         # Present the option to use a one-time pad.
         self._one_time_pad()
         # To encrypt, just loop through the plaintext...
-        for char in self.plaintext:
-            # The cipher character is found through a formula.
-            cipher_index = (len(ALPHANUM) - 1) - ALPHANUM.index(char)
-            self.ciphertext += ALPHANUM[cipher_index]
-        # end for
+        self.ciphertext = self._encrypt_text(self.plaintext)
         # Allow the user to see the ciphertext in five-character blocks.
         self._block_output()
         return
     # end method
+    
+    def _decrypt_text(self, text):
+        """Decrypts a string.  (The Atbash Cipher is its own inverse.)
+        
+        Arguments:
+        - text -- the string to decrypt.
+        
+        Returns:  the decrypted string.
+        """
+        return self._encrypt_text(text)
+    # end method
+    
+    def _encrypt_text(self, text):
+        """Encrypts a string by reversing the alphabet.
+        
+        Arguments:
+        - text -- the string to encrypt.
+        
+        Returns:  the encrypted string.
+        """
+        return tables.translate(text, TABLE)
+    # end method
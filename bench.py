@@ -0,0 +1,385 @@
+"""This is the benchmark script for Secret Messages!
+-----------------------------------------------------------------------
+It runs every cipher (headless) through encryption and decryption of
+messages of several sizes, with several combinations of options, and
+reports for each:  the throughput in characters per second, the
+latency of each call (as percentiles over the repeated runs), and the
+peak memory allocated.  The results are written as JSON or CSV, e.g.:
+
+    python bench.py --sizes 100,10K,1M --format csv --out bench.csv
+
+Use "python bench.py --help" for the full list of options.  Larger
+messages can take a long time with some ciphers; once a cipher takes
+longer than the time limit for one size, its larger sizes are skipped.
+"""
+
+import argparse
+import csv
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+import coder
+
+# The message sizes run by default.  Up to 100M can be given with
+#  --sizes.
+DEFAULT_SIZES = [100, 1000, 10000, 100000, 1000000]
+SIZE_SUFFIXES = {"K": 1000, "M": 1000000}
+# The seed of the random module for every run of a benchmark.
+RUN_SEED = 0
+# The combinations of options each cipher is run with.
+PROFILES = {
+    "plain": {},
+    "intelligent": {"intelligent": True},
+    "pad": {"pad": "ONETIMEPADCODE"},
+    "blocks": {"blocks": True, "line_break": True}}
+# A sample key for each cipher (see coder.CIPHER_KEYS).
+SAMPLE_KEYS = {
+    "ADFGVX": {"keyword": "PRIVACY", "perm_key": "GERMAN"},
+    "Affine": {"key1": 5, "key2": 8}, "Alberti": {"index_letter": "K"},
+    "Atbash": {}, "Bifid": {"keyword": "PLAYFAIR"}, "Caesar": {},
+    "Hill": {"keyword": "KEYWORD"}, "Keyword": {"keyword": "SECRET"},
+    "Polybius Square": {}, "Transposition": {}}
+# The characters benchmark messages are made of, roughly in the
+#  proportions of ordinary text.
+MESSAGE_CHARS = (
+    "eeeeeeeeeeetttttttttaaaaaaaaooooooooiiiiiiinnnnnnnsssssshhhhhh" +
+    "rrrrrrddddlllluuucccmmmwwffggyyppbbvkjxqzETAOINSHRDLU0123456789" +
+    "               .,?!'\":;-")
+REPEATS = 5
+TIME_LIMIT = 30.0
+FIELDS = [
+    "cipher", "action", "profile", "size", "repeats", "chars_per_sec",
+    "p50_ms", "p90_ms", "p99_ms", "peak_bytes", "error"]
+
+
+def main(argv):
+    """Runs the benchmarks and writes the results.
+
+    Arguments:
+    - argv -- the list of command line arguments (without the script
+        name).
+
+    Returns:  the exit code (0 for success, 2 for usage errors).
+    """
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    try:
+        sizes = [_parse_size(size) for size in args.sizes.split(",")]
+    except ValueError as err:
+        parser.print_usage(sys.stderr)
+        print("bench.py: error: " + str(err), file=sys.stderr)
+        return 2
+    # end try (function exits)
+    if args.repeats < 1:
+        parser.print_usage(sys.stderr)
+        print("bench.py: error: --repeats must be at least 1",
+              file=sys.stderr)
+        return 2
+    # end if (function exits)
+    ciphers = list(coder.CIPHER_CLASS)
+    if args.ciphers:
+        ciphers = []
+        for name in args.ciphers.split(","):
+            cipher_name = coder.find_cipher(name)
+            if cipher_name is None:
+                parser.print_usage(sys.stderr)
+                print("bench.py: error: unknown cipher:  " + name,
+                      file=sys.stderr)
+                return 2
+            # end if (function exits)
+            ciphers.append(cipher_name)
+        # end for
+    # end if
+    profiles = args.profiles.split(",") if args.profiles else list(PROFILES)
+    for profile in profiles:
+        if profile not in PROFILES:
+            parser.print_usage(sys.stderr)
+            print("bench.py: error: unknown profile:  " + profile,
+                  file=sys.stderr)
+            return 2
+        # end if (function exits)
+    # end for
+    results = run_benchmarks(
+        ciphers, sizes, profiles, repeats=args.repeats,
+        time_limit=args.time_limit, memory=not args.no_memory,
+        progress=args.outfile != "-")
+    if args.outfile == "-":
+        _write_results(sys.stdout, results, args.format)
+    else:
+        with open(args.outfile, "w", newline="", encoding="utf-8") as file:
+            _write_results(file, results, args.format)
+        # end with
+    # end if
+    return 0
+# end function
+
+
+def make_message(size, seed=0):
+    """Makes a benchmark message of random text.
+
+    Arguments:
+    - size -- the length of the message.
+
+    Named arguments:
+    - seed -- the seed for the random text (default 0).
+
+    Returns:  the message.
+    """
+    return "".join(random.Random(seed).choices(MESSAGE_CHARS, k=size))
+# end function
+
+
+def run_benchmark(cipher_name, size, profile, repeats=REPEATS, memory=True):
+    """Benchmarks one cipher, with one size of message and one
+    combination of options, in both directions.
+
+    Arguments:
+    - cipher_name -- the name of the cipher (a key of coder.CIPHER_CLASS).
+    - size -- the length of the message.
+    - profile -- the combination of options (a key of PROFILES).
+
+    Named arguments:
+    - repeats -- the number of times to time each call (default
+        REPEATS).
+    - memory -- whether to measure peak memory, with one more call
+        traced by tracemalloc (default True).
+
+    Returns:  a list of two result dictionaries (with the keys in
+     FIELDS), for encryption and decryption.  If the cipher fails, the
+     error is recorded instead of the results.
+    """
+    options = dict(SAMPLE_KEYS[cipher_name], **PROFILES[profile])
+    text = make_message(size)
+    result_text = None
+    results = []
+    for action in ("Encrypt", "Decrypt"):
+        result = {
+            "cipher": cipher_name, "action": action, "profile": profile,
+            "size": size, "repeats": repeats, "chars_per_sec": None,
+            "p50_ms": None, "p90_ms": None, "p99_ms": None,
+            "peak_bytes": None, "error": ""}
+        results.append(result)
+        if action == "Decrypt":
+            if result_text is None:
+                result["error"] = "not encrypted"
+                continue
+            # end if
+            text = result_text
+        # end if
+        # Intelligent encryption is random, so each run is seeded the
+        #  same; the caller's random state is put back afterwards.
+        state = random.getstate()
+        try:
+            times = []
+            for _ in range(repeats):
+                random.seed(RUN_SEED)
+                start = time.perf_counter()
+                result_text = coder.run_cipher(
+                    action, cipher_name, text, **options)
+                times.append(time.perf_counter() - start)
+            # end for
+            if memory:
+                tracemalloc.start()
+                try:
+                    coder.run_cipher(action, cipher_name, text, **options)
+                    result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+                # end try
+            # end if
+        except Exception as err:
+            # A cipher that fails is reported, not allowed to stop the
+            #  other benchmarks.
+            result["error"] = type(err).__name__ + ":  " + str(err)
+            result_text = None
+            continue
+        finally:
+            random.setstate(state)
+        # end try
+        result.update(_summarize(times, size))
+    # end for
+    return results
+# end function
+
+
+def run_benchmarks(
+        ciphers, sizes, profiles, repeats=REPEATS, time_limit=TIME_LIMIT,
+        memory=True, progress=False):
+    """Runs the benchmarks for several ciphers, sizes and combinations
+    of options.
+
+    Arguments:
+    - ciphers -- the names of the ciphers.
+    - sizes -- the message sizes, smallest first.
+    - profiles -- the combinations of options (keys of PROFILES).
+
+    Named arguments:
+    - repeats -- the number of times to time each call (default
+        REPEATS).
+    - time_limit -- once one call of a cipher takes longer than this
+        many seconds, its larger sizes are skipped (default TIME_LIMIT).
+    - memory -- whether to measure peak memory (default True).
+    - progress -- whether to report progress on standard error
+        (default False).
+
+    Returns:  a list of result dictionaries (see run_benchmark).
+    """
+    results = []
+    for cipher_name in ciphers:
+        for profile in profiles:
+            skip = False
+            for size in sizes:
+                if skip:
+                    results.append({
+                        "cipher": cipher_name, "action": "", "size": size,
+                        "profile": profile, "repeats": 0,
+                        "chars_per_sec": None, "p50_ms": None,
+                        "p90_ms": None, "p99_ms": None, "peak_bytes": None,
+                        "error": "skipped (over the time limit)"})
+                    continue
+                # end if
+                if progress:
+                    print(cipher_name + ", " + profile + ", " + str(size),
+                          file=sys.stderr)
+                # end if
+                pair = run_benchmark(
+                    cipher_name, size, profile, repeats=repeats,
+                    memory=memory)
+                results.extend(pair)
+                for result in pair:
+                    if ((result["p50_ms"] is not None) and
+                            (result["p50_ms"] / 1000 > time_limit)):
+                        skip = True
+                    # end if
+                # end for
+            # end for
+        # end for
+    # end for
+    return results
+# end function
+
+
+def _build_parser():
+    """Builds the command line parser.
+
+    Arguments:  none.
+
+    Returns:  an argparse.ArgumentParser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="bench.py",
+        description="Benchmark the Secret Messages! ciphers.")
+    parser.add_argument(
+        "--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="comma-separated message sizes, with an optional K or M " +
+        "suffix (default " + ",".join(str(s) for s in DEFAULT_SIZES) + ")")
+    parser.add_argument(
+        "--ciphers", help="comma-separated ciphers to run (default all)")
+    parser.add_argument(
+        "--profiles",
+        help="comma-separated combinations of options to run:  " +
+        ", ".join(PROFILES) + " (default all)")
+    parser.add_argument(
+        "--repeats", type=int, default=REPEATS,
+        help="timed calls for each result (default " + str(REPEATS) + ")")
+    parser.add_argument(
+        "--time-limit", type=float, default=TIME_LIMIT,
+        help="skip a cipher's larger sizes once one call takes longer " +
+        "than this many seconds (default " + str(TIME_LIMIT) + ")")
+    parser.add_argument(
+        "--no-memory", action="store_true",
+        help="do not measure peak memory (which takes an extra call)")
+    parser.add_argument(
+        "--format", choices=["json", "csv"], default="json",
+        help="the output format (default json)")
+    parser.add_argument(
+        "--out", dest="outfile", default="-",
+        help="the file to write (default standard output)")
+    return parser
+# end function
+
+
+def _parse_size(string):
+    """Reads a message size, which may end in K or M.
+
+    Arguments:
+    - string -- the size.
+
+    Returns:  the size, as a number of characters.  Raises ValueError
+     if it is not a valid size.
+    """
+    string = string.strip().upper()
+    multiplier = 1
+    if string[-1:] in SIZE_SUFFIXES:
+        multiplier = SIZE_SUFFIXES[string[-1]]
+        string = string[:-1]
+    # end if
+    try:
+        size = int(float(string) * multiplier)
+    except ValueError:
+        raise ValueError("invalid size:  " + string) from None
+    # end try
+    if size < 1:
+        raise ValueError("invalid size:  " + string)
+    # end if
+    return size
+# end function
+
+
+def _summarize(times, size):
+    """Works out the throughput and latency percentiles of a set of
+    timed calls.
+
+    Arguments:
+    - times -- the time each call took, in seconds.
+    - size -- the length of the message.
+
+    Returns:  a dictionary of chars_per_sec, p50_ms, p90_ms and p99_ms.
+    """
+    if len(times) > 1:
+        percentiles = statistics.quantiles(
+            times, n=100, method="inclusive")
+        p50, p90, p99 = percentiles[49], percentiles[89], percentiles[98]
+    else:
+        p50 = p90 = p99 = times[0]
+    # end if
+    return {
+        "chars_per_sec": round(size / p50) if p50 else None,
+        "p50_ms": round(p50 * 1000, 3), "p90_ms": round(p90 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3)}
+# end function
+
+
+def _write_results(file, results, output_format):
+    """Writes the results as JSON (with details of the machine) or CSV.
+
+    Arguments:
+    - file -- the open file to write to.
+    - results -- the list of result dictionaries.
+    - output_format -- "json" or "csv".
+
+    Returns:  nothing.
+    """
+    if output_format == "json":
+        json.dump({
+            "python": platform.python_version(),
+            "platform": platform.platform(), "results": results},
+            file, indent=2)
+        file.write("\n")
+    else:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    # end if
+    return
+# end function
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
+# end if
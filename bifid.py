@@ -1,17 +1,31 @@
+import operator
+import permutation
+
 from ciphers import Cipher
 
 
 class Bifid(Cipher):
 
-    """This class implements the Bifid Cipher"""
+    """This class implements the Bifid Cipher.  By default the whole
+    message is fractionated at once; with the period option, each
+    period of that many characters is fractionated on its own (the
+    periodic Bifid Cipher), so that the message can be streamed, or
+    split among several processes.
+    """
+    
+    # The period, if any, is the block length.
+    block_length = None
     
-    def __init__(self, mode, text):
+    def __init__(self, mode, text, options=None):
         """At initialization, the mode of the object is set and the
-        appropriate attribute is set to the original text.
+        appropriate attribute is set to the original text.  If options
+        are given, the cipher runs headless (see Cipher).
         """
         self.mode = mode
+        self.options = options
         self.name = "Bifid"
         self.keyword = ""
+        self.period = None
         self.code_dict = {}
         self.code_dict_rev = {}
         if mode == "Encrypt":
@@ -35,31 +49,14 @@ class Bifid(Cipher):
         
         Returns:  nothing.
         """
-        # First get the keyword for the cipher.
-        self.keyword = self._get_keyword(
-            "Please enter the keyword that was used to encrypt this " +
-            "message:  ")
-        # Build the code dictionaries.
-        self._build_code_dicts()
+        # First get the keyword for the cipher, and build the code
+        #  dictionaries.
+        self._get_keys()
         # Before doing anything with the ciphertext, strip it of any
         #  spaces (if entered in five-character blocks) and turn it into
         #  all upper-case.
         self._block_input()
-        # Create a string of all the character sequences.
-        working_string = ""
-        for char in self.ciphertext:
-            working_string += self.code_dict[char]
-        # end for
-        # Split the string into two lists.
-        working_list = [[], []]
-        working_list[0] = working_string[:len(working_string) // 2]
-        working_list[1] = working_string[len(working_string) // 2:]
-        for char in range(len(working_list[0])):
-            # turn each two-character sequence (one from each list) back
-            #  into a letter.
-            self.plaintext += self.code_dict_rev[working_list[0][char] +
-                                                 working_list[1][char]]
-        # end for
+        self.plaintext = self._decrypt_text(self.ciphertext)
         # Finally call one_time_pad and intelligent_decrypt.
         self._one_time_pad()
         self._intelligent_decrypt()
@@ -73,68 +70,131 @@ class Bifid(Cipher):
         
         Returns:  nothing.
         """
-        # First get the keyword for the cipher.
-        self.keyword = self._get_keyword(
-            "Please enter a keyword or phrase (no spaces) for " +
-            "your text.\nWords with a large number of unique letters " +
-            "are more secure:  ")
+        # First get the keyword for the cipher, and build the code
+        #  dictionaries.
+        self._get_keys()
         # Present the option to perform intelligent encryption.
         self._intelligent_encrypt()
         # Format the plaintext for processing.
         self._format_plaintext()
         # Present the option to use a one-time pad.
         self._one_time_pad()
-        # Build the code dictionaries.
-        self._build_code_dicts()
-        # Convert the plaintext into two-digit sequences, separated.
-        working_list = ["", ""]
-        for char in self.plaintext:
-            working_list[0] += self.code_dict[char][0]
-            working_list[1] += self.code_dict[char][1]
-        # end for
-        # Combine the two strings into one.
-        working_string = working_list[0] + working_list[1]
-        # Reset working_list and reuse it.
-        working_list = []
-        # Turn the string into a list of two-digit sequences.
-        for pos in range(0, len(working_string), 2):
-            working_list.append(working_string[pos:pos + 2])
-        # end for
-        # Reset working_string and reuse it.
-        working_string = ""
-        # Go through the list and turn the sequences back into letters.
-        for item in working_list:
-            working_string += self.code_dict_rev[item]
-        # end for
-        # Put the result in ciphertext.
-        self.ciphertext = working_string
+        self.ciphertext = self._encrypt_text(self.plaintext)
         # Format if user chooses.
         self._block_output()
         return
     # end method
     
     def _build_code_dicts(self):
-        """Builds the dictionary for encoding/decoding letters.
+        """Builds the dictionaries for encoding/decoding letters, from
+        the key schedule.
+        
+        Arguments:  none.
+        
+        Returns:  nothing.
+        """
+        # The dictionaries equating letters/numerals and values are
+        #  used both ways during both encryption and decryption.
+        schedule = self._key_schedule(self.keyword)
+        self.code_dict = dict(schedule.encode)
+        self.code_dict_rev = dict(schedule.decode)
+        return
+    # end method
+    
+    @classmethod
+    def _build_schedule(cls, keyword):
+        """Builds the code alphabet from the keyword (numbers are
+        included), and pairs each of its characters with its row and
+        column in the 6x6 square.
+        
+        Arguments:
+        - keyword -- the keyword for the cipher.
+        
+        Returns:  the code alphabet, and tuples of (character, row and
+         column) and (row and column, character) pairs.
+        """
+        code_alphabet = cls._alphabet_from_keyword(
+            keyword, include_numbers=True)
+        squares = [str(row) + str(col) for row in range(6) for col in range(6)]
+        return (code_alphabet, tuple(zip(code_alphabet, squares)),
+                tuple(zip(squares, code_alphabet)))
+    # end method
+    
+    def _decrypt_text(self, text):
+        """Decrypts a string, one period at a time (or all at once,
+        without a period).
+        
+        Arguments:
+        - text -- the string to decrypt.
+        
+        Returns:  the decrypted string.
+        """
+        # Turn each character into its row and column, and put the rows
+        #  and columns of each period back in two halves.
+        working_string = "".join(map(self.code_dict.__getitem__, text))
+        if self.period and (self.period < len(text)):
+            working_string = permutation.apply(
+                working_string, permutation.fractionation(
+                    len(text), self.period, inverse=True))
+        # end if
+        # Turn each row and column (one from each half) back into a
+        #  letter.
+        return "".join(map(
+            self.code_dict_rev.__getitem__,
+            map(operator.add, working_string[:len(text)],
+                working_string[len(text):])))
+    # end method
+    
+    def _encrypt_text(self, text):
+        """Encrypts a string, one period at a time (or all at once,
+        without a period).
+        
+        Arguments:
+        - text -- the string to encrypt.
+        
+        Returns:  the encrypted string.
+        """
+        # Convert the plaintext into its rows and columns, as two
+        #  strings.
+        working_string = "".join(map(self.code_dict.__getitem__, text))
+        working_string = working_string[0::2] + working_string[1::2]
+        if self.period and (self.period < len(text)):
+            # Take the rows of each period, then its columns.
+            working_string = permutation.apply(
+                working_string,
+                permutation.fractionation(len(text), self.period))
+        # end if
+        # Turn each pair of digits back into a letter.
+        return "".join(map(
+            self.code_dict_rev.__getitem__,
+            map(operator.add, working_string[0::2], working_string[1::2])))
+    # end method
+    
+    def _get_keys(self):
+        """Gets the keyword for the cipher, builds the code dictionaries
+        from it, and gets the period (from the period option, in
+        headless mode; otherwise the whole message is one period).
         
         Arguments:  none.
         
         Returns:  nothing.
         """
-        # Build an initial alphabet from the keyword.  Include numbers.
-        code_alphabet = self._alphabet_from_keyword(
-            self.keyword, include_numbers=True)
-        # Build dictionaries equating letters/numerals and values (used
-        #  both ways during both encryption and decryption).
-        row = 0
-        col = 0
-        for char in code_alphabet:
-            self.code_dict[char] = str(row) + str(col)
-            self.code_dict_rev[str(row) + str(col)] = char
-            col += 1
-            if col == 6:
-                col = 0
-                row += 1
-            # end if
-        # end for
+        if self.mode == "Encrypt":
+            prompt = (
+                "Please enter a keyword or phrase (no spaces) for " +
+                "your text.\nWords with a large number of unique letters " +
+                "are more secure:  ")
+        else:
+            prompt = (
+                "Please enter the keyword that was used to encrypt this " +
+                "message:  ")
+        # end if
+        self.keyword = self._get_keyword(prompt, option="keyword")
+        self._build_code_dicts()
+        if (self.options is not None) and (
+                self.options.get("period") is not None):
+            self.period = self._get_keynumber("", lbound=1, option="period")
+            self.block_length = self.period
+        # end if
         return
-    # end method
\ No newline at end of file
+    # end method
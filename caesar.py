@@ -1,18 +1,28 @@
+import tables
+
 from ciphers import Cipher
 
 ALPHANUM = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+# The traditional shift, used unless another is given.
+SHIFT = 3
 
 
 class Caesar(Cipher):
     
     """This class implements the Caesar Cipher"""
     
-    def __init__(self, mode, text):
+    # Each character is shifted on its own.
+    block_length = 1
+    
+    def __init__(self, mode, text, options=None):
         """At initialization, the mode of the object is set and the
-        appropriate attribute is set to the original text.
+        appropriate attribute is set to the original text.  If options
+        are given, the cipher runs headless (see Cipher).
         """
         self.mode = mode
+        self.options = options
         self.name = "Caesar"
+        self.shift = SHIFT
         if mode == "Encrypt":
             self.plaintext = text
             self.ciphertext = ""
@@ -34,14 +44,13 @@ class Caesar(Cipher):
         
         Returns:  nothing.
         """
+        # Get the shift, if it isn't the usual one.
+        self._get_keys()
         # Before doing anything with the ciphertext, strip it of any
         #  spaces (if entered in five-character blocks).
         self._block_input()
-        # To decrypt, just shift all characters back three places.
-        for char in self.ciphertext:
-            self.plaintext += ALPHANUM[(ALPHANUM.index(char) - 3) % 
-                                       len(ALPHANUM)]
-        # end for
+        # To decrypt, just shift all characters back.
+        self.plaintext = self._decrypt_text(self.ciphertext)
         # Call one time pad and intelligent decrypt.
         self._one_time_pad()
         self._intelligent_decrypt()
@@ -55,18 +64,55 @@ class Caesar(Cipher):
         
         Returns:  nothing.
         """
+        # Get the shift, if it isn't the usual one.
+        self._get_keys()
         # Present the option to perform intelligent encryption.
         self._intelligent_encrypt()
         # Format the plaintext for processing.
         self._format_plaintext()
         # Present the option to use a one-time pad.
         self._one_time_pad()
-        # To encrypt, just shift letters/numbers three places forward.
-        for char in self.plaintext:
-            self.ciphertext += ALPHANUM[(ALPHANUM.index(char) + 3) %
-                                        len(ALPHANUM)]
-        # end for
+        # To encrypt, just shift letters/numbers forward.
+        self.ciphertext = self._encrypt_text(self.plaintext)
         # Format text into blocks, if the user wants.
         self._block_output()
         return
     # end function
+    
+    def _decrypt_text(self, text):
+        """Shifts each character of a string back.
+        
+        Arguments:
+        - text -- the string to decrypt.
+        
+        Returns:  the decrypted string.
+        """
+        return tables.translate(text, tables.shift_table(-self.shift))
+    # end method
+    
+    def _encrypt_text(self, text):
+        """Shifts each character of a string forward.
+        
+        Arguments:
+        - text -- the string to encrypt.
+        
+        Returns:  the encrypted string.
+        """
+        return tables.translate(text, tables.shift_table(self.shift))
+    # end method
+    
+    def _get_keys(self):
+        """Gets the shift from the shift option in headless mode, if it
+        is given.  Otherwise the traditional shift of three places is
+        used.
+        
+        Arguments:  none.
+        
+        Returns:  nothing.
+        """
+        if (self.options is not None) and (
+                self.options.get("shift") is not None):
+            self.shift = self._get_keynumber("", option="shift")
+        # end if
+        return
+    # end method
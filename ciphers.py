@@ -1,13 +1,24 @@
+import formatter
 import i_o
-import random
+import intel
+import itertools
+import keycache
+import operator
+import pads
+import profiling
+import re
+import tables
 
 ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
 NUMBERS = "0123456789"
 PUNCTUATION = """.,?!'":;-"""
-INTEL_DICT = {
-    "FQ": " ", "JX": " ", "QK": " ", "WZ": " ", "ZJ": " ", "GX": "CAP",
-    "HX": ".", "JQ": ",", "PZ": "?", "QG": "!", "QY": "'", "QZ": '"',
-    "WQ": ":", "XJ": ";", "ZQ": "-", "ZX": "EOM"}
+# Patterns matching everything but letters and numbers (in upper-case
+#  and either case).
+NOT_ALPHANUM_UPPER = re.compile("[^A-Z0-9]+")
+NOT_ALPHANUM = re.compile("[^A-Za-z0-9]+")
+# A one-time pad code is applied one slice of the text at a time as
+#  long as each slice is at least PAD_STRIDE characters long.
+PAD_STRIDE = 8
 
 
 class Cipher:
@@ -43,8 +54,75 @@ class Cipher:
         indicate spaces, capital letters and punctuation.
     - _one_time_pad:  Allows the user to encrypt/decrypt using a one-
         time pad.
+    - _abort:  Reports an invalid key or ciphertext and clears the
+        output.
+    - _key_schedule:  Gets the key schedule for the cipher's keys from
+        the cache (see keycache), which calls the cipher's
+        _build_schedule to build it if need be.
+    
+    Every cipher can also be run "headless," without prompting the
+    user, by passing a dictionary of options to its constructor.  If
+    options is None (the default), keys and choices are obtained from
+    the user.  Otherwise they are read from the dictionary:
+    
+    - keyword, perm_key, key1, key2, index_letter, shift, size, period,
+        width -- the cipher's key(s).  Which ones are required (or
+        optional, like the Caesar shift, the Hill matrix size, the Bifid
+        period and the Transposition grid width) depends on the
+        cipher.
+    - intelligent -- use intelligent encryption (default False).
+    - pad -- a one-time pad code (default "", no pad).
+    - pad_file -- the path of a pad file to use instead of a pad code
+        (see pads).  Each encryption uses a fresh range of the file,
+        whose offset is left in the pad_offset attribute.
+    - pad_offset -- the offset of that range, to decrypt with.
+    - blocks -- output five-character blocks (default False).
+    - line_break -- break the output into lines (default False).
+    - block_size, line_width -- the length of the blocks and the width
+        of the lines (defaults formatter.BLOCK_SIZE and
+        formatter.LINE_WIDTH).
+    
+    In headless mode an invalid key or ciphertext raises ValueError
+    instead of being reported to the user.
+    
+    Ciphers that transform each block of characters independently (a
+    block_length, and a cipher_width of 1) can also encrypt and decrypt
+    streams of text with the encrypt_stream and decrypt_stream methods.
+    These ciphers implement _encrypt_text and _decrypt_text, and get
+    their keys in _get_keys.  Any cipher with a block_length implements
+    the same methods, so that it can be run on several processes at
+    once (see parallel).  So can a segmented cipher, whose ciphertext
+    restarts the key at marks within it:  it implements
+    _split_ciphertext, and its _decrypt_text decrypts any piece that
+    starts at a mark.
     """
     
+    # The number of characters the cipher transforms independently of
+    #  the rest of the message; None means the cipher has to see the
+    #  whole message at once.
+    block_length = None
+    # Whether the cipher pads the message to a whole number of blocks
+    #  (so that the ciphertext must be one), or encrypts a short last
+    #  block as it is.
+    whole_blocks = False
+    # Whether the ciphertext can be split into pieces that are decrypted
+    #  independently (see _split_ciphertext).
+    segmented = False
+    # The number of characters of ciphertext each character of
+    #  plaintext becomes.
+    cipher_width = 1
+    # The offset of the range of a pad file used by the last message,
+    #  if any (see the pad_file option).
+    pad_offset = None
+    
+    def __init_subclass__(cls, **kwargs):
+        """Wraps the stages each cipher defines, so that they can be
+        timed (see profiling).
+        """
+        super().__init_subclass__(**kwargs)
+        profiling.instrument(cls)
+    # end method
+    
     def decrypt(self):
         """Default decryption method -- placeholder
         
@@ -52,6 +130,26 @@ class Cipher:
         """
         raise NotImplementedError()
     
+    def decrypt_stream(self, chunks):
+        """Decrypts a stream of ciphertext, yielding plaintext as it
+        goes, so that memory use does not grow with the length of the
+        message.  The pad code and intelligent decryption carry across
+        chunk boundaries.
+        
+        Arguments:
+        - chunks -- an iterable of ciphertext strings.
+        
+        Returns:  nothing; yields plaintext strings.
+        """
+        # The length of a block may depend on the keys.
+        self._get_keys()
+        self._check_streamable()
+        pad_code = self._get_pad_code()
+        yield from self._intelligent_decrypt_stream(
+            self._decrypt_chunks(chunks, pad_code))
+        return
+    # end method
+    
     def encrypt(self):
         """Default encryption method -- placeholder
         
@@ -59,7 +157,66 @@ class Cipher:
         """
         raise NotImplementedError()
     
-    def _alphabet_from_keyword(self, keyword, include_numbers=False):
+    def encrypt_stream(self, chunks):
+        """Encrypts a stream of plaintext, yielding ciphertext as it
+        goes, so that memory use does not grow with the length of the
+        message.  The ciphertext is broken into blocks and lines as it
+        goes, if the options ask for it.
+        
+        Arguments:
+        - chunks -- an iterable of plaintext strings.
+        
+        Returns:  nothing; yields ciphertext strings.
+        """
+        # The length of a block may depend on the keys.
+        self._get_keys()
+        self._check_streamable()
+        if self._use_intelligent():
+            # The whole stream is wrapped in the "ZX" start and end
+            #  sequences.
+            chunks = itertools.chain(
+                [intel.MARKER], map(intel.encode, chunks), [intel.MARKER])
+        # end if
+        pad_code = self._get_pad_code()
+        output = self._encrypt_chunks(chunks, pad_code)
+        if (self.options is not None) and (
+                self.options.get("blocks") or
+                self.options.get("line_break")):
+            # The blocks and lines carry across chunk boundaries.
+            output = formatter.format_stream(
+                output, blocks=self.options.get("blocks", False),
+                line_break=self.options.get("line_break", False),
+                **self._format_sizes())
+        # end if
+        yield from output
+        return
+    # end method
+    
+    def _abort(self, msg):
+        """Internal method that reports an invalid key or ciphertext.
+        Interactively, the message is printed and the output text is
+        cleared (which the caller reports as an aborted process).  In
+        headless mode a ValueError is raised instead.
+        
+        Arguments:
+        - msg -- the message describing the problem.
+        
+        Returns:  nothing.
+        """
+        if self.options is not None:
+            raise ValueError(msg)
+        # end if (method exits)
+        print(msg)
+        if self.mode == "Encrypt":
+            self.ciphertext = ""
+        else:
+            self.plaintext = ""
+        # end if
+        return
+    # end method
+    
+    @staticmethod
+    def _alphabet_from_keyword(keyword, include_numbers=False):
         """Internal method that creates a code alphabet from a
         keyword.
         
@@ -72,53 +229,127 @@ class Cipher:
         
         Returns:  A code alphabet.        
         """
-        keyword = keyword.upper()
-        # Working code alphabet in a list.
-        code_alpha_list = []
-        alphabet_string = ""
-        # Start with the keyword.
-        for letter in keyword:
-            if not (letter in code_alpha_list):
-                code_alpha_list.append(letter)
-        # end for
-        for letter in ALPHABET:
-            if not (letter in code_alpha_list):
-                code_alpha_list.append(letter)
-        # end for
-        alphabet_string = "".join(code_alpha_list)
+        # Start with the keyword, then the rest of the alphabet; a
+        #  dictionary keeps only the first of each letter, in order.
+        alphabet_string = "".join(dict.fromkeys(keyword.upper() + ALPHABET))
         if include_numbers:
             alphabet_string += NUMBERS
         # end if
         return alphabet_string
     # end method
     
-    def _block_input(self, make_upper=True):
-        """Internal method that strips out any spaces or
-        non-alphnumeric characters.
+    def _alphanumeric(self, text, make_upper=True):
+        """Internal method that strips everything but letters and
+        numbers from a string.
         
-        Called by the decrypt method.
+        Called by _block_input, _format_plaintext and the streaming
+        methods.
         
-        Arguments:  none.
+        Arguments:
+        - text -- the string to strip.
         
         Named arguments:
-        - make_upper -- allows the caller to specify whether the
-            ciphertext should be returned in upper-case (default True).
+        - make_upper -- whether to turn the string into upper-case
+            (default True).
         
-        Returns:  nothing.
+        Returns:  the stripped string.
         """
+        # Plain ASCII text can be stripped in one pass by a regular
+        #  expression.
+        if text.isascii():
+            if make_upper:
+                return NOT_ALPHANUM_UPPER.sub("", text.upper())
+            else:
+                return NOT_ALPHANUM.sub("", text)
+            # end if
+        # end if (method exits)
         new_text = ""
-        for char in self.ciphertext:
+        for char in text:
             # Discard any space and any non-alphanumeric characters.
             if (char.upper() in ALPHABET) or (char in NUMBERS):
                 if make_upper:
                     new_text += char.upper()
                 else:
                     new_text += char
+                # end if
+            # end if
         # end for
-        self.ciphertext = new_text
+        return new_text
+    # end method
+    
+    def _apply_pad(self, text, pad_code, offset=0):
+        """Internal method that applies a one-time pad code to a
+        string:  added to each character when encrypting, subtracted
+        when decrypting.
+        
+        Called by _one_time_pad and the streaming methods.
+        
+        Arguments:
+        - text -- the string (letters and numbers only).
+        - pad_code -- the one-time pad code.
+        
+        Named arguments:
+        - offset -- the position of text within the whole message, so
+            that a stream of chunks stays in step with the pad code
+            (default 0).
+        
+        Returns:  the padded string.
+        """
+        # Work pad magic here.  Simple modular addition/subtraction is
+        #  used.  Note that if the one-time pad code is shorter than the
+        #  message, the code repeats.
+        if self.mode == "Encrypt":
+            mod = 1
+        else:
+            mod = -1
+        # end if
+        # Convert the pad code to a list of shifts (one per character of
+        #  the code), in step with the start of the text.
+        shifts = [(num * mod) % 36 for num in
+                  pad_code.upper().encode("ascii").translate(
+                      tables.TO_NUMBERS)]
+        start = offset % len(shifts)
+        shifts = shifts[start:] + shifts[:start]
+        buffer = bytearray(text.encode("ascii"))
+        if len(shifts) * PAD_STRIDE <= len(buffer):
+            # A short code shifts every k-th character (k being the
+            #  length of the code) by the same amount, so each of those
+            #  slices of the text can be shifted in a single call.
+            for phase, shift in enumerate(shifts):
+                buffer[phase::len(shifts)] = (
+                    buffer[phase::len(shifts)].translate(
+                        tables.SHIFT_TABLES[shift]))
+            # end for
+        else:
+            # A long code would mean a slice for every few characters,
+            #  so instead the code is repeated to the length of the
+            #  text, and the two are added position by position.
+            repeats = len(buffer) // len(shifts) + 1
+            pad = bytes(shifts * repeats)
+            buffer = bytes(map(
+                operator.add, buffer.translate(tables.TO_NUMBERS),
+                pad)).translate(tables.TO_CHARS)
         # end if
+        return buffer.decode("ascii")
+    # end method
+    
+    def _block_input(self, make_upper=True):
+        """Internal method that strips out any spaces or
+        non-alphnumeric characters.
+        
+        Called by the decrypt method.
+        
+        Arguments:  none.
+        
+        Named arguments:
+        - make_upper -- allows the caller to specify whether the
+            ciphertext should be returned in upper-case (default True).
+        
+        Returns:  nothing.
+        """
+        self.ciphertext = self._alphanumeric(self.ciphertext, make_upper)
         return
-        # end method
+    # end method
     
     def _block_output(self):
         """Internal method that outputs encrypted text in five-
@@ -132,76 +363,179 @@ class Cipher:
         
         Returns:  nothing.
         """
-        # Clear the screen.
-        i_o.clear_screen()
-        # Ask whether to break the output into 5-character blocks.
-        separate = i_o.yes_no(
-                "Would you like the encrypted text to be printed in" +
-                "five\n-character blocks for immproved readability?")
-        line_break = i_o.yes_no(
-                "Would you like the output to be broken into separate" +
-                'lines?\n(Warning:  This will insert line breaks or") +
-                '"hard returns"\ninto the output.)')
-        new_text = ""
-        if separate:
-            index = 0
-            # Iterate over the ciphertext, five characters at a time.
-            for pos in range(0, len(self.ciphertext), 5):
-                # Add a five-character block, plus a space.
-                new_text += self.ciphertext[pos:pos+5] + " "
-                index += 1
-                if index == 10:
-                    index = 0
-                # end if
-            # end for
-            # Put result in ciphertext.
-            self.ciphertext = new_text
+        if self.options is not None:
+            # Headless mode:  take the choices from the options.
+            separate = self.options.get("blocks", False)
+            line_break = self.options.get("line_break", False)
+        else:
+            # Clear the screen.
+            i_o.clear_screen()
+            # Ask whether to break the output into 5-character blocks.
+            separate = i_o.yes_no(
+                    "Would you like the encrypted text to be printed in" +
+                    "five\n-character blocks for immproved readability?")
+            line_break = i_o.yes_no(
+                    "Would you like the output to be broken into separate" +
+                    'lines?\n(Warning:  This will insert line breaks or ' +
+                    '"hard returns"\ninto the output.)')
         # end if
-        # Ignore if the ciphertext is too short to break into multiple
-        #  lines.
-        # Set line length.
-        pos = 60
-        if line_break and (len(self.ciphertext) > pos):
-            # Start with a new line.
-            new_text = "\n"
-            while pos < len(self.ciphertext):
-                # Work backwards from the first character after the line
-                #  length, looking for a space.
-                offset = 0
-                while (
-                        (self.ciphertext[pos + offset] != " ") and
-                        (pos + offset != 0)):
-                    offset -= 1
-                # end while
-                if offset == 0:
-                    # If offset landed on 0, the first character after
-                    #  the line length is a space.  In that case, take
-                    #  the line, insert a newline character, and discard
-                    #  the space.
-                    new_text += self.ciphertext[:pos] + "\n"
-                    self.ciphertext = self.ciphertext[pos+1:]
-                elif pos + offset == 0:
-                    # If offset landed on the negative of pos, there
-                    #  were no spaces within the line.  Just take the
-                    #  entire line.
-                    new_text += self.ciphertext[:pos] + "\n"
-                    self.ciphertext = self.ciphertext[pos:]
-                else:
-                    # Otherwise, take the line up to and including the
-                    #  space.
-                    new_text += self.ciphertext[:pos + offset + 1] + "\n"
-                    self.ciphertext = self.ciphertext[pos + offset + 1:]
-                # end if
-            # end while
-            # When there is less than a full line left, take the entire
-            #  line.
-            new_text += self.ciphertext
-            # Put result back in self.ciphertext.
-            self.ciphertext = new_text
+        self.ciphertext = formatter.format_text(
+            self.ciphertext, blocks=separate, line_break=line_break,
+            **self._format_sizes())
+        return
+    # end method
+    
+    @classmethod
+    def _build_schedule(cls, *key):
+        """Internal method that builds the cipher's key schedule --
+        placeholder.  Ciphers that cache their key schedules override
+        it.
+        
+        Called by keycache.get_schedule.
+        
+        Arguments:  the cipher's keys.
+        
+        Returns:  a tuple of the code alphabet, and what the cipher
+         encrypts and decrypts with (see keycache.KeySchedule).
+        """
+        raise NotImplementedError()
+    # end method
+    
+    def _check_streamable(self):
+        """Internal method that raises NotImplementedError if the
+        cipher cannot work on a stream one block at a time, or
+        ValueError if a pad file is to be used (which needs the length
+        of the whole message).
+        
+        Arguments:  none.
+        
+        Returns:  nothing.
+        """
+        if (self.block_length is None) or (self.cipher_width != 1):
+            raise NotImplementedError(
+                "The " + self.__str__() + " cannot be streamed.")
+        elif (self.options is not None) and self.options.get("pad_file"):
+            raise ValueError("A pad file cannot be used on a stream.")
         # end if
         return
     # end method
     
+    def _decrypt_chunks(self, chunks, pad_code):
+        """Internal generator that decrypts a stream of ciphertext and
+        removes the one-time pad, if any.
+        
+        Called by decrypt_stream.
+        
+        Arguments:
+        - chunks -- an iterable of ciphertext strings.
+        - pad_code -- the one-time pad code, or an empty string.
+        
+        Returns:  nothing; yields decrypted strings.
+        """
+        # Position in the decrypted text, for the pad code.
+        offset = 0
+        # Only whole blocks are decrypted, and the last block is held
+        #  back until the end of the stream, to be finished.
+        pending = ""
+        for chunk in chunks:
+            pending += self._strip_ciphertext(chunk)
+            end = len(pending) - 1
+            end -= end % self.block_length
+            if end <= 0:
+                continue
+            # end if
+            text = self._decrypt_text(pending[:end])
+            pending = pending[end:]
+            if pad_code:
+                text = self._apply_pad(text, pad_code, offset)
+            # end if
+            offset += len(text)
+            yield text
+        # end for
+        if self.whole_blocks and (len(pending) % self.block_length):
+            self._abort(
+                "The encrypted text is not a multiple of " +
+                str(self.block_length) + " characters long.")
+            return
+        # end if (generator exits)
+        text = self._decrypt_final(self._decrypt_text(pending))
+        if pad_code:
+            text = self._apply_pad(text, pad_code, offset)
+        # end if
+        yield text
+        return
+    # end method
+    
+    def _decrypt_final(self, text):
+        """Internal method that finishes decrypting the end of a
+        message (e.g., by removing padding).  By default the text is
+        returned unchanged.
+        
+        Called, after _decrypt_text, on the last part of the message
+        (or, for a segmented cipher, on the whole of it).
+        
+        Arguments:
+        - text -- the decrypted end of the message.
+        
+        Returns:  the finished text.
+        """
+        return text
+    # end method
+    
+    def _decrypt_text(self, text):
+        """Default method that decrypts a string of characters --
+        placeholder
+        
+        Must be overridden by ciphers that can be streamed.
+        """
+        raise NotImplementedError()
+    
+    def _encrypt_chunks(self, chunks, pad_code):
+        """Internal generator that applies the one-time pad, if any, to
+        a stream of plaintext and encrypts it.
+        
+        Called by encrypt_stream.
+        
+        Arguments:
+        - chunks -- an iterable of plaintext strings.
+        - pad_code -- the one-time pad code, or an empty string.
+        
+        Returns:  nothing; yields encrypted strings.
+        """
+        # Position in the formatted plaintext, for the pad code.
+        offset = 0
+        # Only whole blocks are encrypted until the end of the stream.
+        pending = ""
+        for chunk in chunks:
+            text = self._alphanumeric(chunk)
+            if len(text) == 0:
+                continue
+            # end if
+            if pad_code:
+                text = self._apply_pad(text, pad_code, offset)
+            # end if
+            offset += len(text)
+            pending += text
+            end = len(pending) - (len(pending) % self.block_length)
+            if end > 0:
+                yield self._encrypt_text(pending[:end])
+                pending = pending[end:]
+            # end if
+        # end for
+        if pending:
+            yield self._encrypt_text(pending)
+        # end if
+        return
+    # end method
+    
+    def _encrypt_text(self, text):
+        """Default method that encrypts a string of characters --
+        placeholder
+        
+        Must be overridden by ciphers that can be streamed.
+        """
+        raise NotImplementedError()
+    
     def _format_plaintext(self):
         """Internal method that formats a plaintext string for
         encryption.
@@ -213,21 +547,37 @@ class Cipher:
         
         Returns:  nothing.
         """
-        new_string = ""
-        # Iterate through plaintext.
-        for char in self.plaintext:
-            # Keep a character only if it is a letter or a number.
-            #  Discard everything else.
-            if (char.upper() in ALPHABET) or (char in NUMBERS):
-                new_string += char.upper()
+        self.plaintext = self._alphanumeric(self.plaintext)
+        return
+    # end method
+    
+    def _format_sizes(self):
+        """Internal method that gets the block size and line width the
+        output is formatted with.
+        
+        Arguments:  none.
+        
+        Returns:  a dictionary of block_size and line_width (see
+         formatter.Formatter).
+        """
+        if self.options is None:
+            return {}
+        # end if (method exits)
+        sizes = {}
+        for option in ("block_size", "line_width"):
+            if self.options.get(option) is not None:
+                if int(self.options[option]) < 1:
+                    self._abort("The " + option.replace("_", " ") +
+                                " must be at least 1.")
+                # end if
+                sizes[option] = int(self.options[option])
             # end if
         # end for
-        # Put the result in plaintext.
-        self.plaintext = new_string
-        return
+        return sizes
     # end method
     
-    def _get_keynumber(self, prompt, keylist=None, lbound=None, ubound=None):
+    def _get_keynumber(
+        self, prompt, keylist=None, lbound=None, ubound=None, option=None):
         """Gets a keynumber for a cipher from the unser allows the user
         to abort.
         
@@ -238,9 +588,34 @@ class Cipher:
         - keylist -- a list of valid entries (default None).
         - lbound -- lower bound for number, inclusive (default None).
         - ubound -- upper bound for number, inlcusive (default None).
+        - option -- the name of the option holding the keynumber in
+            headless mode (default None).
         
         Returns:  the keynumber, or None if the user aborts.
         """
+        if self.options is not None:
+            # Headless mode:  the same checks apply, but a bad value is
+            #  an error rather than a reason to ask again.
+            if self.options.get(option) is None:
+                raise ValueError("Missing key option:  " + str(option))
+            # end if
+            try:
+                keynumber = int(self.options[option])
+            except (TypeError, ValueError):
+                raise ValueError(
+                    "The " + option + " option is not a number.") from None
+            # end try
+            if keylist and (keynumber not in keylist):
+                raise ValueError(
+                    "The " + option + " option is not a valid keynumber " +
+                    "for this cipher.")
+            elif lbound and (keynumber < lbound):
+                raise ValueError("The " + option + " option is too small.")
+            elif ubound and (keynumber > ubound):
+                raise ValueError("The " + option + " option is too large.")
+            # end if
+            return keynumber
+        # end if (method exits)
         keynumber = None
         got_keynumber = False
         # Loop until a valid key is obtained, or user aborts.
@@ -290,7 +665,8 @@ class Cipher:
     # end method
     
     def _get_keyword(
-        self, prompt, keylist=ALPHABET, max_length=None, min_length=None):
+        self, prompt, keylist=ALPHABET, max_length=None, min_length=None,
+        option=None):
         """Gets a keyword for a cipher from the user, allows the user to
         abort.
         
@@ -309,9 +685,31 @@ class Cipher:
             of the keyword (default None).
         - min_length -- allows the caller to control the minimum length
             of the keyword (default None).
+        - option -- the name of the option holding the keyword in
+            headless mode (default None).
         
         Returns:  the keyword, or an empty string if the user aborts.
         """
+        if self.options is not None:
+            # Headless mode:  the same checks apply, but a bad keyword
+            #  is an error rather than a reason to ask again.
+            keyword = str(self.options.get(option) or "")
+            if len(keyword) == 0:
+                raise ValueError("Missing key option:  " + str(option))
+            elif min_length and (len(keyword) < min_length):
+                raise ValueError("The " + option + " option is too short.")
+            elif max_length and (len(keyword) > max_length):
+                raise ValueError("The " + option + " option is too long.")
+            # end if
+            for letter in keyword:
+                if not (letter.upper() in keylist):
+                    raise ValueError(
+                        "The " + option + " option includes spaces or " +
+                        "other forbidden characters.")
+                # end if
+            # end for
+            return keyword.upper()
+        # end if (method exits)
         keyword = ""
         got_keyword = False
         # Loop until a valid keyword is obtained, or user aborts.
@@ -357,173 +755,41 @@ class Cipher:
         return keyword.upper()
     # end method
     
-    def _intelligent_decrypt(self):
-        """Internal method that decodes flags in encrypted text.
+    def _get_keys(self):
+        """Internal method that gets the cipher's key(s) and builds
+        whatever the cipher needs from them.  Ciphers without keys need
+        not override it.
         
         Arguments:  none.
         
-        Returns:  nothing.        
+        Returns:  nothing.
         """
-        # First check to see if Intelligent Decryption needs to be used;
-        #  if not, do nothing.  The first two characters of an
-        #  intelligently encrypted text will always be "ZX".
-        if self.plaintext[0 : 2] != "ZX":
-            return
-        else:
-            # Parse plaintext for special sequences.
-            new_text = ""
-            pos = 2
-            # Go through the text one two-character slice at a time,
-            #  looking for special sequences.
-            while pos < (len(self.plaintext) - 1):
-                # Grab a two-character slice.
-                text_slice = self.plaintext[pos:pos + 2]
-                # Test against special sequences
-                if text_slice in INTEL_DICT:
-                    # Find out which one.
-                    # If it's the end of the message...
-                    if INTEL_DICT[text_slice] == "EOM":
-                        # The message has ended; break the loop.
-                        break
-                    # If it's for a capital letter...
-                    elif INTEL_DICT[text_slice] == "CAP":
-                        # Just add the next character (it's already
-                        #  upper-case).
-                        new_text += self.plaintext[pos+2:pos + 3]
-                        # Discard the special sequence and the capital
-                        #  letter.
-                        pos += 3
-                    else:
-                        # Any special sequence that isn't the end of the
-                        #  message or an upper-case inidicator is a
-                        #  space or punctuation mark; just add the
-                        #  appropriate character from INTEL_DICT.
-                        new_text += INTEL_DICT[text_slice]
-                        # Discard the special sequence.
-                        pos += 2
-                    # end if
-                # Anything not an special sequence is an ordinary
-                #  character.
-                else:
-                    # Add the lower-case version of the character.
-                    new_text += text_slice[0].lower()
-                    # Discard the character.
-                    pos += 1
-                # end if
-            # end while
-            # end if
-            # Put the result in plaintext.
-            self.plaintext = new_text
-        # end if
         return
     # end method
     
-    def _intelligent_encrypt(self):
-        """Internal method that inserts flags for decryption.
+    def _get_pad_code(self):
+        """Internal method that gets a one-time pad code, at the user's
+        option (or from the pad option in headless mode).
         
-        If the user opts for intelligent encryption, this method will
-        insert special sequences for spaces, capital letters, basic
-        punctuation (and itself), using bigrams (2-letter combinations)
-        that rarely occur in English.
+        Called by _one_time_pad.
         
         Arguments:  none.
         
-        Returns:  nothing.
+        Returns:  the pad code, or an empty string if none is used.
         """
-        # Clear the screen first.
-        i_o.clear_screen()
-        # Print summary info.
-        print("Cipher: ", self.__str__())
-        print("Action: ", self.mode, "\n")
-        # Print explanation of intelligent encryption.
-        print(
-            "Intelligent Encryption/Decryption:  Under ordinary\n",
-            "circumstances, when a message is encrypted it is turned into\n",
-            "a single string of upper-case text, with all spacing,\n",
-            "punctuation and capitalization removed.  Secret Messages!\n",
-            "can encrypt your message so that flags are inserted to\n",
-            "indicate spacing, punctuation and capitalization, which can\n",
-            "then be restored upon decryption.\n")
-        print(
-            "Note that Intelligent Encryption/Decryption uses the\n",
-            "following letter combinations, which do not occur in\n",
-            "most Roman-alphabet-based languages:  [FQ], [GX], [HX],\n",
-            "[JQ], [JX], [PZ], [QG], [QK], [QY], [QZ], [WQ], [WZ], [XJ],\n",
-            "[ZJ], [ZQ], [ZX].  If your messages contains abbreviations,\n",
-            "code words, model numbers, map coordinates, etc., which may\n",
-            "contain these letter combinations, you should NOT select\n",
-            "Intelligent Encryption/Decryption.\n")
-        # Get the user's choice.
-        use_intel = i_o.yes_no("Use Intelligent Encryption?")
-        if not use_intel:
-            # If no, just exit.
-            return
-        else:
-            # If yes, The first two characters of the decrypted text
-            # will be "ZX", which will trigger _intelligent_decrypt when
-            # it is called.
-            space_sequences = ["FQ", "JX", "QK", "WZ", "ZJ"]
-            new_text = "ZX"
-            # Go through the message one character at a time.
-            for char in self.plaintext:
-                # Check for space.
-                if char == " ":
-                    # Because spaces are so common, encoding them with a
-                    #  single escape sequence could expose the sequence
-                    #  to detection, thereby exposing the lengths of
-                    #  individiual words.  To counter this, the method
-                    #  randomly selects one of five special sequences,
-                    #  any of which can mark a space.
-                    new_text += space_sequences[random.randint(0, 4)]
-                # First a series of tests for punctuation marks.  Each
-                #  of these inserts a two-character sequence in place of
-                #  the character.
-                elif char == ".":
-                    new_text += "HX"
-                elif char == ",":
-                    new_text += "JQ"
-                elif char == "?":
-                    new_text += "PZ"
-                elif char == "!":
-                    new_text += "QG"
-                elif char == "'":
-                    new_text += "QY"
-                elif char == '"':
-                    new_text += "QZ"
-                elif char == ":":
-                    new_text += "WQ"
-                elif char == ";":
-                    new_text += "XJ"
-                elif char == "-":
-                    new_text += "ZQ"
-                # If it's not punctuation, check for a capital letter.
-                elif char in ALPHABET:
-                    new_text += "GX" + char
-                else:
-                    # If all else fails, it's just an ordinary letter/
-                    #  number.
-                    new_text += char.upper()
+        if self.options is not None:
+            # Headless mode:  an empty or missing pad option means no
+            #  one-time pad.
+            pad_code = str(self.options.get("pad") or "").upper()
+            for letter in pad_code:
+                if not (letter in ALPHABET + NUMBERS):
+                    raise ValueError(
+                        "The pad option includes spaces or other " +
+                        "forbidden characters.")
                 # end if
             # end for
-            # The message also ends with "ZX".  Any characters added
-            #  by the encryption method are nulls and should be
-            #  discarded by _intelligent_decrpyt.
-            new_text += "ZX"
-            self.plaintext = new_text
-        # end if
-        return
-    # end method
-    
-    def _one_time_pad(self):
-        """Internal method that implements a one-time pad at the
-        user's option.
-        
-        Called by both encrypt and decrypt methods.
-        
-        Arguments:  none.
-        
-        Returns:  nothing.
-        """
+            return pad_code
+        # end if (method exits)
         # Clear the screen.
         i_o.clear_screen()
         # Print summary info.
@@ -547,6 +813,7 @@ class Cipher:
                 "one-time pad code, you MUST enter the same code now in\n",
                 "order to decrypt the message.")
         # If user chooses to use a one-time pad...
+        pad_code = ""
         if i_o.yes_no("Do you want to use a one-time pad on this cipher?"):
             done = False
             # Loop until a code is obtained, or user aborts.
@@ -558,42 +825,225 @@ class Cipher:
                             "Do you want to " + self.mode.lower() + "this " +
                             "message without a one-time pad code?"):
                         # If no one-time pad code, do nothing.
-                        return
-                    # end if (method exits)
+                        break
+                    # end if
                 else:
                     done = True
                 # end if
             # end while
-            # Work pad magic here.  Simple modular addition/subtraction
-            #  is used.
-            alphanum = ALPHABET + NUMBERS
-            # Convert the pad code to a list of numbers.
-            pad_code_list = []
-            for letter in pad_code:
-                pad_code_list.append(alphanum.index(letter.upper()))
-            # end for
-            new_string = ""
-            if self.mode == "Encrypt":
-                mod = 1
-            else:
-                mod = -1
-            # end if
-            # This method operates on both letters and numbers.
-            # Loop through the text, performing addition or subtraction
-            #  on each letter, using each number in the pad code in
-            #  succession.  Note that if the one-time pad code is
-            #  shorter than the message, the code repeats.
-            index = 0
-            for letter in self.plaintext:
-                # Substitute recoded letter for original letter.
-                new_string += (
-                    alphanum[(alphanum.index(letter) +
-                              (pad_code_list[index] * mod)) % 36])
-                # Next number in code sequence; reset if at end.
-                index = (index + 1) % len(pad_code_list)
-            # end for
-            # Put the results back into the plaintext attribute.
-            self.plaintext = new_string
         # end if
+        return pad_code
+    # end method
+    
+    def _get_pad_offset(self, pad_file):
+        """Internal method that sets pad_offset to the offset of the
+        range of a pad file the message uses.  Encrypting reserves a
+        range (as long as the plaintext) that has not been used before;
+        decrypting takes the offset from the pad_offset option.
+        
+        Arguments:
+        - pad_file -- the open pads.PadFile.
+        
+        Returns:  nothing.
+        """
+        if self.options.get("pad"):
+            raise ValueError(
+                "The pad and pad_file options cannot be used together.")
+        # end if
+        if self.mode == "Encrypt":
+            self.pad_offset = pad_file.reserve(len(self.plaintext))
+        else:
+            self.pad_offset = self._get_keynumber("", option="pad_offset")
+        # end if
+        return
+    # end method
+    
+    def _intelligent_decrypt(self):
+        """Internal method that decodes flags in encrypted text.
+        
+        Arguments:  none.
+        
+        Returns:  nothing.        
+        """
+        # First check to see if Intelligent Decryption needs to be used;
+        #  if not, do nothing.  The first two characters of an
+        #  intelligently encrypted text will always be "ZX".
+        if self.plaintext[0 : 2] != "ZX":
+            return
+        else:
+            # Parse plaintext for special sequences, and put the result
+            #  in plaintext.
+            self.plaintext = intel.decode(self.plaintext)
+        # end if
+        return
+    # end method
+    
+    def _intelligent_decrypt_stream(self, chunks):
+        """Internal generator that decodes flags in a stream of
+        decrypted text.  Sequences split across chunks are decoded
+        correctly, and the stream is abandoned once the end of the
+        message is found.
+        
+        Called by decrypt_stream.
+        
+        Arguments:
+        - chunks -- an iterable of decrypted text chunks.
+        
+        Returns:  nothing; yields chunks of decoded text.
+        """
+        decoder = intel.Decoder()
+        for chunk in chunks:
+            yield decoder.feed(chunk)
+            if decoder.done:
+                return
+            # end if (generator exits)
+        # end for
+        yield decoder.finish()
         return
     # end method
+    
+    def _intelligent_encrypt(self):
+        """Internal method that inserts flags for decryption.
+        
+        If the user opts for intelligent encryption, this method will
+        insert special sequences for spaces, capital letters, basic
+        punctuation (and itself), using bigrams (2-letter combinations)
+        that rarely occur in English.
+        
+        Arguments:  none.
+        
+        Returns:  nothing.
+        """
+        if not self._use_intelligent():
+            # If no, just exit.
+            return
+        else:
+            # If yes, The first two characters of the decrypted text
+            # will be "ZX", which will trigger _intelligent_decrypt when
+            # it is called.  The message also ends with "ZX".  Any
+            #  characters added by the encryption method are nulls and
+            #  should be discarded by _intelligent_decrpyt.
+            self.plaintext = (
+                intel.MARKER + intel.encode(self.plaintext) + intel.MARKER)
+        # end if
+        return
+    # end method
+    
+    def _key_schedule(self, *key):
+        """Internal method that gets the key schedule for the cipher's
+        keys, from the cache if it has been built before.
+        
+        Arguments:  the cipher's keys.
+        
+        Returns:  the keycache.KeySchedule.
+        """
+        return keycache.get_schedule(type(self), key)
+    # end method
+    
+    def _one_time_pad(self):
+        """Internal method that implements a one-time pad at the
+        user's option.
+        
+        Called by both encrypt and decrypt methods.
+        
+        Arguments:  none.
+        
+        Returns:  nothing.
+        """
+        if (self.options is not None) and self.options.get("pad_file"):
+            pad_code = self._read_pad_file()
+        else:
+            pad_code = self._get_pad_code()
+        # end if
+        if pad_code:
+            self.plaintext = self._apply_pad(self.plaintext, pad_code)
+        # end if
+        return
+    # end method
+    
+    def _read_pad_file(self):
+        """Internal method that reads the pad code for the message from
+        the pad file in the pad_file option.  Encrypting reserves a
+        range of the file that has not been used before, and sets
+        pad_offset to its offset; decrypting reads the range at the
+        pad_offset option.
+        
+        Called by _one_time_pad.
+        
+        Arguments:  none.
+        
+        Returns:  the pad code, as long as the plaintext.
+        """
+        with pads.PadFile(self.options["pad_file"]) as pad_file:
+            self._get_pad_offset(pad_file)
+            return pad_file.read(self.pad_offset, len(self.plaintext))
+        # end with
+    # end method
+    
+    def _split_ciphertext(self, text, size):
+        """Default method that splits ciphertext into pieces that can
+        be decrypted independently -- placeholder
+        
+        Must be overridden by segmented ciphers.
+        """
+        raise NotImplementedError()
+    
+    def _strip_ciphertext(self, text):
+        """Internal method that strips a piece of ciphertext of anything
+        the cipher does not use:  by default, everything but letters
+        and numbers.  The result is upper-case.
+        
+        Called by the streaming methods.
+        
+        Arguments:
+        - text -- the ciphertext.
+        
+        Returns:  the stripped ciphertext.
+        """
+        return self._alphanumeric(text)
+    # end method
+    
+    def _use_intelligent(self):
+        """Internal method that explains intelligent encryption and
+        asks whether the user wants to use it (or reads the intelligent
+        option in headless mode).
+        
+        Called by _intelligent_encrypt and encrypt_stream.
+        
+        Arguments:  none.
+        
+        Returns:  True if intelligent encryption is to be used.
+        """
+        if self.options is not None:
+            return bool(self.options.get("intelligent", False))
+        # end if (method exits)
+        # Clear the screen first.
+        i_o.clear_screen()
+        # Print summary info.
+        print("Cipher: ", self.__str__())
+        print("Action: ", self.mode, "\n")
+        # Print explanation of intelligent encryption.
+        print(
+            "Intelligent Encryption/Decryption:  Under ordinary\n",
+            "circumstances, when a message is encrypted it is turned into\n",
+            "a single string of upper-case text, with all spacing,\n",
+            "punctuation and capitalization removed.  Secret Messages!\n",
+            "can encrypt your message so that flags are inserted to\n",
+            "indicate spacing, punctuation and capitalization, which can\n",
+            "then be restored upon decryption.\n")
+        print(
+            "Note that Intelligent Encryption/Decryption uses the\n",
+            "following letter combinations, which do not occur in\n",
+            "most Roman-alphabet-based languages:  [FQ], [GX], [HX],\n",
+            "[JQ], [JX], [PZ], [QG], [QK], [QY], [QZ], [WQ], [WZ], [XJ],\n",
+            "[ZJ], [ZQ], [ZX].  If your messages contains abbreviations,\n",
+            "code words, model numbers, map coordinates, etc., which may\n",
+            "contain these letter combinations, you should NOT select\n",
+            "Intelligent Encryption/Decryption.\n")
+        # Get the user's choice.
+        return i_o.yes_no("Use Intelligent Encryption?")
+    # end method
+
+
+# The base class's own stages are timed as well.
+profiling.instrument(Cipher)
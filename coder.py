@@ -1,9 +1,26 @@
 """This is the script file for Project 2 of the Treehouse Python
 Techdegree, Secret Messages.
 -----------------------------------------------------------------------
+Run without arguments, the script is interactive.  Run with arguments,
+it encrypts or decrypts a file (or standard input) in one pass, e.g.:
+
+    python coder.py encrypt --cipher hill --key SECRET --in big.txt
+        --out big.enc
+
+Run as "python coder.py serve", it serves encryption and decryption
+over HTTP, as JSON (see service).
+
+Use "python coder.py --help" for the full list of options.
 """
 
+import argparse
+import sys
+
+import formatter
 import i_o
+import layout
+import parallel
+import profiling
 
 from adfgvx import Adfgvx
 from affine import Affine
@@ -11,7 +28,7 @@ from alberti import Alberti
 from atbash import Atbash
 from bifid import Bifid
 from caesar import Caesar
-from hill import Hill
+from hill import Hill, MAX_SIZE
 from keyword_ import Keyword_
 from polybius_square import PolybiusSquare
 from transposition import Transposition
@@ -25,6 +42,173 @@ IMPLEMENTED_CIPHERS = [
     "ADFGVX", "Affine", "Alberti", "Atbash", "Bifid", "Caesar", "Hill",
     "Keyword", "Polybius Square", "Transposition"]
 CIPHER_KEYSTROKES = ["AD", "AF", "AL", "AT", "B", "C", "HI", "K", "P", "T"]
+# The key options each cipher requires, in the order they are given on
+#  the command line.
+CIPHER_KEYS = {
+    "ADFGVX": ["keyword", "perm_key"], "Affine": ["key1", "key2"],
+    "Alberti": ["index_letter"], "Atbash": [], "Bifid": ["keyword", "period"],
+    "Caesar": ["shift"], "Hill": ["keyword", "size"], "Keyword": ["keyword"],
+    "Polybius Square": [], "Transposition": ["width"]}
+# Size of the pieces read from the input in streaming mode.
+STREAM_CHUNK_SIZE = 1 << 16
+# Exit codes for batch mode.
+EXIT_OK = 0
+EXIT_FAILURE = 1
+EXIT_USAGE = 2
+
+
+def run_cipher(action, cipher_name, text, workers=1, **options):
+    """Runs a cipher headless, without prompting the user.
+    
+    Arguments:
+    - action -- "Encrypt" or "Decrypt".
+    - cipher_name -- the name of the cipher (a key of CIPHER_CLASS).
+    - text -- the text to encrypt or decrypt.
+    
+    Named arguments:
+    - workers -- the number of processes to split a long text among
+        (default 1; None for one per CPU).  See parallel.
+    
+    Keyword arguments:  the cipher's keys and options, as described in
+     ciphers.Cipher (e.g. keyword="SECRET", intelligent=True).
+    
+    Returns:  the ciphertext or plaintext.  Raises ValueError if the
+     cipher, a key or the text is invalid.
+    """
+    cipher = _run(action, cipher_name, text, options, workers)
+    if action == "Encrypt":
+        return cipher.ciphertext
+    else:
+        return cipher.plaintext
+    # end if
+# end function
+
+
+def batch(argv):
+    """Runs the script non-interactively, using command line arguments
+    (or runs the network service, if the first is "serve").
+    
+    Arguments:
+    - argv -- the list of command line arguments (without the script
+        name).
+    
+    Returns:  the exit code (EXIT_OK, EXIT_FAILURE or EXIT_USAGE).
+    """
+    if argv[:1] == ["serve"]:
+        # (Imported here, as the service imports this module.)
+        import service
+        return service.main(argv[1:])
+    # end if (function exits)
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    cipher_name = find_cipher(args.cipher)
+    if cipher_name is None:
+        parser.print_usage(sys.stderr)
+        print("coder.py: error: unknown cipher:  " + args.cipher,
+              file=sys.stderr)
+        return EXIT_USAGE
+    # end if (function exits)
+    keys = args.key or []
+    if len(keys) > len(CIPHER_KEYS[cipher_name]):
+        parser.print_usage(sys.stderr)
+        print("coder.py: error: the " + cipher_name + " Cipher takes " +
+              str(len(CIPHER_KEYS[cipher_name])) + " key(s)",
+              file=sys.stderr)
+        return EXIT_USAGE
+    # end if (function exits)
+    options = dict(zip(CIPHER_KEYS[cipher_name], keys))
+    options["intelligent"] = args.intelligent
+    options["pad"] = args.pad
+    options["pad_file"] = args.pad_file
+    options["pad_offset"] = args.pad_offset
+    options["blocks"] = args.blocks
+    options["line_break"] = args.line_break
+    options["block_size"] = args.block_size
+    options["line_width"] = args.line_width
+    action = args.action.capitalize()
+    if args.stream and (args.workers != 1):
+        parser.print_usage(sys.stderr)
+        print("coder.py: error: --stream cannot be used with --workers",
+              file=sys.stderr)
+        return EXIT_USAGE
+    # end if (function exits)
+    if args.timings or args.allocations:
+        profiling.enable(allocations=args.allocations)
+    # end if
+    try:
+        if args.profile:
+            profiling.run_profiled(
+                args.profile, _process, args, action, cipher_name, options)
+        else:
+            _process(args, action, cipher_name, options)
+        # end if
+    except (OSError, ValueError) as err:
+        print("coder.py: error: " + str(err), file=sys.stderr)
+        return EXIT_FAILURE
+    # end try
+    if args.timings or args.allocations:
+        print(profiling.format_report(), file=sys.stderr)
+    # end if
+    return EXIT_OK
+# end function
+
+
+def find_cipher(name):
+    """Finds a cipher by name, ignoring case, spaces, hyphens and
+    underscores (so "polybius-square" finds "Polybius Square").
+    
+    Arguments:
+    - name -- the name to look up.
+    
+    Returns:  the key in CIPHER_CLASS, or None if there is no match.
+    """
+    wanted = name.lower().replace("-", "").replace("_", "").replace(" ", "")
+    for cipher_name in CIPHER_CLASS:
+        if cipher_name.lower().replace(" ", "") == wanted:
+            return cipher_name
+        # end if (function exits)
+    # end for
+    return None
+# end function
+
+
+def stream_cipher(action, cipher_name, chunks, **options):
+    """Runs a cipher headless over a stream of text, yielding the
+    result as it goes.  Only ciphers that work a block at a time (with
+    a block_length, and one character of ciphertext per character of
+    plaintext) can be streamed.
+    
+    Arguments:
+    - action -- "Encrypt" or "Decrypt".
+    - cipher_name -- the name of the cipher (a key of CIPHER_CLASS).
+    - chunks -- an iterable of strings to encrypt or decrypt.
+    
+    Keyword arguments:  the cipher's keys and options, as for
+     run_cipher.
+    
+    Returns:  nothing; yields strings of ciphertext or plaintext.
+     Raises ValueError if the cipher, a key or the text is invalid.
+    """
+    if cipher_name not in CIPHER_CLASS:
+        raise ValueError("Unknown cipher:  " + str(cipher_name))
+    elif action not in ("Encrypt", "Decrypt"):
+        raise ValueError("Unknown action:  " + str(action))
+    # end if
+    cipher = CIPHER_CLASS[cipher_name](action, "", options)
+    try:
+        if action == "Encrypt":
+            yield from cipher.encrypt_stream(chunks)
+        else:
+            yield from cipher.decrypt_stream(chunks)
+        # end if
+    except NotImplementedError:
+        # The cipher (or, e.g., the Bifid Cipher without a period)
+        #  needs the whole message at once.
+        raise ValueError(
+            "The " + cipher_name + " Cipher cannot be streamed.") from None
+    # end try
+    return
+# end function
 
 
 def main():
@@ -77,7 +261,12 @@ def main():
                         print("Process aborted.")
                     # Else print the result.
                     else:
-                        i_o.print_string(output, "Here is your result:  ")
+                        # Decrypted text is wrapped for reading; the
+                        #  ciphertext's lines were already chosen.
+                        i_o.print_string(
+                            output, "Here is your result:  ",
+                            width=i_o.LINE_LENGTH
+                            if action == "Decrypt" else None)
                     # end if
                     # Finished with the instance, so delete it.
                     del cipher
@@ -96,5 +285,234 @@ def main():
     # end function
 
 
+def _build_parser():
+    """Builds the command line parser for batch mode.
+    
+    Arguments:  none.
+    
+    Returns:  an argparse.ArgumentParser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="coder.py",
+        description="Encrypt or decrypt text with one of the Secret " +
+        "Messages! ciphers.  Run without arguments for interactive mode.")
+    parser.add_argument(
+        "action", choices=["encrypt", "decrypt"],
+        help="whether to encrypt or decrypt the input")
+    parser.add_argument(
+        "--cipher", required=True,
+        help="the cipher to use:  " + ", ".join(IMPLEMENTED_CIPHERS) +
+        " (case-insensitive)")
+    parser.add_argument(
+        "--key", action="append",
+        help="a key for the cipher; repeat for ciphers with two keys " +
+        "(ADFGVX: keyword, permutation key; Affine: first, second key " +
+        "number; Alberti: index letter; Bifid: keyword, period, default " +
+        "the whole message; Caesar: shift, default 3; Hill: keyword, " +
+        "matrix size, 2 to " + str(MAX_SIZE) + ", default 3; " +
+        "Transposition: grid width, default 7)")
+    parser.add_argument(
+        "--pad", default="", help="a one-time pad code")
+    parser.add_argument(
+        "--pad-file",
+        help="a pad file to use instead of a pad code; each message " +
+        "uses a fresh part of it, whose offset is printed on encryption")
+    parser.add_argument(
+        "--pad-offset", type=int,
+        help="the pad offset printed when the message was encrypted")
+    parser.add_argument(
+        "--intelligent", action="store_true",
+        help="use intelligent encryption (spaces, capitals, punctuation)")
+    parser.add_argument(
+        "--blocks", action="store_true",
+        help="output the ciphertext in five-character blocks")
+    parser.add_argument(
+        "--line-break", action="store_true",
+        help="break the output into separate lines")
+    parser.add_argument(
+        "--block-size", type=int,
+        help="the length of the blocks (default " +
+        str(formatter.BLOCK_SIZE) + ")")
+    parser.add_argument(
+        "--line-width", type=int,
+        help="the width of the lines (default " +
+        str(formatter.LINE_WIDTH) + ")")
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="process the input a piece at a time, in constant memory " +
+        "(Affine, Atbash, Bifid with a period, Caesar, Hill and Keyword " +
+        "only)")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="split a long input among this many processes (0 for one " +
+        "per CPU; Affine, Atbash, Bifid with a period, Caesar, Hill, " +
+        "Keyword and Polybius Square only, and Alberti decryption)")
+    parser.add_argument(
+        "--timings", action="store_true",
+        help="print the time each stage of the cipher takes, and the " +
+        "characters it reads and writes, to standard error")
+    parser.add_argument(
+        "--allocations", action="store_true",
+        help="with the timings, print the peak memory each stage " +
+        "allocates (slower)")
+    parser.add_argument(
+        "--profile", metavar="FILE",
+        help="profile the run with cProfile, and write the statistics " +
+        "to FILE (for pstats)")
+    parser.add_argument(
+        "--in", dest="infile", default="-",
+        help="the file to read (default standard input)")
+    parser.add_argument(
+        "--out", dest="outfile", default="-",
+        help="the file to write (default standard output)")
+    return parser
+# end function
+
+
+def _process(args, action, cipher_name, options):
+    """Reads the input, runs the cipher over it and writes the output,
+    for batch mode.
+    
+    Arguments:
+    - args -- the parsed command line arguments.
+    - action -- "Encrypt" or "Decrypt".
+    - cipher_name -- the name of the cipher (a key of CIPHER_CLASS).
+    - options -- the dictionary of options for the cipher.
+    
+    Returns:  nothing.
+    """
+    if args.stream:
+        _stream_text(
+            args.infile, args.outfile,
+            lambda chunks: stream_cipher(
+                action, cipher_name, chunks, **options))
+        return
+    # end if (function exits)
+    text = _read_text(args.infile)
+    cipher = _run(action, cipher_name, text, options, args.workers or None)
+    if action == "Encrypt":
+        output = cipher.ciphertext
+        if args.pad_file:
+            # The offset is needed to decrypt the message.
+            print("Pad offset:  " + str(cipher.pad_offset), file=sys.stderr)
+        # end if
+    else:
+        output = cipher.plaintext
+    # end if
+    _write_text(args.outfile, output + "\n")
+    return
+# end function
+
+
+def _read_text(path):
+    """Reads the input text from a file, or from standard input if the
+    path is "-".
+    
+    Arguments:
+    - path -- the file to read.
+    
+    Returns:  the text.
+    """
+    if path == "-":
+        return sys.stdin.read()
+    # end if (function exits)
+    with open(path, encoding="utf-8") as file:
+        return file.read()
+    # end with
+# end function
+
+
+def _run(action, cipher_name, text, options, workers=1):
+    """Creates a cipher object and runs it headless.
+    
+    Arguments:
+    - action -- "Encrypt" or "Decrypt".
+    - cipher_name -- the name of the cipher (a key of CIPHER_CLASS).
+    - text -- the text to encrypt or decrypt.
+    - options -- the dictionary of options for the cipher.
+    
+    Named arguments:
+    - workers -- the number of processes to use (default 1; None for
+        one per CPU).
+    
+    Returns:  the cipher object, with its result set.  Raises
+     ValueError if the cipher, a key or the text is invalid.
+    """
+    if cipher_name not in CIPHER_CLASS:
+        raise ValueError("Unknown cipher:  " + str(cipher_name))
+    elif action not in ("Encrypt", "Decrypt"):
+        raise ValueError("Unknown action:  " + str(action))
+    # end if
+    return parallel.run(
+        CIPHER_CLASS[cipher_name], action, text, options, workers)
+# end function
+
+
+def _stream_text(inpath, outpath, process):
+    """Streams the input through a processing function to the output,
+    a piece at a time.  "-" means standard input or output.
+    
+    Arguments:
+    - inpath -- the file to read.
+    - outpath -- the file to write.
+    - process -- a function that takes an iterable of input strings and
+        yields output strings.
+    
+    Returns:  nothing.
+    """
+    if inpath == "-":
+        infile = sys.stdin
+    else:
+        infile = open(inpath, encoding="utf-8")
+    # end if
+    if outpath == "-":
+        outfile = sys.stdout
+    else:
+        outfile = open(outpath, "w", encoding="utf-8")
+    # end if
+    try:
+        chunks = iter(lambda: infile.read(STREAM_CHUNK_SIZE), "")
+        for output in process(chunks):
+            outfile.write(output)
+        # end for
+        outfile.write("\n")
+        outfile.flush()
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+        # end if
+        if outfile is not sys.stdout:
+            outfile.close()
+        # end if
+    # end try
+    return
+# end function
+
+
+def _write_text(path, text):
+    """Writes the output text to a file, or to standard output if the
+    path is "-".
+    
+    Arguments:
+    - path -- the file to write.
+    - text -- the text to write.
+    
+    Returns:  nothing.
+    """
+    if path == "-":
+        layout.write_text([text])
+    else:
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+        # end with
+    # end if
+    return
+# end function
+
+
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        sys.exit(batch(sys.argv[1:]))
+    else:
+        main()
+    # end if
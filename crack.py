@@ -0,0 +1,1035 @@
+"""This is the key recovery script for Secret Messages!
+-----------------------------------------------------------------------
+It finds the likeliest keys for a ciphertext whose key has been lost,
+by trying every key of the cipher, e.g.:
+
+    python crack.py --cipher caesar --in message.enc --top 3
+
+The Caesar, Affine and Atbash Ciphers have few enough keys (36 shifts,
+11 x 36 pairs of keynumbers, and one) that every one can be tried.
+Each is a substitution of one character for another, so the n-grams of
+the ciphertext are counted once, and every key is scored from the
+counts (see fitness.Table.score_counts) without decrypting anything,
+with the n-gram table in use (see fitness).  A very long ciphertext
+is sampled in a number of evenly spaced windows, so that the cost
+stays bounded.  Keys are ranked by fitness.  A key that
+decrypts the ciphertext to start with "ZX" (the start of an
+intelligently encrypted message) is scored on the decoded start of the
+message instead, since the special sequences are not English, and gets
+a bonus.  (Not an outright win:  with hundreds of keys, one of the
+wrong ones often does too.)  Only the best few keys are used to
+decrypt the whole ciphertext.
+
+The Hill Cipher has far too many keys to try, but a crib (a piece of
+the plaintext) recovers the key matrix by modular linear algebra:  if
+the crib covers as many whole blocks as the matrix has rows, the
+ciphertext of those blocks is the key matrix times the plaintext, and
+the key matrix is the ciphertext times the inverse of the plaintext,
+mod 37.  The crib is tried at every position of the ciphertext.  The
+inverse of the crib's blocks depends only on where the block
+boundaries fall in the crib, so it is found once for each, and each
+entry of the key matrix is then worked out for every position at once,
+with the same byte tables the cipher uses (see hill).  Any more whole
+blocks of the crib rule out most positions straight away; the keys
+left are checked by decrypting the start of the ciphertext (a wrong key
+soon decrypts something to a hyphen, which no plaintext has), and the
+rest ranked by fitness:
+
+    python crack.py --cipher hill --crib "ATTACK AT DAWN" --in hill.enc
+
+The Keyword Cipher is a substitution too, but with far too many keys
+to try; its key is found by hill-climbing instead.  The decryption
+starts from a guess (the letters matched by frequency, or shuffled at
+random), and each pair of letters is swapped in turn, keeping any swap
+that raises the fitness, until no swap does.  The n-grams of the
+ciphertext are counted once; each letter keeps a list of the n-grams
+it is in, so a swap is scored by adding up the change in just those
+n-grams, without decrypting anything.  The climb is restarted from
+several guesses (on a pool of processes, with --workers), and the
+rest are cancelled once one reaches the --threshold fitness.  The
+numbers always end the code alphabet, so only the letters are
+rearranged, and the keyword is read off the start of the alphabet
+found, if the rest of it is in order (after no more than MAX_KEYWORD
+letters; otherwise the alphabet is printed):
+
+    python crack.py --cipher keyword --in keyword.enc --workers 4
+
+The grid width of a Transposition ciphertext is found by decrypting it
+at every width from 2 up (to --max-width) and ranking the decryptions
+by fitness, as for a Caesar key.  The grid depends only on its number
+of rows, so a width that gives the same number as a narrower one is
+skipped.  The widths are tried on a pool of processes, with --workers:
+
+    python crack.py --cipher transposition --in legacy.enc --workers 4
+
+(A larger n-gram table, built with fitness.py, can be given with
+--ngrams; it then scores the decryptions for every cipher.)
+
+    Constants:
+    - KEYWORD_RESTARTS:  The number of guesses the Keyword key is
+       climbed from by default.
+    - MARKER_BONUS:  The bonus added to the fitness of a key that
+       decrypts the ciphertext to start with "ZX".
+    - MAX_KEYWORD:  The most letters a keyword read off a Keyword code
+       alphabet can have.
+    - MAX_WIDTH:  The widest Transposition grid tried by default.
+    - SAMPLE_SIZE:  The most characters of a ciphertext that are
+       counted.
+    - SAMPLE_WINDOWS:  The number of windows a longer ciphertext is
+       sampled in.
+    - TOP:  The number of candidates returned by default.
+    - VERIFY_BLOCKS:  The number of blocks of Hill ciphertext each
+       key is checked on.
+
+    External classes:
+    - Candidate:  A key, its score and its decryption.
+    - HillKey:  A Hill key matrix found from a crib.
+    - KeywordKey:  A Keyword code alphabet found by hill-climbing.
+
+    External functions:
+    - candidate_keys:  Returns every key of a cipher.
+    - crack:  Finds the likeliest keys for a ciphertext.
+    - main:  Runs the script.
+    - solve_hill:  Finds the Hill key matrix from a crib.
+    - solve_keyword:  Finds the Keyword code alphabet by hill-climbing.
+    - solve_transposition:  Finds the Transposition grid width.
+"""
+
+import argparse
+import collections
+import concurrent.futures
+import itertools
+import math
+import multiprocessing
+import operator
+import random
+import sys
+
+import fitness
+import intel
+import tables
+
+from affine import Affine, KEY1_LIST
+from atbash import Atbash
+from caesar import Caesar
+from hill import Hill, MAX_SIZE, MULTIPLY, REDUCE, SIZE, TO_NUMBERS
+from keyword_ import Keyword_
+from transposition import MIN_WIDTH, Transposition
+
+KEYWORD_RESTARTS = 8
+MARKER_BONUS = 0.5
+# Some start of any code alphabet leaves the rest of it in order (at
+#  worst, all but its last letter), so a longer start than this is not
+#  taken for a keyword.
+MAX_KEYWORD = 12
+MAX_WIDTH = 20
+SAMPLE_SIZE = 1 << 16
+SAMPLE_WINDOWS = 16
+TOP = 5
+VERIFY_BLOCKS = 100
+# The ciphers whose keys can be found by trying them all, by name.
+CIPHER_CLASS = {"Affine": Affine, "Atbash": Atbash, "Caesar": Caesar}
+# The positions of the characters that start an intelligently encrypted
+#  message.
+MARKER = tuple(map(fitness.POSITIONS.__getitem__, intel.MARKER))
+# Every pair of letters (by position) a Keyword key can swap.
+LETTER_PAIRS = tuple(itertools.combinations(range(26), 2))
+
+# The fields of a candidate:
+#  - cipher -- the name of the cipher.
+#  - options -- its keys, as options for the cipher (see
+#     ciphers.Cipher).
+#  - score -- the fitness of the decryption (see fitness), with the
+#     bonus if it is marked.
+#  - marked -- whether the decryption starts with "ZX".
+#  - plaintext -- the decryption (intelligently decrypted, if marked).
+Candidate = collections.namedtuple(
+    "Candidate", ["cipher", "options", "score", "marked", "plaintext"])
+# The fields of a Hill key found from a crib:
+#  - matrix -- the key matrix (a list, row by row, as built by
+#     Hill._matrix_from_keyword).
+#  - inverse -- its inverse (as found by Hill._invert_matrix).
+#  - keyword -- a keyword that builds the matrix, or None if there is
+#     none (every entry must be a letter).
+#  - offset -- the position of the crib in the plaintext.
+#  - score -- the fitness of the start of the decryption.
+#  - plaintext -- the decryption.
+HillKey = collections.namedtuple(
+    "HillKey",
+    ["matrix", "inverse", "keyword", "offset", "score", "plaintext"])
+# The fields of a Keyword key found by hill-climbing:
+#  - alphabet -- the code alphabet.
+#  - keyword -- a keyword that builds the alphabet, or None if there is
+#     none of up to MAX_KEYWORD letters.
+#  - score -- the fitness of the (sampled) decryption.
+#  - plaintext -- the decryption (intelligently decrypted, if it was
+#     intelligently encrypted).
+KeywordKey = collections.namedtuple(
+    "KeywordKey", ["alphabet", "keyword", "score", "plaintext"])
+
+# The climber of this process (set in worker processes only), and the
+#  event that tells it to stop.
+_climber = None
+_stop = None
+# The ciphertext the widths are scored on (set in worker processes
+#  only).
+_text = None
+
+
+class _Climber:
+
+    """This class climbs to the best substitution for the n-gram counts
+    of a ciphertext.  A substitution (or key) is a list of 36
+    positions:  the plaintext character for each character of the
+    alphabet (see fitness.Table.score_counts).
+    """
+
+    def __init__(self, counts, table):
+        """Sorts the n-grams of the ciphertext by letter.
+
+        Arguments:
+        - counts -- the n-gram counts of the ciphertext (see
+            fitness.Table.counts).
+        - table -- the fitness.Table they were counted for.
+        """
+        self.log_probs = table.log_probs
+        self.counts = list(counts.values())
+        self.total = sum(self.counts)
+        # The positions of the characters of each n-gram.
+        self.grams = []
+        for code in counts:
+            positions = []
+            for _ in range(table.order):
+                code, num = divmod(code, 36)
+                positions.append(num)
+            # end for
+            self.grams.append(tuple(reversed(positions)))
+        # end for
+        # The n-grams (by index) each character is in.
+        self.by_char = [[] for _ in range(36)]
+        for index, positions in enumerate(self.grams):
+            for num in set(positions):
+                self.by_char[num].append(index)
+            # end for
+        # end for
+    # end method
+
+    def climb(self, key, stop=None):
+        """Climbs from a key:  swaps each pair of letters in turn,
+        keeping every swap that raises the fitness, until none does.
+
+        Arguments:
+        - key -- the key to start from.
+
+        Named arguments:
+        - stop -- an event that ends the climb early when set (default
+            None).
+
+        Returns:  the fitness of the key reached, and the key.
+        """
+        key = list(key)
+        log_probs = self.log_probs
+        counts = self.counts
+        grams = self.grams
+        # The plaintext number of each n-gram, under the key.
+        codes = [self._code(key, positions) for positions in grams]
+        score = sum(map(
+            operator.mul, map(log_probs.__getitem__, codes), counts))
+        improved = True
+        while improved and not (stop is not None and stop.is_set()):
+            improved = False
+            for first, second in LETTER_PAIRS:
+                key[first], key[second] = key[second], key[first]
+                changes = []
+                delta = 0
+                for index in set(self.by_char[first]).union(
+                        self.by_char[second]):
+                    code = self._code(key, grams[index])
+                    delta += (log_probs[code] -
+                              log_probs[codes[index]]) * counts[index]
+                    changes.append((index, code))
+                # end for
+                if delta > 0:
+                    score += delta
+                    for index, code in changes:
+                        codes[index] = code
+                    # end for
+                    improved = True
+                else:
+                    key[first], key[second] = key[second], key[first]
+                # end if
+            # end for
+        # end while
+        if self.total == 0:
+            return -math.inf, key
+        # end if (method exits)
+        return score / self.total, key
+    # end method
+
+    @staticmethod
+    def _code(key, positions):
+        """Internal method that works out the plaintext number of an
+        n-gram.
+
+        Arguments:
+        - key -- the key.
+        - positions -- the positions of the n-gram's ciphertext
+            characters.
+
+        Returns:  the number.
+        """
+        code = 0
+        for num in positions:
+            code = code * 36 + key[num]
+        # end for
+        return code
+    # end method
+
+
+def candidate_keys(cipher_name):
+    """Returns every key of a cipher, with the substitution that
+    decrypts it.
+
+    Arguments:
+    - cipher_name -- the name of the cipher (a key of CIPHER_CLASS).
+
+    Returns:  a list of (options, substitution) pairs.  Each
+     substitution is a list of 36 positions:  the plaintext character
+     for each character of the alphabet (see fitness.Table.score_counts).
+    """
+    if cipher_name == "Caesar":
+        return [({"shift": shift}, [(num - shift) % 36 for num in range(36)])
+                for shift in range(36)]
+    elif cipher_name == "Atbash":
+        return [({}, [35 - num for num in range(36)])]
+    # end if (function exits)
+    keys = []
+    for key1 in KEY1_LIST:
+        # Decrypting multiplies by the inverse of the first key.
+        inverse = pow(key1, -1, 36)
+        for key2 in range(36):
+            keys.append((
+                {"key1": key1, "key2": key2},
+                [(inverse * (num - key2)) % 36 for num in range(36)]))
+        # end for
+    # end for
+    return keys
+# end function
+
+
+def crack(cipher_name, ciphertext, top=TOP):
+    """Finds the likeliest keys for a ciphertext.
+
+    Arguments:
+    - cipher_name -- the name of the cipher (a key of CIPHER_CLASS).
+    - ciphertext -- the ciphertext (in blocks and lines, or not).
+
+    Named arguments:
+    - top -- the number of candidates to return (default TOP).
+
+    Returns:  a list of the best Candidates, best first (empty if the
+     ciphertext has no letters or numbers).
+    """
+    cipher_class = CIPHER_CLASS[cipher_name]
+    cipher = cipher_class("Decrypt", ciphertext, {})
+    cipher._block_input()
+    text = cipher.ciphertext
+    if not text:
+        return []
+    # end if (function exits)
+    table = fitness.table()
+    windows = _sample(text)
+    counts = collections.Counter()
+    for window in windows:
+        counts.update(table.counts(window, skip_escapes=False))
+    # end for
+    start = tuple(map(fitness.POSITIONS.__getitem__, text[:2]))
+    ranked = []
+    for options, substitution in candidate_keys(cipher_name):
+        marked = tuple(substitution[num] for num in start) == MARKER
+        if marked:
+            score = _score_marked(
+                cipher, windows[0], substitution) + MARKER_BONUS
+        else:
+            score = table.score_counts(counts, substitution)
+        # end if
+        ranked.append((score, marked, options))
+    # end for
+    ranked.sort(key=lambda candidate: candidate[0], reverse=True)
+    candidates = []
+    for score, marked, options in ranked[:top]:
+        cipher = cipher_class("Decrypt", text, options)
+        cipher.decrypt()
+        candidates.append(Candidate(
+            cipher_name, options, score, marked, cipher.plaintext))
+    # end for
+    return candidates
+# end function
+
+
+def main(argv):
+    """Finds the likeliest keys for a ciphertext, and prints them with
+    the start of each decryption.
+
+    Arguments:
+    - argv -- the list of command line arguments (without the script
+        name).
+
+    Returns:  the exit code (0 for success, 1 if the input or the
+     n-gram table cannot be read or the input is empty, 2 for usage
+     errors).
+    """
+    parser = argparse.ArgumentParser(
+        prog="crack.py",
+        description="Find the likeliest keys for a ciphertext.")
+    parser.add_argument(
+        "--cipher", required=True, type=str.capitalize,
+        choices=sorted(
+            list(CIPHER_CLASS) + ["Hill", "Keyword", "Transposition"]),
+        help="the cipher used")
+    parser.add_argument(
+        "--in", dest="infile", default="-",
+        help="the ciphertext file (default -, for standard input)")
+    parser.add_argument(
+        "--top", type=int, default=TOP,
+        help="the number of keys to print (default " + str(TOP) + ")")
+    parser.add_argument(
+        "--crib", help="a piece of the plaintext (Hill only, required)")
+    parser.add_argument(
+        "--size", type=int, default=SIZE,
+        help="the size of the Hill key matrix, 2 to " + str(MAX_SIZE) +
+        " (default " + str(SIZE) + ")")
+    parser.add_argument(
+        "--restarts", type=int, default=KEYWORD_RESTARTS,
+        help="the number of guesses to climb from (Keyword only; default " +
+        str(KEYWORD_RESTARTS) + ")")
+    parser.add_argument(
+        "--threshold", type=float,
+        help="a fitness to stop climbing at (Keyword only; default none)")
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="the number of processes to use (Keyword and Transposition "
+        "only; default 1)")
+    parser.add_argument(
+        "--max-width", type=int, default=MAX_WIDTH,
+        help="the widest grid to try (Transposition only; default " +
+        str(MAX_WIDTH) + ")")
+    parser.add_argument(
+        "--ngrams",
+        help="an n-gram table to score every decryption with (see "
+        "fitness.py; default the built-in bigrams)")
+    args = parser.parse_args(argv)
+    if (args.cipher == "Hill") and not args.crib:
+        parser.print_usage(sys.stderr)
+        print("crack.py: error: the Hill Cipher needs --crib",
+              file=sys.stderr)
+        return 2
+    elif not 2 <= args.size <= MAX_SIZE:
+        parser.print_usage(sys.stderr)
+        print("crack.py: error: --size must be from 2 to " +
+              str(MAX_SIZE), file=sys.stderr)
+        return 2
+    elif (args.restarts < 1) or (args.workers < 1):
+        parser.print_usage(sys.stderr)
+        print("crack.py: error: --restarts and --workers must be at least 1",
+              file=sys.stderr)
+        return 2
+    # end if (function exits)
+    try:
+        if args.infile == "-":
+            ciphertext = sys.stdin.read()
+        else:
+            with open(args.infile, encoding="utf-8") as file:
+                ciphertext = file.read()
+            # end with
+        # end if
+        if args.ngrams:
+            fitness.use(fitness.load(args.ngrams))
+        # end if
+    except (OSError, ValueError) as err:
+        print("crack.py: error: " + str(err), file=sys.stderr)
+        return 1
+    # end try (function exits)
+    if not fitness.NOT_ALPHANUM.sub("", ciphertext.upper()):
+        print("crack.py: error: the ciphertext has no letters or numbers",
+              file=sys.stderr)
+        return 1
+    # end if (function exits)
+    if args.cipher == "Hill":
+        for hill_key in solve_hill(
+                ciphertext, args.crib, size=args.size, top=args.top):
+            print("%.4f  %s  offset %d  %s" % (
+                hill_key.score, hill_key.keyword or hill_key.matrix,
+                hill_key.offset, hill_key.plaintext[:60].replace("\n", " ")))
+        # end for
+        return 0
+    elif args.cipher == "Keyword":
+        for keyword_key in solve_keyword(
+                ciphertext, restarts=args.restarts,
+                threshold=args.threshold, workers=args.workers,
+                top=args.top):
+            print("%.4f  %s  %s" % (
+                keyword_key.score, keyword_key.keyword or
+                keyword_key.alphabet,
+                keyword_key.plaintext[:60].replace("\n", " ")))
+        # end for
+        return 0
+    # end if (function exits)
+    if args.cipher == "Transposition":
+        candidates = solve_transposition(
+            ciphertext, max_width=args.max_width, workers=args.workers,
+            top=args.top)
+    else:
+        candidates = crack(args.cipher, ciphertext, top=args.top)
+    # end if
+    for candidate in candidates:
+        keys = ", ".join(
+            key + "=" + str(value)
+            for key, value in sorted(candidate.options.items()))
+        print("%.4f  %s  %s" % (
+            candidate.score, keys or "(no key)",
+            candidate.plaintext[:60].replace("\n", " ")))
+    # end for
+    return 0
+# end function
+
+
+def _hill_candidates(numbers, crib, size, phase):
+    """Internal function that finds the key matrices that would
+    encrypt a crib to the ciphertext at every position where the block
+    boundaries fall phase characters into the crib.
+
+    Arguments:
+    - numbers -- the ciphertext, as numbers (a bytes object).
+    - crib -- the crib, as numbers.
+    - size -- the size of the matrix.
+    - phase -- the position of the first block boundary in the crib.
+
+    Returns:  a list of (offset, matrix) pairs, where offset is the
+     position of the crib in the plaintext, for each position the whole
+     crib agrees with.
+    """
+    crib_blocks = [crib[pos:pos + size]
+                   for pos in range(phase, len(crib) - size + 1, size)]
+    # The crib's first block is in the ciphertext's first block, or its
+    #  second if the crib starts partway into a block; and all of the
+    #  crib must fit in the ciphertext.
+    first = 1 if phase else 0
+    count = (len(numbers) + phase - len(crib)) // size - first + 1
+    if count <= 0:
+        return []
+    # end if (function exits)
+    # Find size consecutive blocks of the crib whose matrix (a block to
+    #  a column) has an inverse.
+    for base in range(len(crib_blocks) - size + 1):
+        inverse = Hill._invert_matrix(
+            [crib_blocks[base + col][row] for row in range(size)
+             for col in range(size)], size, 37)
+        if inverse is not None:
+            break
+        # end if
+    else:
+        return []
+    # end for (function exits)
+    # blocks[row][num] holds the row-th character of the ciphertext
+    #  block under the num-th block of the crib, for every position.
+    columns = [numbers[row::size] for row in range(size)]
+    blocks = [[column[first + num:first + num + count]
+               for num in range(len(crib_blocks))] for column in columns]
+    # Each entry of the key matrix, for every position:  the row of the
+    #  ciphertext blocks times the column of the inverse.
+    matrix = [[_combine(
+        blocks[row][base:base + size],
+        [inverse[num * size + col] for num in range(size)])
+        for col in range(size)] for row in range(size)]
+    # Any other blocks of the crib must encrypt to the ciphertext too.
+    alive = b"\x01" * count
+    for num, block in enumerate(crib_blocks):
+        if base <= num < base + size:
+            continue
+        # end if
+        for row in range(size):
+            alive = bytes(map(operator.and_, alive, map(
+                operator.eq, _combine(matrix[row], block),
+                blocks[row][num])))
+        # end for
+    # end for
+    return [((first + pos) * size - phase,
+             [matrix[row][col][pos] for row in range(size)
+              for col in range(size)])
+            for pos in itertools.compress(range(count), alive)]
+# end function
+
+
+def _score_marked(cipher, window, substitution):
+    """Internal function that scores a key that decrypts a ciphertext
+    to start with "ZX":  the first window of the ciphertext is
+    decrypted, decoded as an intelligently encrypted message, and
+    scored without its spaces and punctuation.
+
+    Arguments:
+    - cipher -- a cipher object (to format the decoded text).
+    - window -- the first window of the ciphertext.
+    - substitution -- the substitution that decrypts it (see
+        candidate_keys).
+
+    Returns:  the fitness of the decoded text.
+    """
+    table = tables.substitution_table(
+        tables.ALPHANUM,
+        "".join(tables.ALPHANUM[num] for num in substitution))
+    return fitness.score(cipher._alphanumeric(
+        intel.decode(tables.translate(window, table))))
+# end function
+
+
+def _score_width(width, text=None):
+    """Internal function that scores the decryption of a Transposition
+    ciphertext at one grid width.  A decryption that starts with "ZX"
+    gets the bonus.
+
+    Arguments:
+    - width -- the width of the grid.
+
+    Named arguments:
+    - text -- the ciphertext (default None, for the one a worker
+        process was set up with).
+
+    Returns:  the fitness of a sample of the decryption, and whether it
+     starts with "ZX".
+    """
+    if text is None:
+        text = _text
+    # end if
+    decoder = Transposition("Decrypt", "", {"width": width})
+    decoder._get_keys()
+    plaintext = decoder._decrypt_text(text)
+    marked = plaintext.startswith(intel.MARKER)
+    score = fitness.score("".join(_sample(plaintext)))
+    if marked:
+        score += MARKER_BONUS
+    # end if
+    return score, marked
+# end function
+
+
+def solve_hill(ciphertext, crib, size=SIZE, top=TOP):
+    """Finds the key matrix of a Hill ciphertext from a crib, tried at
+    every position of the message.
+
+    Arguments:
+    - ciphertext -- the ciphertext (in blocks and lines, or not).
+    - crib -- a piece of the plaintext.  Once its spaces and
+        punctuation are taken out, it must cover size whole blocks:
+        size x (size + 1) - 1 characters are always enough.  One more
+        block (size x (size + 2) - 1 characters) rules out wrong
+        positions far faster.
+
+    Named arguments:
+    - size -- the size of the key matrix (default SIZE).
+    - top -- the number of keys to return (default TOP).
+
+    Returns:  a list of the best HillKeys, best first (empty if the
+     crib fits nowhere).
+    """
+    decoder = Hill("Decrypt", ciphertext, {})
+    decoder._block_input()
+    text = decoder.ciphertext
+    text = text[:len(text) - (len(text) % size)]
+    numbers = text.encode("ascii").translate(TO_NUMBERS)
+    crib = decoder._alphanumeric(crib).encode("ascii").translate(TO_NUMBERS)
+    # The key matrix is used as it is found, rather than built from a
+    #  keyword.
+    decoder.size = size
+    decoder.block_length = size
+    sample = text[:VERIFY_BLOCKS * size]
+    keys = {}
+    for phase in range(size):
+        for offset, matrix in _hill_candidates(numbers, crib, size, phase):
+            if tuple(matrix) in keys:
+                continue
+            # end if
+            inverse = Hill._invert_matrix(matrix, size, 37)
+            if inverse is None:
+                continue
+            # end if
+            decoder.matrix = inverse
+            plaintext = decoder._decrypt_text(sample)
+            if "-" not in plaintext:
+                keys[tuple(matrix)] = (
+                    fitness.score(plaintext), offset, inverse)
+            # end if
+        # end for
+    # end for
+    ranked = sorted(keys.items(), key=lambda key: key[1][0], reverse=True)
+    hill_keys = []
+    for matrix, (score, offset, inverse) in ranked[:top]:
+        decoder.matrix = inverse
+        decoder.plaintext = decoder._decrypt_final(
+            decoder._decrypt_text(text))
+        decoder._intelligent_decrypt()
+        keyword = None
+        if max(matrix) < 26:
+            keyword = "".join(tables.ALPHANUM[num] for num in matrix)
+        # end if
+        hill_keys.append(HillKey(
+            list(matrix), inverse, keyword, offset, score,
+            decoder.plaintext))
+    # end for
+    return hill_keys
+# end function
+
+
+def solve_keyword(ciphertext, restarts=KEYWORD_RESTARTS, threshold=None,
+                  workers=1, top=TOP, seed=None):
+    """Finds the code alphabet of a Keyword ciphertext by hill-climbing
+    from several guesses.
+
+    Arguments:
+    - ciphertext -- the ciphertext (in blocks and lines, or not).
+
+    Named arguments:
+    - restarts -- the number of guesses to climb from (default
+        KEYWORD_RESTARTS).  The first matches the letters by
+        frequency; the rest are shuffled at random.
+    - threshold -- a fitness good enough to stop at:  once a climb
+        reaches it, the climbs not yet finished are cancelled (default
+        None, to finish them all).
+    - workers -- the number of processes to climb on (default 1).
+    - top -- the number of alphabets to return (default TOP).
+    - seed -- the seed for the random guesses (default None).
+
+    Returns:  a list of the best KeywordKeys, best first (empty if the
+     ciphertext has no letters or numbers).
+    """
+    decoder = Keyword_("Decrypt", ciphertext, {})
+    decoder._block_input()
+    text = decoder.ciphertext
+    if not text:
+        return []
+    # end if (function exits)
+    table = fitness.table()
+    windows = _sample(text)
+    counts = collections.Counter()
+    for window in windows:
+        counts.update(table.counts(window, skip_escapes=False))
+    # end for
+    letters = collections.Counter()
+    for window in windows:
+        letters.update(window)
+    # end for
+    rng = random.Random(seed)
+    keys = [_frequency_key(letters)]
+    for _ in range(restarts - 1):
+        key = list(range(26))
+        rng.shuffle(key)
+        keys.append(key + list(range(26, 36)))
+    # end for
+    if workers < 2:
+        climber = _Climber(counts, table)
+        results = []
+        for key in keys:
+            results.append(climber.climb(key))
+            if (threshold is not None) and (results[-1][0] >= threshold):
+                break
+            # end if
+        # end for
+    else:
+        results = _climb_parallel(counts, table, keys, threshold, workers)
+    # end if
+    # Different climbs often reach the same alphabet (keys that differ
+    #  only in letters the ciphertext does not have give the same one).
+    best = {}
+    for score, key in results:
+        alphabet = _alphabet_from_key(key, letters)
+        best[alphabet] = max(score, best.get(alphabet, score))
+    # end for
+    ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+    keyword_keys = []
+    for alphabet, score in ranked[:top]:
+        decoder.table = tables.substitution_table(alphabet, tables.ALPHANUM)
+        decoder.plaintext = decoder._decrypt_text(text)
+        decoder._intelligent_decrypt()
+        keyword_keys.append(KeywordKey(
+            alphabet, _keyword_from_alphabet(alphabet), score,
+            decoder.plaintext))
+    # end for
+    return keyword_keys
+# end function
+
+
+def solve_transposition(ciphertext, max_width=MAX_WIDTH, workers=1, top=TOP):
+    """Finds the grid width of a Transposition ciphertext by trying
+    every width.
+
+    Arguments:
+    - ciphertext -- the ciphertext (in blocks and lines, or not).
+
+    Named arguments:
+    - max_width -- the widest grid to try (default MAX_WIDTH).
+    - workers -- the number of processes to try the widths on (default
+        1).
+    - top -- the number of candidates to return (default TOP).
+
+    Returns:  a list of the best Candidates, best first.
+    """
+    decoder = Transposition("Decrypt", ciphertext, {})
+    decoder._block_input()
+    text = decoder.ciphertext
+    if not text:
+        return []
+    # end if (function exits)
+    # Widths that give the grid the same number of rows give the same
+    #  grid; only the narrowest is tried.
+    widths = {}
+    for width in range(MIN_WIDTH, max(max_width, MIN_WIDTH) + 1):
+        widths.setdefault(max(-(-len(text) // width), 1), width)
+    # end for
+    widths = sorted(widths.values())
+    if workers < 2:
+        scores = [_score_width(width, text) for width in widths]
+    else:
+        table = fitness.table()
+        block = None if table is fitness.DEFAULT else table.share()
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                    workers, initializer=_start_scorer,
+                    initargs=(text, block and block.name)) as executor:
+                scores = list(executor.map(_score_width, widths))
+            # end with
+        finally:
+            if block is not None:
+                block.close()
+                block.unlink()
+            # end if
+        # end try
+    # end if
+    ranked = sorted(zip(scores, widths), key=lambda item: item[0][0],
+                    reverse=True)
+    candidates = []
+    for (score, marked), width in ranked[:top]:
+        cipher = Transposition("Decrypt", text, {"width": width})
+        cipher.decrypt()
+        candidates.append(Candidate(
+            "Transposition", {"width": width}, score, marked,
+            cipher.plaintext))
+    # end for
+    return candidates
+# end function
+
+
+def _alphabet_from_key(key, letters):
+    """Internal function that turns a key into a code alphabet.  The
+    letters that never occur in the ciphertext could go anywhere among
+    themselves, so they are put in order, as they are at the end of an
+    alphabet built from a keyword.
+
+    Arguments:
+    - key -- the key (see _Climber).
+    - letters -- the counts of the characters of the ciphertext.
+
+    Returns:  the code alphabet.
+    """
+    # The code alphabet has the ciphertext character for each plaintext
+    #  character.
+    alphabet = [""] * 36
+    for num, plain in enumerate(key):
+        alphabet[plain] = tables.ALPHANUM[num]
+    # end for
+    unseen = [pos for pos in range(26) if alphabet[pos] not in letters]
+    for pos, char in zip(unseen, sorted(alphabet[pos] for pos in unseen)):
+        alphabet[pos] = char
+    # end for
+    return "".join(alphabet)
+# end function
+
+
+def _climb(key):
+    """Climbs from a key in a worker process.
+
+    Arguments:  as for _Climber.climb.
+
+    Returns:  the fitness of the key reached, and the key.
+    """
+    return _climber.climb(key, _stop)
+# end function
+
+
+def _climb_parallel(counts, table, keys, threshold, workers):
+    """Internal function that climbs from several keys on a pool of
+    processes.  Once a climb reaches the threshold, the rest are
+    cancelled (or stopped where they are).
+
+    Arguments:
+    - counts -- the n-gram counts of the ciphertext.
+    - table -- the fitness.Table they were counted for.
+    - keys -- the keys to climb from.
+    - threshold -- the fitness to stop at (or None).
+    - workers -- the number of processes.
+
+    Returns:  a list of the fitness and key each climb reached.
+    """
+    stop = multiprocessing.Event()
+    # A table other than the built-in one is put in shared memory once,
+    #  for every worker to read.
+    block = None if table is fitness.DEFAULT else table.share()
+    results = []
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+                workers, initializer=_start_climber,
+                initargs=(counts, block and block.name, stop)) as executor:
+            futures = [executor.submit(_climb, key) for key in keys]
+            for future in concurrent.futures.as_completed(futures):
+                if future.cancelled():
+                    continue
+                # end if
+                results.append(future.result())
+                if (threshold is not None) and (
+                        results[-1][0] >= threshold):
+                    stop.set()
+                    for pending in futures:
+                        pending.cancel()
+                    # end for
+                # end if
+            # end for
+        # end with
+    finally:
+        if block is not None:
+            block.close()
+            block.unlink()
+        # end if
+    # end try
+    return results
+# end function
+
+
+def _combine(arrays, factors):
+    """Internal function that multiplies arrays of numbers by factors
+    and adds them up, mod 37, entry by entry.
+
+    Arguments:
+    - arrays -- a list of bytes objects, all the same length.
+    - factors -- a list of numbers (0-36), one for each array.
+
+    Returns:  the sums (a bytes object).
+    """
+    totals = arrays[0].translate(MULTIPLY[factors[0]])
+    for array, factor in zip(arrays[1:], factors[1:]):
+        # Reduce after every sum, so that it always fits in a byte.
+        totals = bytes(map(
+            operator.add, totals, array.translate(MULTIPLY[factor]))
+            ).translate(REDUCE)
+    # end for
+    return totals
+# end function
+
+
+def _frequency_key(letters):
+    """Internal function that guesses a key by matching the letters of
+    the ciphertext, commonest first, with the letters of English.
+
+    Arguments:
+    - letters -- the counts of the characters of the ciphertext.
+
+    Returns:  the key (see _Climber).
+    """
+    english = sorted(range(26), key=lambda num: -fitness.LETTER_FREQUENCIES[
+        tables.ALPHANUM[num]])
+    cipher = sorted(range(26), key=lambda num: -letters[tables.ALPHANUM[num]])
+    key = list(range(36))
+    for cipher_num, plain_num in zip(cipher, english):
+        key[cipher_num] = plain_num
+    # end for
+    return key
+# end function
+
+
+def _keyword_from_alphabet(alphabet):
+    """Internal function that reads the keyword off a code alphabet:
+    the shortest start of it after which the rest of the letters are
+    in order.
+
+    Arguments:
+    - alphabet -- the code alphabet.
+
+    Returns:  the keyword, or None if the alphabet was not built from
+     one of up to MAX_KEYWORD letters.
+    """
+    if alphabet[26:] != tables.ALPHANUM[26:]:
+        return None
+    # end if (function exits)
+    for length in range(MAX_KEYWORD + 1):
+        if list(alphabet[length:26]) == sorted(alphabet[length:26]):
+            return alphabet[:length]
+        # end if (function exits)
+    # end for
+    return None
+# end function
+
+
+def _sample(text):
+    """Internal function that samples a long ciphertext:  a text of up
+    to SAMPLE_SIZE characters is used whole; a longer one is cut into
+    SAMPLE_WINDOWS evenly spaced windows (the first at the start),
+    SAMPLE_SIZE characters in all.
+
+    Arguments:
+    - text -- the ciphertext.
+
+    Returns:  a list of the windows.
+    """
+    if len(text) <= SAMPLE_SIZE:
+        return [text]
+    # end if (function exits)
+    window = SAMPLE_SIZE // SAMPLE_WINDOWS
+    step = (len(text) - window) // (SAMPLE_WINDOWS - 1)
+    return [text[pos:pos + window]
+            for pos in range(0, step * SAMPLE_WINDOWS, step)]
+# end function
+
+
+def _start_climber(counts, table_name, stop):
+    """Sets up a worker process for hill-climbing.
+
+    Arguments:
+    - counts -- the n-gram counts of the ciphertext.
+    - table_name -- the name of the shared memory holding the table
+        they were counted for, or None for the built-in table.
+    - stop -- the event that tells the climbs to stop.
+
+    Returns:  nothing.
+    """
+    global _climber, _stop
+    if table_name is None:
+        table = fitness.DEFAULT
+    else:
+        table = fitness.attach(table_name)
+    # end if
+    _climber = _Climber(counts, table)
+    _stop = stop
+    return
+# end function
+
+
+def _start_scorer(text, table_name):
+    """Sets up a worker process for scoring Transposition widths.
+
+    Arguments:
+    - text -- the ciphertext.
+    - table_name -- the name of the shared memory holding the n-gram
+        table to score with, or None for the built-in table.
+
+    Returns:  nothing.
+    """
+    global _text
+    _text = text
+    if table_name is not None:
+        fitness.use(fitness.attach(table_name))
+    # end if
+    return
+# end function
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
+# end if
@@ -0,0 +1,589 @@
+"""This module scores text by how much it looks like English.
+
+A text's fitness is the average log (base 10) probability of its
+n-grams (runs of n adjacent characters), over the 36 characters of the
+cipher alphabet, as found in English text with the spaces and
+punctuation taken out.  The better a candidate decryption, the higher
+(closer to zero) its fitness.  N-grams that include one of the special
+sequences of intelligent encryption ("ZX" and "GX") are skipped, since
+no English text has them.
+
+The log probabilities are kept in a table:  a dense array of floats,
+indexed by the number of each n-gram in base 36 (the position of its
+first character in the alphabet times 36 to the n-1, and so on).  A
+bigram table of the commonest English bigrams is built in (DEFAULT).
+Larger tables (of trigrams or quadgrams, say) are built from a corpus
+of English text and saved to a file:
+
+    python fitness.py --order 4 --out english.ngrams book1.txt book2.txt
+
+A saved table is loaded by memory-mapping the file, so it is read only
+as it is used, and a table can also be copied once into shared memory,
+where any number of worker processes can attach to the same copy (see
+Table.share and attach).
+
+Scoring is done a whole text at a time:  the text is turned into bytes
+of numbers with a translation table, the numbers of its n-grams are
+built from shifted copies of them with map, and their log
+probabilities are summed in one more pass.
+
+    Constants:
+    - LETTER_FREQUENCIES:  The frequency of each character in English,
+       in percent.
+    - BIGRAM_FREQUENCIES:  The frequency of the commonest bigrams in
+       English, in percent.
+    - DEFAULT:  The built-in bigram table.
+
+    External classes:
+    - Table:  A table of n-gram log probabilities.
+
+    External functions:
+    - attach:  Returns a table that is in shared memory.
+    - build:  Builds a table from a corpus.
+    - load:  Loads a table from a file.
+    - main:  Builds a table from the command line.
+    - score:  Returns the fitness of a text, using the table in use.
+    - table:  Returns the table in use.
+    - use:  Sets the table in use.
+"""
+
+import argparse
+import array
+import collections
+import math
+import mmap
+import multiprocessing.util
+import operator
+import re
+import struct
+import sys
+
+from multiprocessing import shared_memory
+
+import tables
+
+ALPHANUM = tables.ALPHANUM
+LETTER_FREQUENCIES = {
+    "A": 8.17, "B": 1.29, "C": 2.78, "D": 4.25, "E": 12.70, "F": 2.23,
+    "G": 2.02, "H": 6.09, "I": 6.97, "J": 0.15, "K": 0.77, "L": 4.03,
+    "M": 2.41, "N": 6.75, "O": 7.51, "P": 1.93, "Q": 0.10, "R": 5.99,
+    "S": 6.33, "T": 9.06, "U": 2.76, "V": 0.98, "W": 2.36, "X": 0.15,
+    "Y": 1.97, "Z": 0.07, "0": 0.05, "1": 0.05, "2": 0.05, "3": 0.05,
+    "4": 0.05, "5": 0.05, "6": 0.05, "7": 0.05, "8": 0.05, "9": 0.05}
+BIGRAM_FREQUENCIES = {
+    "TH": 3.56, "HE": 3.07, "IN": 2.43, "ER": 2.05, "AN": 1.99,
+    "RE": 1.85, "ON": 1.76, "AT": 1.49, "EN": 1.45, "ND": 1.35,
+    "TI": 1.34, "ES": 1.34, "OR": 1.28, "TE": 1.20, "OF": 1.17,
+    "ED": 1.17, "IS": 1.13, "IT": 1.12, "AL": 1.09, "AR": 1.07,
+    "ST": 1.05, "TO": 1.05, "NT": 1.04, "NG": 0.95, "SE": 0.93,
+    "HA": 0.93, "AS": 0.87, "OU": 0.87, "IO": 0.83, "LE": 0.83,
+    "VE": 0.83, "CO": 0.79, "ME": 0.79, "DE": 0.76, "HI": 0.76,
+    "RI": 0.73, "RO": 0.73, "IC": 0.70, "NE": 0.69, "EA": 0.69,
+    "RA": 0.69, "CE": 0.65, "LI": 0.62, "CH": 0.60, "LL": 0.58,
+    "BE": 0.58, "MA": 0.57, "SI": 0.55, "OM": 0.55, "UR": 0.54}
+# Turns each character of the alphabet into its position.
+POSITIONS = dict(zip(ALPHANUM, range(36)))
+NOT_ALPHANUM = re.compile("[^" + ALPHANUM + "]+")
+# Finds the start of every special sequence (overlapping or not).
+ESCAPE_PATTERN = re.compile("(?=ZX|GX)")
+# A table file starts with a header of a magic string, the order of
+#  the n-grams and the number of entries, followed by the entries as
+#  little-endian 32-bit floats.
+MAGIC = b"SMNG"
+HEADER = struct.Struct("<4sII")
+# An n-gram the corpus does not have counts as this fraction of one
+#  occurrence.
+UNSEEN = 0.01
+MAX_ORDER = 5
+
+
+class Table:
+
+    """This class holds the log probabilities of the n-grams of one
+    order, by number.
+
+    Methods:
+    - close:  Releases the file or shared memory behind the table.
+    - counts:  Counts the n-grams of a text.
+    - save:  Saves the table to a file.
+    - score:  Returns the fitness of a text.
+    - score_counts:  Returns the fitness of a text from its n-gram
+       counts, under a substitution.
+    - share:  Copies the table into shared memory.
+    """
+
+    def __init__(self, order, log_probs, source=None):
+        """Sets up the table.
+
+        Arguments:
+        - order -- the length of the n-grams.
+        - log_probs -- a sequence of 36 to the order floats.
+
+        Named arguments:
+        - source -- the mmap or SharedMemory the log probabilities are
+            a view of, if any (default None).
+        """
+        self.order = order
+        self.log_probs = log_probs
+        self._source = source
+    # end method
+
+    def close(self):
+        """Releases the file or shared memory the table is a view of,
+        if any.  The table cannot be used afterwards.
+
+        Arguments:  none.
+
+        Returns:  nothing.
+        """
+        if isinstance(self.log_probs, memoryview):
+            self.log_probs.release()
+        # end if
+        if self._source is not None:
+            self._source.close()
+            self._source = None
+        # end if
+        return
+    # end method
+
+    def counts(self, text, skip_escapes=True):
+        """Counts the n-grams of a text.
+
+        Arguments:
+        - text -- the text.
+
+        Named arguments:
+        - skip_escapes -- whether to skip n-grams that include a special
+            sequence (default True; a ciphertext whose counts are to be
+            substituted is counted whole).
+
+        Returns:  a dictionary of the number of times each n-gram (by
+         number) occurs.
+        """
+        text, numbers = _numbers(text)
+        counts = collections.Counter(_codes(numbers, self.order))
+        if skip_escapes:
+            for pos in _skipped(text, self.order):
+                counts[_code(numbers, pos, self.order)] -= 1
+            # end for
+            counts = +counts
+        # end if
+        return counts
+    # end method
+
+    def save(self, path):
+        """Saves the table to a file, which load can memory-map.
+
+        Arguments:
+        - path -- the path of the file.
+
+        Returns:  nothing.
+        """
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, self.order, len(self.log_probs)))
+            file.write(_to_bytes(self.log_probs))
+        # end with
+        return
+    # end method
+
+    def score(self, text):
+        """Returns the fitness of a text.
+
+        Arguments:
+        - text -- the text.  Anything but letters and numbers is
+            ignored.
+
+        Returns:  the average log probability of its n-grams (or the
+         lowest possible score, if it has none).
+        """
+        text, numbers = _numbers(text)
+        skipped = _skipped(text, self.order)
+        total = len(numbers) - self.order + 1 - len(skipped)
+        if total <= 0:
+            return -math.inf
+        # end if (method exits)
+        log_probs = self.log_probs
+        return (sum(map(log_probs.__getitem__, _codes(numbers, self.order))) -
+                sum(log_probs[_code(numbers, pos, self.order)]
+                    for pos in skipped)) / total
+    # end method
+
+    def score_counts(self, counts, substitution=None):
+        """Returns the fitness of a text from its n-gram counts, as it
+        would be if each of its characters were replaced by another.  (A
+        whole set of candidate keys for a substitution cipher can be
+        scored this way from one count of the ciphertext.)
+
+        Arguments:
+        - counts -- the n-gram counts (see counts).
+
+        Named arguments:
+        - substitution -- a sequence of 36 positions:  the character at
+            each position of the alphabet is replaced by the character
+            at the position given (default None, for no substitution).
+
+        Returns:  the average log probability of the n-grams (or the
+         lowest possible score, if there are none).
+        """
+        total = sum(counts.values())
+        if total == 0:
+            return -math.inf
+        # end if (method exits)
+        log_probs = self.log_probs
+        if substitution is None:
+            return sum(
+                log_probs[code] * count
+                for code, count in counts.items()) / total
+        # end if (method exits)
+        if self.order == 2:
+            return sum(
+                log_probs[substitution[code // 36] * 36 +
+                          substitution[code % 36]] * count
+                for code, count in counts.items()) / total
+        # end if (method exits)
+        return sum(
+            log_probs[_substitute(code, substitution, self.order)] * count
+            for code, count in counts.items()) / total
+    # end method
+
+    def share(self):
+        """Copies the table into a new block of shared memory, which
+        worker processes can attach to by its name (see attach).  The
+        caller must close and unlink the block once the workers are
+        done.
+
+        Arguments:  none.
+
+        Returns:  the multiprocessing.shared_memory.SharedMemory.
+        """
+        data = _to_bytes(self.log_probs)
+        block = shared_memory.SharedMemory(
+            create=True, size=HEADER.size + len(data))
+        HEADER.pack_into(block.buf, 0, MAGIC, self.order, len(self.log_probs))
+        block.buf[HEADER.size:HEADER.size + len(data)] = data
+        return block
+    # end method
+
+
+def _default_log_probs():
+    """Internal function that works out the log probability of every
+    bigram for the built-in table.  The built-in bigrams keep their
+    frequencies; the rest share what is left in proportion to the
+    product of the frequencies of their characters.
+
+    Arguments:  none.
+
+    Returns:  an array of the log probabilities, by bigram number.
+    """
+    total = sum(LETTER_FREQUENCIES.values())
+    letters = [LETTER_FREQUENCIES[char] / total for char in ALPHANUM]
+    estimates = [first * second for first in letters for second in letters]
+    known = {}
+    for bigram, frequency in BIGRAM_FREQUENCIES.items():
+        known[POSITIONS[bigram[0]] * 36 + POSITIONS[bigram[1]]] = (
+            frequency / 100)
+    # end for
+    scale = (1 - sum(known.values())) / (
+        sum(estimates) - sum(estimates[code] for code in known))
+    return array.array("f", [
+        math.log10(known.get(code, estimate * scale))
+        for code, estimate in enumerate(estimates)])
+# end function
+
+
+DEFAULT = Table(2, _default_log_probs())
+_table = DEFAULT
+
+
+def attach(name):
+    """Returns a table that another process has put in shared memory
+    (see Table.share), without copying it.
+
+    Arguments:
+    - name -- the name of the block of shared memory.
+
+    Returns:  the Table.  Raises ValueError if the block does not hold
+     a table.
+    """
+    block = shared_memory.SharedMemory(name=name)
+    attached = _from_buffer(block.buf, block)
+    # The table is a view of the block, which cannot be closed while it
+    #  is in use; a process that attaches it (a worker, say) closes it
+    #  when it exits.
+    multiprocessing.util.Finalize(attached, attached.close, exitpriority=0)
+    return attached
+# end function
+
+
+def build(text, order):
+    """Builds a table from a corpus of English text.
+
+    Arguments:
+    - text -- the corpus.  Anything but letters and numbers is ignored.
+    - order -- the length of the n-grams.
+
+    Returns:  the Table.
+    """
+    counts = collections.Counter(_codes(_numbers(text)[1], order))
+    total = sum(counts.values())
+    # N-grams the corpus does not have get a small share of one
+    #  occurrence.
+    log_probs = array.array(
+        "f", [math.log10(UNSEEN / max(total, 1))]) * (36 ** order)
+    for code, count in counts.items():
+        log_probs[code] = math.log10(count / total)
+    # end for
+    return Table(order, log_probs)
+# end function
+
+
+def load(path):
+    """Loads a table from a file, by memory-mapping it.
+
+    Arguments:
+    - path -- the path of the file (see Table.save).
+
+    Returns:  the Table.  Raises ValueError if the file does not hold a
+     table, or OSError if it cannot be read.
+    """
+    with open(path, "rb") as file:
+        source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    # end with
+    return _from_buffer(source, source)
+# end function
+
+
+def main(argv):
+    """Builds a table from a corpus of English text, and saves it.
+
+    Arguments:
+    - argv -- the list of command line arguments (without the script
+        name).
+
+    Returns:  the exit code (0 for success, 1 if a file cannot be read
+     or written, 2 for usage errors).
+    """
+    parser = argparse.ArgumentParser(
+        prog="fitness.py",
+        description="Build an n-gram table from a corpus of English text.")
+    parser.add_argument(
+        "corpus", nargs="+", help="the text files of the corpus")
+    parser.add_argument(
+        "--order", type=int, default=4,
+        help="the length of the n-grams (default 4)")
+    parser.add_argument(
+        "--out", dest="outfile", required=True,
+        help="the file to save the table to")
+    args = parser.parse_args(argv)
+    if not 1 <= args.order <= MAX_ORDER:
+        parser.print_usage(sys.stderr)
+        print("fitness.py: error: --order must be from 1 to " +
+              str(MAX_ORDER), file=sys.stderr)
+        return 2
+    # end if (function exits)
+    try:
+        texts = []
+        for path in args.corpus:
+            with open(path, encoding="utf-8", errors="replace") as file:
+                texts.append(file.read())
+            # end with
+        # end for
+        build("".join(texts), args.order).save(args.outfile)
+    except OSError as err:
+        print("fitness.py: error: " + str(err), file=sys.stderr)
+        return 1
+    # end try (function exits)
+    return 0
+# end function
+
+
+def score(text):
+    """Returns the fitness of a text, using the table in use (see
+    Table.score).
+
+    Arguments:
+    - text -- the text.
+
+    Returns:  the fitness.
+    """
+    return _table.score(text)
+# end function
+
+
+def table():
+    """Returns the table in use.
+
+    Arguments:  none.
+
+    Returns:  the Table.
+    """
+    return _table
+# end function
+
+
+def use(new_table=None):
+    """Sets the table that score uses.
+
+    Arguments:  none.
+
+    Named arguments:
+    - new_table -- the Table (default None, for DEFAULT).
+
+    Returns:  nothing.
+    """
+    global _table
+    _table = DEFAULT if new_table is None else new_table
+    return
+# end function
+
+
+def _code(numbers, pos, order):
+    """Internal function that works out the number of one n-gram.
+
+    Arguments:
+    - numbers -- the text, as numbers (a bytes object).
+    - pos -- the position of the n-gram.
+    - order -- its length.
+
+    Returns:  its number.
+    """
+    code = 0
+    for num in numbers[pos:pos + order]:
+        code = code * 36 + num
+    # end for
+    return code
+# end function
+
+
+def _codes(numbers, order):
+    """Internal function that works out the numbers of all the n-grams
+    of a text, multiplying the number so far by 36 and adding the next
+    character, for all the n-grams at once.
+
+    Arguments:
+    - numbers -- the text, as numbers (a bytes object).
+    - order -- the length of the n-grams.
+
+    Returns:  an iterator of the numbers.
+    """
+    codes = iter(numbers)
+    for shift in range(1, order):
+        codes = map(operator.add, map((36).__mul__, codes), numbers[shift:])
+    # end for
+    return codes
+# end function
+
+
+def _from_buffer(buffer, source):
+    """Internal function that makes a table of the contents of a
+    buffer (a mapped file or shared memory), without copying it.
+
+    Arguments:
+    - buffer -- the buffer.
+    - source -- the object to close when the table is closed.
+
+    Returns:  the Table.  Raises ValueError if the buffer does not
+     hold a table.
+    """
+    if len(buffer) >= HEADER.size:
+        magic, order, length = HEADER.unpack_from(buffer, 0)
+    else:
+        magic, order, length = b"", 0, 0
+    # end if
+    if (magic != MAGIC) or not 1 <= order <= MAX_ORDER or (
+            length != 36 ** order) or (
+            len(buffer) < HEADER.size + 4 * length):
+        source.close()
+        raise ValueError("This is not an n-gram table.")
+    # end if (function exits)
+    view = memoryview(buffer)[HEADER.size:HEADER.size + 4 * length]
+    if sys.byteorder == "little":
+        log_probs = view.cast("f")
+    else:
+        # The floats are little-endian, so on other machines they have
+        #  to be copied and swapped.
+        log_probs = array.array("f", view.tobytes())
+        log_probs.byteswap()
+        view.release()
+    # end if
+    return Table(order, log_probs, source)
+# end function
+
+
+def _numbers(text):
+    """Internal function that turns a text into numbers (each
+    character's position in the alphabet).
+
+    Arguments:
+    - text -- the text.  Anything but letters and numbers is dropped,
+        and letters are turned into upper-case.
+
+    Returns:  the stripped text, and its numbers (a bytes object).
+    """
+    text = NOT_ALPHANUM.sub("", text.upper())
+    return text, text.encode("ascii", "ignore").translate(tables.TO_NUMBERS)
+# end function
+
+
+def _skipped(text, order):
+    """Internal function that finds the n-grams of a text that include
+    a special sequence of intelligent encryption.
+
+    Arguments:
+    - text -- the text (letters and numbers only).
+    - order -- the length of the n-grams.
+
+    Returns:  a sorted list of the positions of those n-grams.
+    """
+    skipped = set()
+    last = len(text) - order
+    for match in ESCAPE_PATTERN.finditer(text):
+        start = match.start()
+        skipped.update(range(max(start - order + 2, 0), min(start, last) + 1))
+    # end for
+    return sorted(skipped)
+# end function
+
+
+def _substitute(code, substitution, order):
+    """Internal function that works out the number of an n-gram once
+    its characters are substituted.
+
+    Arguments:
+    - code -- the number of the n-gram.
+    - substitution -- the substitution (see Table.score_counts).
+    - order -- the length of the n-gram.
+
+    Returns:  the number of the substituted n-gram.
+    """
+    new_code = 0
+    scale = 1
+    for _ in range(order):
+        code, num = divmod(code, 36)
+        new_code += substitution[num] * scale
+        scale *= 36
+    # end for
+    return new_code
+# end function
+
+
+def _to_bytes(log_probs):
+    """Internal function that turns log probabilities into the bytes of
+    little-endian floats.
+
+    Arguments:
+    - log_probs -- the log probabilities.
+
+    Returns:  the bytes.
+    """
+    data = array.array("f", log_probs)
+    if sys.byteorder != "little":
+        data.byteswap()
+    # end if
+    return data.tobytes()
+# end function
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
+# end if
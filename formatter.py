@@ -0,0 +1,202 @@
+"""This module formats ciphertext in blocks and lines, in one pass.
+
+Ciphertext can be separated into blocks (of five characters, each
+followed by a space), and broken into lines (of up to sixty
+characters), for readability.  Text no longer than a line is never
+broken; otherwise it starts on a new line, and each line is broken
+after its last space (a space just past the end of the line is dropped
+instead), or at the full width if it has no spaces.
+
+The formatting can also be applied to a stream of text, as it is
+produced, with the same result.
+
+    Constants:
+    - BLOCK_SIZE:  The default length of a block.
+    - LINE_WIDTH:  The default width of a line.
+
+    External classes:
+    - Formatter:  Formats text a piece at a time.
+
+    External functions:
+    - format_stream:  Formats a stream of text.
+    - format_text:  Formats a string.
+"""
+
+BLOCK_SIZE = 5
+LINE_WIDTH = 60
+
+
+class Formatter:
+
+    """This class formats text a piece at a time.  Each piece is passed
+    to feed, which returns as much formatted text as can be produced so
+    far; finish returns the rest.
+
+    Methods:
+    - feed:  Formats a piece of text.
+    - finish:  Returns the end of the formatted text.
+    """
+
+    def __init__(
+            self, blocks=False, line_break=False, block_size=BLOCK_SIZE,
+            line_width=LINE_WIDTH):
+        """Sets the formatting to use.
+
+        Named arguments:
+        - blocks -- whether to separate the text into blocks (default
+            False).
+        - line_break -- whether to break the text into lines (default
+            False).
+        - block_size -- the length of a block (default BLOCK_SIZE).
+        - line_width -- the width of a line (default LINE_WIDTH).
+        """
+        self.blocks = blocks
+        self.line_break = line_break
+        self.block_size = block_size
+        self.line_width = line_width
+        # The end of the text that does not make up a whole block yet.
+        self._partial_block = ""
+        # The text not yet broken into lines, and whether the text has
+        #  been broken at all.
+        self._unbroken = ""
+        self._broken = False
+    # end method
+
+    def feed(self, text):
+        """Formats a piece of text.
+
+        Arguments:
+        - text -- the next piece of the text.
+
+        Returns:  the formatted text so far.
+        """
+        if self.blocks:
+            text = self._partial_block + text
+            end = len(text) - (len(text) % self.block_size)
+            self._partial_block = text[end:]
+            text = self._separate(text[:end])
+        # end if
+        if self.line_break:
+            text = self._break_lines(text)
+        # end if
+        return text
+    # end method
+
+    def finish(self):
+        """Returns the end of the formatted text.
+
+        Arguments:  none.
+
+        Returns:  the rest of the formatted text.
+        """
+        text = ""
+        if self.blocks and self._partial_block:
+            # The last block is followed by a space, like the others.
+            text = self._partial_block + " "
+            self._partial_block = ""
+        # end if
+        if self.line_break:
+            text = self._break_lines(text) + self._unbroken
+            self._unbroken = ""
+        # end if
+        return text
+    # end method
+
+    def _break_lines(self, text):
+        """Internal method that breaks off as many lines as it can, and
+        holds back the rest (up to a line), which may be broken
+        differently once more text follows.
+
+        Arguments:
+        - text -- the next piece of the text.
+
+        Returns:  the lines broken off.
+        """
+        text = self._unbroken + text
+        width = self.line_width
+        lines = []
+        if (not self._broken) and (len(text) > width):
+            # Text longer than a line starts on a new line.
+            lines.append("\n")
+            self._broken = True
+        # end if
+        pos = 0
+        while len(text) - pos > width:
+            # Look back from the first character after the line for a
+            #  space (but not at the very start of the line).
+            space = text.rfind(" ", pos + 1, pos + width + 1)
+            if space == pos + width:
+                # The first character after the line is a space:  take
+                #  the line, and drop the space.
+                lines.append(text[pos:space] + "\n")
+                pos = space + 1
+            elif space == -1:
+                # There are no spaces in the line:  take all of it.
+                lines.append(text[pos:pos + width] + "\n")
+                pos += width
+            else:
+                # Take the line up to and including the space.
+                lines.append(text[pos:space + 1] + "\n")
+                pos = space + 1
+            # end if
+        # end while
+        self._unbroken = text[pos:]
+        return "".join(lines)
+    # end method
+
+    def _separate(self, text):
+        """Internal method that separates text (a whole number of blocks
+        long) into blocks, each followed by a space.
+
+        Arguments:
+        - text -- the text.
+
+        Returns:  the separated text.
+        """
+        if not text:
+            return ""
+        # end if (method exits)
+        size = self.block_size
+        return " ".join(
+            text[pos:pos + size] for pos in range(0, len(text), size)) + " "
+    # end method
+
+
+def format_stream(chunks, **settings):
+    """Formats a stream of text, as it is produced.
+
+    Arguments:
+    - chunks -- an iterable of strings.
+
+    Keyword arguments:  the formatting (see Formatter).
+
+    Returns:  nothing; yields formatted strings.
+    """
+    formatter = Formatter(**settings)
+    for chunk in chunks:
+        text = formatter.feed(chunk)
+        if text:
+            yield text
+        # end if
+    # end for
+    text = formatter.finish()
+    if text:
+        yield text
+    # end if
+    return
+# end function
+
+
+def format_text(text, **settings):
+    """Formats a string.
+
+    Arguments:
+    - text -- the string.
+
+    Keyword arguments:  the formatting (see Formatter).
+
+    Returns:  the formatted string.
+    """
+    formatter = Formatter(**settings)
+    return formatter.feed(text) + formatter.finish()
+# end function
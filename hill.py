@@ -1,3 +1,6 @@
+import operator
+import re
+
 from ciphers import Cipher
 
 # This cipher's alphabet contains an extra character to increase its
@@ -8,20 +11,44 @@ from ciphers import Cipher
 #  but plaintext characters can be encrypted to it, and it can be
 #  part of ciphertext strings.
 ALPHANUM = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-"
+NOT_ALPHANUM = re.compile("[^A-Z0-9-]+")
+# The key matrix is SIZE x SIZE unless the size option says otherwise.
+#  The size option can be at most MAX_SIZE, since building and
+#  inverting the matrix takes time and memory that grow quickly with
+#  its size.
+SIZE = 3
+MAX_SIZE = 10
+# The matrix arithmetic is done on whole columns of text at once, with
+#  each character turned into its number in the alphabet (0-36).
+#  TO_NUMBERS and TO_CHARS translate between the two (TO_CHARS also
+#  reduces sums of products mod 37), MULTIPLY[n] multiplies every
+#  number by n, mod 37, and REDUCE reduces a sum of two products mod 37.
+TO_NUMBERS = bytes.maketrans(ALPHANUM.encode("ascii"), bytes(range(37)))
+TO_CHARS = bytes(ord(ALPHANUM[num % 37]) for num in range(256))
+MULTIPLY = [bytes((n * num) % 37 for num in range(256)) for n in range(37)]
+REDUCE = bytes(num % 37 for num in range(256))
 
 
 class Hill(Cipher):
 
     """This class implements the Hill Cipher"""
     
-    def __init__(self, mode, text):
+    # Each block (as long as the size of the matrix) is encrypted on
+    #  its own; the last is padded to a whole block.
+    block_length = SIZE
+    whole_blocks = True
+    
+    def __init__(self, mode, text, options=None):
         """At initialization, the mode of the object is set and the
-        appropriate attribute is set to the original text.
+        appropriate attribute is set to the original text.  If options
+        are given, the cipher runs headless (see Cipher).
         """
         self.mode = mode
+        self.options = options
         self.name = "Hill"
         self.keyword = ""
-        self.matrix = [None for _ in range(9)]
+        self.size = SIZE
+        self.matrix = [None for _ in range(SIZE * SIZE)]
         if mode == "Encrypt":
             self.plaintext = text
             self.ciphertext = ""
@@ -43,39 +70,29 @@ class Hill(Cipher):
         
         Returns:  nothing.
         """
-        # Get the keyword for the cipher.
-        self.keyword = self._get_keyword(
-            "Please enter the keyword that was used to encrypt this " +
-            "message:  ")
-        # Build the key matrix.
-        self._matrix_from_keyword()
-        # Turn the matrix into its inverse.
-        self._invert_matrix(len(ALPHANUM))
+        # Get the keyword for the cipher, and build the inverse of its
+        #  key matrix.
+        self._get_keys()
+        if self.matrix is None:
+            return
+        # end if (method exits)
         # Before doing anything with the ciphertext, strip it of any
         #  spaces (if entered in five-character blocks) and turn it into
         #  all upper-case.
         self._block_input()
-        # Now decrypt the ciphertext.  The Hill Cipher encrypts and
-        #  decrypts three characters at a time.
-        trigram = [None, None, None]
-        for pos in range(0, len(self.ciphertext), 3):
-            trigram[0] = ALPHANUM.index(self.ciphertext[pos])
-            trigram[1] = ALPHANUM.index(self.ciphertext[pos + 1])
-            trigram[2] = ALPHANUM.index(self.ciphertext[pos + 2])
-            # Perform matrix multiplication to transform the plaintext.
-            trigram[0], trigram[1], trigram[2] = self._matrix_mult(
-                self.matrix, trigram, len(ALPHANUM))
-            # Convert back to text and put in ciphertext.
-            for num in range(3):
-                self.plaintext += ALPHANUM[trigram[num]]
-            # end for
-        # end for
-        # If there are one or two padding characters, remove them.
-        for _ in range(2):
-            if self.plaintext[-1] == "Q":
-                self.plaintext = self.plaintext[:-1]
-            # end if
-        # end for
+        # The Hill Cipher encrypts one block (as long as the size of the
+        #  matrix) at a time, so the ciphertext must be a multiple of the
+        #  size long.
+        if len(self.ciphertext) % self.size > 0:
+            self._abort(
+                "The encrypted text is not a multiple of " + str(self.size) +
+                " characters long.")
+            return
+        # end if (method exits)
+        # Now decrypt the ciphertext, one block at a time, and remove
+        #  any padding characters.
+        self.plaintext = self._decrypt_final(
+            self._decrypt_text(self.ciphertext))
         # Allow the user to enter a one-time pad code, if one was used
         #  to encrpyt the message.
         self._one_time_pad()
@@ -90,37 +107,20 @@ class Hill(Cipher):
         
         Returns:  nothing.
         """
-        # Get the keyword for the cipher.
-        self.keyword = self._get_keyword(
-            "Please enter a keyword for this message:  ")
+        # Get the keyword for the cipher, and build its key matrix.
+        self._get_keys()
+        if self.matrix is None:
+            return
+        # end if (method exits)
         # Present the option to perform intelligent encryption.
         self._intelligent_encrypt()
         # Format the plaintext for processing.
         self._format_plaintext()
         # Present the option to use a one-time pad.
         self._one_time_pad()
-        # Build the cipher matrix using the keyword.
-        self._matrix_from_keyword()
-        # If necessary, pad the plaintext string until it is a multple of
-        #  three.
-        while len(self.plaintext) % 3 > 0:
-            self.plaintext += "Q"
-        # end while
-        # The Hill Cipher encrypts and decrypts three characters at a
-        #  time.
-        trigram = [None, None, None]
-        for pos in range(0, len(self.plaintext), 3):
-            trigram[0] = ALPHANUM.index(self.plaintext[pos])
-            trigram[1] = ALPHANUM.index(self.plaintext[pos + 1])
-            trigram[2] = ALPHANUM.index(self.plaintext[pos + 2])
-            # Perform matrix multiplication to transform the plaintext.
-            trigram[0], trigram[1], trigram[2] = self._matrix_mult(
-                self.matrix, trigram, len(ALPHANUM))
-            # Convert back to text and put in ciphertext.
-            for num in range(3):
-                self.ciphertext += ALPHANUM[trigram[num]]
-            # end for
-        # end for
+        # The Hill Cipher encrypts and decrypts one block (as long as the
+        #  size of the matrix) at a time.
+        self.ciphertext = self._encrypt_text(self.plaintext)
         # Finally, separate into five-character blocks if the user
         #  chooses.
         self._block_output()
@@ -138,107 +138,266 @@ class Hill(Cipher):
         
         Returns:  nothing.
         """
-        new_text = ""
-        for char in self.ciphertext:
-            # Discard any space and any non-alphanumeric characters
-            #  (except hyphens).
-            if (char.upper() in ALPHANUM):
-                new_text += char.upper()
-            # end if
-        # end for
-        self.ciphertext = new_text
+        self.ciphertext = self._strip_ciphertext(self.ciphertext)
         return
-        # end function
+    # end method
+    
+    @classmethod
+    def _build_schedule(cls, keyword, size):
+        """Builds the key matrix from the keyword, and its inverse.
+        
+        Arguments:
+        - keyword -- the keyword for the cipher.
+        - size -- the size of the matrix.
+        
+        Returns:  None (the cipher has no code alphabet), and tuples of
+         the matrix and its inverse (or None if it has no inverse).
+        """
+        matrix = cls._matrix_from_keyword(keyword, size)
+        inverse = cls._invert_matrix(matrix, size, len(ALPHANUM))
+        if inverse is not None:
+            inverse = tuple(inverse)
+        # end if
+        return None, tuple(matrix), inverse
+    # end method
     
-    def _invert_matrix(self, mod):
-        """Internal function which takes a 3x3 matrix and finds its
-        inverse.
+    def _decrypt_final(self, text):
+        """Internal method that removes the padding characters (up to
+        one less than the size of the matrix) from the end of the
+        decrypted message.
         
         Arguments:
-        - mod -- the length of the alphabet.
+        - text -- the decrypted end of the message.
         
-        Returns:  the inverted matrix.
+        Returns:  the text without padding.
         """
-        # Turn matrix elements into algebraic notation.
-        a = self.matrix[0]
-        b = self.matrix[1]
-        c = self.matrix[2]
-        d = self.matrix[3]
-        e = self.matrix[4]
-        f = self.matrix[5]
-        g = self.matrix[6]
-        h = self.matrix[7]
-        i = self.matrix[8]
-        # First calculate the determinant of the matrix.
-        determinant = ((a*e*i)+(b*f*g)+(c*d*h)) - ((a*f*h)+(b*d*i)+(c*e*g))
-        # Reduce determinant to % mod.
-        determinant = determinant % mod
-        # Now find the multiplicative inverse of det % mod, expressed as
-        #  x for:  (x * det) % mod = 1
-        # For small ranges, brute force is simpler than an equation.
-        for num in range(mod):
-            if ((num * determinant) % mod) == 1:
-                determinant_inverse = num
-                break
+        for _ in range(self.size - 1):
+            if text.endswith("Q"):
+                text = text[:-1]
             # end if
         # end for
-        # Now construct the adjugate matrix % mod of the key matrix.
-        adjugate_matrix = [None for _ in range(9)]
-        adjugate_matrix[0] = ((e*i)-(f*h)) % mod
-        adjugate_matrix[1] = (((b*i)-(c*h)) * -1) % mod
-        adjugate_matrix[2] = ((b*f)-(c*e)) % mod
-        adjugate_matrix[3] = (((d*i)-(f*g)) * -1) % mod
-        adjugate_matrix[4] = ((a*i)-(c*g)) % mod
-        adjugate_matrix[5] = (((a*f)-(c*d)) * -1) % mod
-        adjugate_matrix[6] = ((d*h)-(e*g)) % mod
-        adjugate_matrix[7] = (((a*h)-(b*g)) * -1) % mod
-        adjugate_matrix[8] = ((a*e)-(b*d)) % mod
-        # Finally, multiply the inverse determinant by each element of
-        #  the adjugate matrix % mod to arrive at the inverse of the
-        #  key matrix.
-        for num in range(9):
-            self.matrix[num] = (determinant_inverse *
-                                adjugate_matrix[num]) % mod
+        return text
+    # end method
+    
+    def _decrypt_text(self, text):
+        """Decrypts a string (a multiple of the size of the matrix long)
+        using the inverse key matrix.
+        
+        Arguments:
+        - text -- the string to decrypt.
+        
+        Returns:  the decrypted string.
+        """
+        return self._transform(text)
+    # end method
+    
+    def _encrypt_text(self, text):
+        """Encrypts a string using the key matrix.  If the string is not
+        a multiple of the size of the matrix long, it is padded first.
+        
+        Arguments:
+        - text -- the string to encrypt.
+        
+        Returns:  the encrypted string.
+        """
+        if len(text) % self.size > 0:
+            text += "Q" * (self.size - (len(text) % self.size))
+        # end if
+        return self._transform(text)
+    # end method
+    
+    def _get_keys(self):
+        """Gets the keyword (and, in headless mode, the size of the
+        matrix) for the cipher, and the key matrix, or its inverse when
+        decrypting, from its key schedule.  Only a matrix with an
+        inverse can be decrypted, so that is checked before encrypting
+        as well.  If there is no inverse, the matrix is set to None.
+        
+        Arguments:  none.
+        
+        Returns:  nothing.
+        """
+        if self.mode == "Encrypt":
+            self.keyword = self._get_keyword(
+                "Please enter a keyword for this message:  ",
+                option="keyword")
+        else:
+            self.keyword = self._get_keyword(
+                "Please enter the keyword that was used to encrypt this " +
+                "message:  ", option="keyword")
+        # end if
+        self._get_size()
+        schedule = self._key_schedule(self.keyword, self.size)
+        if schedule.decode is None:
+            self.matrix = None
+            if self.mode == "Encrypt":
+                self._abort(
+                    "This keyword cannot be used with a " + str(self.size) +
+                    "x" + str(self.size) + " key matrix.  Please choose " +
+                    "another.")
+            else:
+                self._abort(
+                    "This keyword cannot have been used to encrypt a " +
+                    "message with a " + str(self.size) + "x" +
+                    str(self.size) + " key matrix.")
+            # end if
+        elif self.mode == "Encrypt":
+            self.matrix = schedule.encode
+        else:
+            self.matrix = schedule.decode
+        # end if
+        return
+    # end method
+    
+    def _get_size(self):
+        """Gets the size of the key matrix (2 to MAX_SIZE) from the size
+        option in headless mode, if it is given.  Otherwise the
+        traditional 3x3 matrix is used.
+        
+        Arguments:  none.
+        
+        Returns:  nothing.
+        """
+        if (self.options is not None) and (
+                self.options.get("size") is not None):
+            self.size = self._get_keynumber(
+                "", lbound=2, ubound=MAX_SIZE, option="size")
+            self.block_length = self.size
+        # end if
+        return
+    # end method
+    
+    @classmethod
+    def _invert_matrix(cls, matrix, size, mod):
+        """Internal function which finds the inverse of a key matrix by
+        Gauss-Jordan elimination, mod the length of the alphabet.
+        
+        Arguments:
+        - matrix -- the key matrix (a list, row by row).
+        - size -- the size of the matrix.
+        - mod -- the length of the alphabet (a prime).
+        
+        Returns:  the inverted matrix, or None if the matrix has no
+         inverse.
+        """
+        # Set the identity matrix alongside each row of the key matrix.
+        rows = [
+            list(matrix[row * size:(row + 1) * size]) +
+            [int(col == row) for col in range(size)]
+            for row in range(size)]
+        for col in range(size):
+            # Find a row with a nonzero entry in this column to pivot
+            #  on.  If there is none, the matrix has no inverse.
+            for pivot in range(col, size):
+                if rows[pivot][col] % mod:
+                    break
+                # end if
+            else:
+                return None
+            # end for (function exits)
+            rows[col], rows[pivot] = rows[pivot], rows[col]
+            # Scale the pivot row so that the pivot is one...
+            inverse = pow(rows[col][col], -1, mod)
+            rows[col] = [(num * inverse) % mod for num in rows[col]]
+            # ...and clear the column from every other row.
+            for row in range(size):
+                factor = rows[row][col]
+                if (row != col) and factor:
+                    rows[row] = [
+                        (num - factor * pivot_num) % mod
+                        for num, pivot_num in zip(rows[row], rows[col])]
+                # end if
+            # end for
         # end for
+        # The identity matrix has become the inverse.
+        return [num for row in rows for num in row[size:]]
     # end function
     
-    def _matrix_from_keyword(self):
+    @classmethod
+    def _matrix_from_keyword(cls, keyword, size):
         """Internal function that builds a key matrix from a keyword.
-        Called by both encrypt and decrypt functions.  (Decrypt must
+        Called for both encryption and decryption.  (Decryption must
         reconstruct the matrix in order to build its inverse.)
         
-        Arguments:  none
+        Arguments:
+        - keyword -- the keyword for the cipher.
+        - size -- the size of the matrix.
         
-        Returns:  nothing.
+        Returns:  the key matrix (a list, row by row).
         """
-        # Turn the first nine letters of the keyword into the key
-        #  matrix.  If the keyword is less than nine letters, then pad
-        #  with the beginning of the alphabet.
+        # Turn the first size x size letters of the keyword into the key
+        #  matrix (nine letters for the usual 3x3 matrix).  If the
+        #  keyword is too short, then pad with the beginning of the
+        #  alphabet.
         pad = 0
-        for pos in range(9):
-            if pos < len(self.keyword):
-                self.matrix[pos] = ALPHANUM.index(self.keyword[pos])
+        matrix = [None for _ in range(size * size)]
+        for pos in range(size * size):
+            if pos < len(keyword):
+                matrix[pos] = ALPHANUM.index(keyword[pos])
             else:
-                self.matrix[pos] = pad
+                matrix[pos] = pad % len(ALPHANUM)
                 pad += 1
             # end if
         # end for
-        return
+        return matrix
     # end function
     
-    def _matrix_mult(self, m, t, mod):
-        """Internal function which performs matrix multiplication on a
-        3x3 matrix and a trigram.
+    def _strip_ciphertext(self, text):
+        """Internal method that strips a piece of ciphertext of any
+        spaces or non-alphanumeric characters, except hyphens, and
+        turns it into upper-case.
+        
+        Called by _block_input and the streaming methods.
         
         Arguments:
-        - m -- the key matrix
-        - t -- a trigram, a 1x3 column vector to be multiplied
-        - mod -- the length of the alphabet
+        - text -- the ciphertext.
         
-        Returns:  a tuple containing the three final values.
+        Returns:  the stripped ciphertext.
         """
-        c1 = ((m[0] * t[0]) + (m[1] * t[1]) + (m[2] * t[2])) % 37
-        c2 = ((m[3] * t[0]) + (m[4] * t[1]) + (m[5] * t[2])) % 37
-        c3 = ((m[6] * t[0]) + (m[7] * t[1]) + (m[8] * t[2])) % 37
-        return c1, c2, c3
-    # end function
+        if text.isascii():
+            # Plain ASCII text can be stripped in one pass.
+            return NOT_ALPHANUM.sub("", text.upper())
+        # end if (method exits)
+        new_text = []
+        for char in text:
+            # Discard any space and any non-alphanumeric characters
+            #  (except hyphens).
+            if (char.upper() in ALPHANUM):
+                new_text.append(char.upper())
+            # end if
+        # end for
+        return "".join(new_text)
+    # end method
+    
+    def _transform(self, text):
+        """Internal method that multiplies each block of a string by the
+        key matrix.  Rather than going block by block, each row of the
+        matrix is applied to whole columns of the text (every size-th
+        character) at once.
+        
+        Called by both encrypt and decrypt methods.
+        
+        Arguments:
+        - text -- the string to transform (a multiple of the size of the
+            matrix long).
+        
+        Returns:  the transformed string.
+        """
+        size = self.size
+        numbers = text.encode("ascii").translate(TO_NUMBERS)
+        columns = [numbers[col::size] for col in range(size)]
+        result = bytearray(len(numbers))
+        for row in range(size):
+            totals = columns[0].translate(MULTIPLY[self.matrix[row * size]])
+            for col in range(1, size):
+                products = columns[col].translate(
+                    MULTIPLY[self.matrix[row * size + col]])
+                # Reduce after every sum, so that it always fits in a
+                #  byte.
+                totals = bytes(
+                    map(operator.add, totals, products)).translate(REDUCE)
+            # end for
+            result[row::size] = totals.translate(TO_CHARS)
+        # end for
+        return result.decode("ascii")
+    # end method
@@ -15,6 +15,8 @@
        appropriate action
 """
 
+import itertools
+import layout
 import os
 
 LINE_LENGTH = 70
@@ -132,8 +134,10 @@ def input_from_menu(
 # end function
 
 
-def print_string(string, intro="Output:  ", clear=False):
-    """Prints some introductory text and a string.
+def print_string(string, intro="Output:  ", clear=False, width=None):
+    """Prints some introductory text and a string.  The string is
+    written out in chunks (see layout.write_text), so that long strings
+    are not copied again.
     
         - Arguments:
         string -- the string to print.
@@ -141,12 +145,19 @@ def print_string(string, intro="Output:  ", clear=False):
         - Keyword arguments:
         intro -- Text to print before the string (default generic text).
         clear -- Clear the screen before printing (default False).
+        width -- Wrap the string to lines of this length (default None,
+            no wrapping).
         
         Returns:  Nothing.
     """
     if clear:
         clear_screen()
-    print(intro, string)
+    if width:
+        lines = layout.iter_lines(string, width)
+    else:
+        lines = [string]
+    # end if
+    layout.write_text(itertools.chain([intro, " "], lines, ["\n"]))
 # end function
 
 
@@ -386,7 +397,8 @@ def _evaluate_response(
     
     
 def break_string(string, length):
-    """Attempts to line break a long string intelligently.
+    """Attempts to line break a long string intelligently (see
+    layout.wrap).
     
     Arguments:
     - string -- the string to be broken.
@@ -394,45 +406,5 @@ def break_string(string, length):
     
     Returns:  the line broken string.
     """
-    break_list = []
-    # Go through the string at points of maximum length, until the
-    #  string remaining is less than a line.
-    while not (length > len(string)):
-        # Step backwards looking for a space
-        pos = length
-        while string[pos] != " ":
-            pos -= 1
-        # end while
-        # In the event that there are no spaces along the entire length
-        #  of a line...
-        if pos == 0:
-            # Take the string up to the next to the last character in
-            #  line, and slice it out of the string.
-            scratch = string[:length-1]
-            string = string[length-1:]
-            # Add a hyphen as the last character, add a newline
-            #  character, and append it to the list.
-            scratch += "-\n"
-            break_list.append(scratch)
-        else:
-            # Take the string up to (and including) the space, and slice
-            #  it out of the string.
-            scratch = string[:pos+1]
-            string = string[pos+1:]
-            # Add a newline character and append it to the list.
-            scratch += "\n"
-            break_list.append(scratch)
-        # end if
-    # end while
-    # Append the remainder of the string to the list.  (If the while
-    #  loop never triggered, the whole string will be the only item in
-    #  the list.)
-    break_list.append(string)
-    # If the string was broken, reconstitute it now.  (If the string is
-    #  only one line, this loop doesn't really do anything.)
-    string = ""
-    for line in break_list:
-        string += line
-    # end for
-    return string
-# end function
\ No newline at end of file
+    return layout.wrap(string, length)
+# end function
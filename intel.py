@@ -0,0 +1,231 @@
+"""This module is the codec for intelligent encryption.
+
+Intelligent encryption replaces spaces, capital letters and basic
+punctuation with special sequences (bigrams that rarely occur in
+English), and wraps the message in "ZX" sequences, so that they survive
+a cipher that only handles letters and numbers.  The decoder restores
+them, and stops at the closing "ZX"; anything after it is nulls added by
+the cipher.
+
+Both directions work in one pass over the text:  the encoder with a
+translation table, and the decoder with a compiled pattern.  The
+decoder works a chunk at a time (so a message can also be fed to it as
+a stream), carrying any sequence cut off at the end of a chunk over to
+the next, and stops at the chunk holding the end of the message.
+
+    Constants:
+    - INTEL_DICT:  The special sequences, and what they stand for.
+    - MARKER:  The sequence marking the start and end of a message.
+
+    External classes:
+    - Decoder:  Decodes a message a chunk at a time.
+
+    External functions:
+    - decode:  Decodes a message.
+    - encode:  Encodes a string.
+"""
+
+import operator
+import random
+import re
+
+MARKER = "ZX"
+INTEL_DICT = {
+    "FQ": " ", "JX": " ", "QK": " ", "WZ": " ", "ZJ": " ", "GX": "CAP",
+    "HX": ".", "JQ": ",", "PZ": "?", "QG": "!", "QY": "'", "QZ": '"',
+    "WQ": ":", "XJ": ";", "ZQ": "-", "ZX": "EOM"}
+# Any of these sequences can stand for a space.  Spaces are so common
+#  that a single sequence could expose the lengths of words, so one is
+#  chosen at random for each space.
+SPACE_SEQUENCES = ["FQ", "JX", "QK", "WZ", "ZJ"]
+# The encoding of each punctuation mark and capital letter (which is
+#  kept, after "GX").  Spaces are left for encode to replace, and
+#  everything else is upper-cased afterwards.
+ENCODE_TABLE = str.maketrans(dict(
+    [(char, sequence) for sequence, char in INTEL_DICT.items()
+     if len(char) == 1 and char != " "] +
+    [(char, "GX" + char) for char in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"]))
+# Matches any special sequence (a capital letter sequence takes the
+#  letter after it too, if there is one).
+SEQUENCE_PATTERN = re.compile(
+    "(GX.?|" + "|".join(sequence for sequence in INTEL_DICT
+                        if sequence != "GX") + ")", re.DOTALL)
+# Messages are decoded this many characters at a time, so that the
+#  nulls after the end of a message are not decoded.
+DECODE_CHUNK_SIZE = 1 << 16
+
+
+class _Decodings(dict):
+
+    """This class maps special sequences to what they stand for; a
+    capital letter sequence stands for the letter after "GX".
+    """
+
+    def __missing__(self, sequence):
+        """Returns the capital letter of a capital letter sequence.
+
+        Arguments:
+        - sequence -- "GX" and the letter (if any).
+
+        Returns:  the letter.
+        """
+        return sequence[2:]
+    # end method
+
+
+DECODINGS = _Decodings(
+    (sequence, char) for sequence, char in INTEL_DICT.items()
+    if len(char) == 1)
+
+
+class Decoder:
+
+    """This class decodes an intelligently encrypted message a chunk at
+    a time.  A message that does not start with "ZX" was not
+    intelligently encrypted, and is passed through unchanged.
+
+    Methods:
+    - feed:  Decodes a chunk of the message.
+    - finish:  Returns the end of the decoded message.
+    """
+
+    def __init__(self):
+        """Starts a new message.
+
+        Arguments:  none.
+        """
+        # Whether the message was intelligently encrypted (None until
+        #  its first two characters have been seen), and whether its
+        #  end has been found.
+        self.intelligent = None
+        self.done = False
+        # The end of the text so far, which may hold a sequence cut off
+        #  by the end of a chunk.
+        self._carry = ""
+    # end method
+
+    def feed(self, text):
+        """Decodes a chunk of the message.
+
+        Arguments:
+        - text -- the next chunk.
+
+        Returns:  the text decoded so far.
+        """
+        if self.done:
+            return ""
+        # end if (method exits)
+        text = self._carry + text
+        self._carry = ""
+        if self.intelligent is None:
+            if len(text) < len(MARKER):
+                self._carry = text
+                return ""
+            # end if (method exits)
+            self.intelligent = text.startswith(MARKER)
+            if self.intelligent:
+                text = text[len(MARKER):]
+            # end if
+        # end if
+        if not self.intelligent:
+            return text
+        # end if (method exits)
+        return self._decode(text, final=False)
+    # end method
+
+    def finish(self):
+        """Returns the end of the decoded message.
+
+        Arguments:  none.
+
+        Returns:  the rest of the decoded text.
+        """
+        text = self._carry
+        self._carry = ""
+        if self.done or not self.intelligent:
+            return text
+        # end if (method exits)
+        return self._decode(text, final=True)
+    # end method
+
+    def _decode(self, text, final):
+        """Internal method that decodes the special sequences in a piece
+        of the message.  Decoding stops at the end of the message, and
+        (unless final is True) short of the last two characters, which
+        could be the start of a sequence; they are carried over to the
+        next chunk.  When final is True, a single character left at
+        the end is dropped.
+
+        Arguments:
+        - text -- the piece of the message.
+        - final -- whether the piece runs to the end of the message.
+
+        Returns:  the decoded text.
+        """
+        # Split the text into ordinary text (at even indices) and the
+        #  special sequences between (at odd indices).
+        parts = SEQUENCE_PATTERN.split(text)
+        sequences = parts[1::2]
+        if MARKER in sequences:
+            # Anything after the end of the message is nulls.
+            self.done = True
+            parts = parts[:sequences.index(MARKER) * 2 + 1]
+        elif final:
+            # The last character is only part of the message if it ends
+            #  a sequence.
+            parts[-1] = parts[-1][:-1]
+        elif len(parts[-1]) >= 2:
+            self._carry = parts[-1][-2:]
+            parts[-1] = parts[-1][:-2]
+        elif (len(parts) > 1) and (parts[-1] == "") and (
+                len(parts[-2]) == 2):
+            # A sequence in the last two characters may be the start of
+            #  a capital letter sequence.
+            self._carry = parts[-2]
+            del parts[-2:]
+        else:
+            self._carry = parts[-1]
+            parts[-1] = ""
+        # end if
+        parts[0::2] = map(str.lower, parts[0::2])
+        parts[1::2] = map(DECODINGS.__getitem__, parts[1::2])
+        return "".join(parts)
+    # end method
+
+
+def decode(text):
+    """Decodes a whole message.  A message that does not start with
+    "ZX" is returned unchanged.
+
+    Arguments:
+    - text -- the message.
+
+    Returns:  the decoded message.
+    """
+    decoder = Decoder()
+    decoded = []
+    for pos in range(0, len(text), DECODE_CHUNK_SIZE):
+        decoded.append(decoder.feed(text[pos:pos + DECODE_CHUNK_SIZE]))
+        if decoder.done:
+            break
+        # end if
+    # end for
+    decoded.append(decoder.finish())
+    return "".join(decoded)
+# end function
+
+
+def encode(text):
+    """Replaces spaces, capital letters and basic punctuation in a
+    string with special sequences.  Everything else is upper-cased.
+
+    Arguments:
+    - text -- the string to encode.
+
+    Returns:  the encoded string (without the "ZX" sequences that mark
+     the start and end of the message).
+    """
+    words = text.translate(ENCODE_TABLE).upper().split(" ")
+    spaces = random.choices(SPACE_SEQUENCES, k=len(words) - 1)
+    return words[0] + "".join(map(operator.add, spaces, words[1:]))
+# end function
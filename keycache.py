@@ -0,0 +1,77 @@
+"""This module caches the key schedules of the ciphers.
+
+A key schedule is everything a cipher builds from its keys before it
+can encrypt or decrypt:  its code alphabet, and its encoding and
+decoding tables (or matrices).  Building one takes far longer than
+looking it up, and the same few keys tend to be used again and again,
+so each cipher's schedules are kept in a cache of the most recently
+used, shared by every instance of every cipher.
+
+    Constants:
+    - CACHE_SIZE:  The number of key schedules kept.
+
+    External classes:
+    - KeySchedule:  An (immutable, hashable) key schedule.
+
+    External functions:
+    - cache_clear:  Empties the cache.
+    - cache_info:  Returns the cache's hit and miss statistics.
+    - get_schedule:  Returns the key schedule for a cipher and its
+       keys.
+"""
+
+import collections
+import functools
+
+CACHE_SIZE = 256
+
+# The fields of a key schedule:
+#  - cipher -- the name of the cipher class.
+#  - key -- the tuple of keys it was built from.
+#  - alphabet -- the code alphabet (or None, if the cipher has none).
+#  - encode -- what the cipher encrypts with.
+#  - decode -- what the cipher decrypts with.
+#  The forms of encode and decode depend on the cipher, but are always
+#  immutable (bytes translation tables, or tuples).
+KeySchedule = collections.namedtuple(
+    "KeySchedule", ["cipher", "key", "alphabet", "encode", "decode"])
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def get_schedule(cipher_class, key):
+    """Returns the key schedule for a cipher and its keys, building it
+    only if it is not in the cache.
+
+    Arguments:
+    - cipher_class -- the class of the cipher, which builds the
+        schedule in its _build_schedule method.
+    - key -- a tuple of the cipher's keys.
+
+    Returns:  the KeySchedule.
+    """
+    return KeySchedule(
+        cipher_class.__name__, key, *cipher_class._build_schedule(*key))
+# end function
+
+
+def cache_clear():
+    """Empties the cache (and resets its statistics).
+
+    Arguments:  none.
+
+    Returns:  nothing.
+    """
+    get_schedule.cache_clear()
+    return
+# end function
+
+
+def cache_info():
+    """Returns the cache's statistics.
+
+    Arguments:  none.
+
+    Returns:  a named tuple of hits, misses, maxsize and currsize.
+    """
+    return get_schedule.cache_info()
+# end function
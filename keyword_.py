@@ -1,3 +1,5 @@
+import tables
+
 from ciphers import Cipher
 
 ALPHANUM = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
@@ -7,14 +9,20 @@ class Keyword_(Cipher):
     
     """This class implements the Keyword Cipher."""
     
-    def __init__(self, mode, text):
+    # Each character is substituted on its own.
+    block_length = 1
+    
+    def __init__(self, mode, text, options=None):
         """At initialization, the mode of the object is set and the
-        appropriate attribute is set to the original text.
+        appropriate attribute is set to the original text.  If options
+        are given, the cipher runs headless (see Cipher).
         """
         self.mode = mode
+        self.options = options
         self.name = "Keyword"
         self.keyword = ""
         self.code_alphabet = ""
+        self.table = None
         if mode == "Encrypt":
             self.plaintext = text
             self.ciphertext = ""
@@ -35,21 +43,14 @@ class Keyword_(Cipher):
         
         Returns:  nothing.
         """
-        # First get the keyword for the cipher.
-        self.keyword = self._get_keyword(
-            "Please enter the keyword that was used to encrypt this " +
-            "message:  ")
-        # Get the code alphabet.
-        self.code_alphabet = self._alphabet_from_keyword(
-            self.keyword, include_numbers=True)
+        # First get the keyword for the cipher, and the code alphabet.
+        self._get_keys()
         # Before doing anything with the ciphertext, strip it of any
         #  spaces (if entered in five-character blocks) and turn it into
         #  all upper-case.
         self._block_input()
-        # Loop through the ciphertext and decrypt each character.
-        for char in self.ciphertext:
-            self.plaintext += ALPHANUM[self.code_alphabet.index(char)]
-        # end for
+        # Decrypt each character.
+        self.plaintext = self._decrypt_text(self.ciphertext)
         # Finally, allow for a one-time pad.
         self._one_time_pad()
         self._intelligent_decrypt()
@@ -63,25 +64,84 @@ class Keyword_(Cipher):
         
         Returns:  nothing.
         """
-        # Get a keyword for the cipher.
-        self.keyword = self._get_keyword(
-            "Please enter a keyword for this message:  ")
+        # Get a keyword for the cipher, and build the code alphabet.
+        self._get_keys()
         # Present the option to perform intelligent encryption.
         self._intelligent_encrypt()
         # Format the plaintext for processing.
         self._format_plaintext()
         # Present the option to use a one-time pad.
         self._one_time_pad()
-        # Build the code alphabet.  Include numbers.
-        self.code_alphabet = self._alphabet_from_keyword(
-            self.keyword, include_numbers=True)
         # The plaintext is encrypted using the code alphabet.
-        for char in self.plaintext:
-            # Loop through and add to ciphertext.
-            self.ciphertext += self.code_alphabet[ALPHANUM.index(char)]
-        # end for
+        self.ciphertext = self._encrypt_text(self.plaintext)
         # Finally, separate into five-character blocks if the user
         #  chooses.
         self._block_output()
         return
     # end method
+    
+    @classmethod
+    def _build_schedule(cls, keyword):
+        """Builds the code alphabet from the keyword (numbers are
+        included), and the translation tables to and from it.
+        
+        Arguments:
+        - keyword -- the keyword for the cipher.
+        
+        Returns:  the code alphabet and the two tables.
+        """
+        code_alphabet = cls._alphabet_from_keyword(
+            keyword, include_numbers=True)
+        return (code_alphabet,
+                tables.substitution_table(ALPHANUM, code_alphabet),
+                tables.substitution_table(code_alphabet, ALPHANUM))
+    # end method
+    
+    def _decrypt_text(self, text):
+        """Decrypts a string using the code alphabet.
+        
+        Arguments:
+        - text -- the string to decrypt.
+        
+        Returns:  the decrypted string.
+        """
+        return tables.translate(text, self.table)
+    # end method
+    
+    def _encrypt_text(self, text):
+        """Encrypts a string using the code alphabet.
+        
+        Arguments:
+        - text -- the string to encrypt.
+        
+        Returns:  the encrypted string.
+        """
+        return tables.translate(text, self.table)
+    # end method
+    
+    def _get_keys(self):
+        """Gets the keyword for the cipher, and the code alphabet and
+        the translation table for the mode from its key schedule.
+        
+        Arguments:  none.
+        
+        Returns:  nothing.
+        """
+        if self.mode == "Encrypt":
+            self.keyword = self._get_keyword(
+                "Please enter a keyword for this message:  ",
+                option="keyword")
+        else:
+            self.keyword = self._get_keyword(
+                "Please enter the keyword that was used to encrypt this " +
+                "message:  ", option="keyword")
+        # end if
+        schedule = self._key_schedule(self.keyword)
+        self.code_alphabet = schedule.alphabet
+        if self.mode == "Encrypt":
+            self.table = schedule.encode
+        else:
+            self.table = schedule.decode
+        # end if
+        return
+    # end method
@@ -0,0 +1,108 @@
+"""This module lays out long text for display, and writes it out.
+
+Text is wrapped in one pass over the string:  each line is broken
+after its last space, or (if it has no spaces) hyphenated.  Long output
+is written to standard output in chunks of bytes, straight to its
+buffer, so that a large result is neither copied whole again nor
+printed in one huge write.
+
+    Constants:
+    - CHUNK_SIZE:  The number of characters written at a time.
+
+    External functions:
+    - iter_lines:  Yields the wrapped lines of a string.
+    - wrap:  Wraps a string.
+    - write_text:  Writes strings to standard output (or a stream) in
+       chunks.
+"""
+
+import sys
+
+CHUNK_SIZE = 1 << 16
+
+
+def iter_lines(string, length):
+    """Wraps a string, yielding it a line at a time.  A line is broken
+    after its last space (a space just past the end of the line is kept
+    on the line); a line with no spaces is broken one character short
+    and hyphenated.
+
+    Arguments:
+    - string -- the string to wrap.
+    - length -- the maximum length of a line.
+
+    Returns:  nothing; yields the lines, each but the last ending in a
+     newline character.
+    """
+    pos = 0
+    while len(string) - pos > length:
+        # Look back from the first character after the line for a space
+        #  (but not at the very start of the line).
+        space = string.rfind(" ", pos + 1, pos + length + 1)
+        if space == -1:
+            cut = max(length - 1, 1)
+            yield string[pos:pos + cut] + "-\n"
+            pos += cut
+        else:
+            yield string[pos:space + 1] + "\n"
+            pos = space + 1
+        # end if
+    # end while
+    yield string[pos:]
+    return
+# end function
+
+
+def wrap(string, length):
+    """Wraps a string (see iter_lines).
+
+    Arguments:
+    - string -- the string to wrap.
+    - length -- the maximum length of a line.
+
+    Returns:  the wrapped string.
+    """
+    return "".join(iter_lines(string, length))
+# end function
+
+
+def write_text(pieces, stream=None, chunk_size=CHUNK_SIZE):
+    """Writes strings to standard output (or another text stream), in
+    chunks.  If the stream has a binary buffer, the chunks are encoded
+    and written to it directly.
+
+    Arguments:
+    - pieces -- an iterable of strings.
+
+    Named arguments:
+    - stream -- the text stream to write to (default None, for
+        sys.stdout).
+    - chunk_size -- the number of characters written at a time (default
+        CHUNK_SIZE).
+
+    Returns:  nothing.
+    """
+    if stream is None:
+        stream = sys.stdout
+    # end if
+    buffer = getattr(stream, "buffer", None)
+    encoding = getattr(stream, "encoding", None) or "utf-8"
+    # Anything already printed to the stream goes out first.
+    stream.flush()
+    for piece in pieces:
+        for pos in range(0, len(piece), chunk_size):
+            chunk = piece[pos:pos + chunk_size]
+            if buffer is None:
+                stream.write(chunk)
+            else:
+                buffer.write(chunk.encode(encoding, "replace"))
+            # end if
+        # end for
+    # end for
+    if buffer is None:
+        stream.flush()
+    else:
+        buffer.flush()
+    # end if
+    return
+# end function
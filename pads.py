@@ -0,0 +1,213 @@
+"""This module provides one-time pads read from pad files, so that no
+two messages ever share pad material.
+
+A pad file is a (possibly very large) file of random letters and
+numbers.  It is memory-mapped rather than read, so only the part of it
+that a message uses is ever loaded.  Each message encrypted with a pad
+file uses a fresh range of it, and the ranges used are recorded in a
+ledger file alongside the pad file (the same name, plus ".ledger") so
+that no range is ever used twice.  A message is decrypted by reading
+the pad from the same offset again.
+
+    External classes:
+    - PadFile:  A pad file and its ledger.
+
+    External functions:
+    - create_pad_file:  Writes a new pad file of random characters.
+"""
+
+import mmap
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where the ledger is not locked.
+    fcntl = None
+# end try
+
+ALPHANUM = b"ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+LEDGER_SUFFIX = ".ledger"
+# Random bytes are turned into pad characters a chunk at a time.
+CHUNK_SIZE = 1 << 20
+# Random bytes from 252 (the largest multiple of 36 that fits in a
+#  byte) up are discarded, so that every character is equally likely;
+#  the rest are reduced mod 36.
+REJECTED = bytes(range(252, 256))
+TO_CHARS = bytes(ALPHANUM[num % 36] for num in range(256))
+
+
+class PadFile:
+
+    """This class gives access to a pad file and its ledger.  It can be
+    used as a context manager, which closes the file on exit.
+
+    Attributes:
+    - path -- the path of the pad file.
+    - ledger_path -- the path of its ledger.
+    - length -- the number of characters in the pad file.
+
+    Methods:
+    - close:  Closes the pad file.
+    - read:  Reads part of the pad.
+    - reserve:  Reserves an unused range of the pad for a message.
+    - used:  Returns the ranges of the pad already used.
+    """
+
+    def __init__(self, path):
+        """Opens and memory-maps the pad file.
+
+        Arguments:
+        - path -- the path of the pad file.
+        """
+        self.path = path
+        self.ledger_path = path + LEDGER_SUFFIX
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped.
+            self._file.close()
+            raise ValueError("The pad file " + path + " is empty.") from None
+        # end try
+        self.length = len(self._map)
+    # end method
+
+    def __enter__(self):
+        return self
+    # end method
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+    # end method
+
+    def close(self):
+        """Closes the pad file.
+
+        Arguments:  none.
+
+        Returns:  nothing.
+        """
+        self._map.close()
+        self._file.close()
+        return
+    # end method
+
+    def read(self, offset, length):
+        """Reads part of the pad.  Only that part of the file is loaded.
+
+        Arguments:
+        - offset -- the position of the first character to read.
+        - length -- the number of characters to read.
+
+        Returns:  the pad code, as a string.  Raises ValueError if the
+         range is not inside the pad file, or the pad file contains
+         anything but upper-case letters and numbers.
+        """
+        if (offset < 0) or (offset + length > self.length):
+            raise ValueError(
+                "The pad file " + self.path + " has no characters " +
+                str(offset) + " to " + str(offset + length) + ".")
+        # end if (method exits)
+        pad_code = self._map[offset:offset + length]
+        if pad_code.translate(None, ALPHANUM):
+            raise ValueError(
+                "The pad file " + self.path + " contains characters other " +
+                "than letters and numbers.")
+        # end if (method exits)
+        return pad_code.decode("ascii")
+    # end method
+
+    def reserve(self, length):
+        """Reserves a range of the pad that no message has used, and
+        records it in the ledger.  The ledger is locked while this is
+        done, so that two processes cannot reserve the same range.
+
+        Arguments:
+        - length -- the number of characters needed.
+
+        Returns:  the offset of the range.  Raises ValueError if not
+         enough of the pad is left.
+        """
+        with open(self.ledger_path, "a+", encoding="ascii") as ledger:
+            if fcntl is not None:
+                # The lock is released when the ledger is closed.
+                fcntl.flock(ledger, fcntl.LOCK_EX)
+            # end if
+            ledger.seek(0)
+            # Ranges are handed out in order, so the next one starts
+            #  where the furthest one used so far ends.
+            offset = max(
+                (end for _, end in self._parse_ledger(ledger)), default=0)
+            if offset + length > self.length:
+                raise ValueError(
+                    "The pad file " + self.path + " does not have " +
+                    str(length) + " unused characters left.")
+            # end if (method exits)
+            ledger.write(str(offset) + " " + str(offset + length) + "\n")
+            ledger.flush()
+            os.fsync(ledger.fileno())
+        # end with
+        return offset
+    # end method
+
+    def used(self):
+        """Returns the ranges of the pad already used.
+
+        Arguments:  none.
+
+        Returns:  a list of (start, end) tuples, in the order they were
+         reserved.
+        """
+        try:
+            with open(self.ledger_path, encoding="ascii") as ledger:
+                return list(self._parse_ledger(ledger))
+            # end with
+        except FileNotFoundError:
+            return []
+        # end try
+    # end method
+
+    def _parse_ledger(self, ledger):
+        """Internal generator that reads the ranges in the ledger, one
+        "start end" line each.
+
+        Arguments:
+        - ledger -- the open ledger file.
+
+        Returns:  nothing; yields (start, end) tuples.
+        """
+        for line in ledger:
+            if line.strip():
+                start, end = line.split()
+                yield int(start), int(end)
+            # end if
+        # end for
+        return
+    # end method
+
+
+def create_pad_file(path, length):
+    """Writes a new pad file of random letters and numbers.
+
+    Arguments:
+    - path -- the path of the file to write.
+    - length -- the number of characters in the pad.
+
+    Returns:  nothing.
+    """
+    with open(path, "wb") as file:
+        remaining = length
+        while remaining > 0:
+            # A few random bytes are rejected, so ask for a little
+            #  more than is needed.
+            chunk = os.urandom(min(remaining, CHUNK_SIZE) + 64)
+            chunk = chunk.translate(TO_CHARS, REJECTED)[:remaining]
+            file.write(chunk)
+            remaining -= len(chunk)
+        # end while
+    # end with
+    return
+# end function
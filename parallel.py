@@ -0,0 +1,347 @@
+"""This module runs a cipher over a large text on several processes at
+once.
+
+A cipher with a block_length transforms each block of that many
+characters independently of the rest of the message (a short last
+block included), so a long message can be split into chunks of whole
+blocks, and the chunks encrypted or decrypted on separate processes.
+The steps that need the whole message (intelligent encryption,
+formatting the text, and breaking the output into blocks and lines)
+are still done in this process; the one-time pad is applied to each
+chunk in its worker, in step with the chunk's offset in the message.
+The result is the same as running the cipher on one process.
+
+A segmented cipher (such as the Alberti Cipher, whose ciphertext
+restarts the key at each key letter) is decrypted the same way, except
+that its ciphertext is split at the marks the cipher finds, and the
+rest of the decryption (including the one-time pad) is done in this
+process, on the whole text.
+
+    External functions:
+    - run:  Runs a cipher headless, on several processes if it can.
+"""
+
+import concurrent.futures
+import os
+
+import pads
+
+# Texts shorter than this are not worth sending to other processes.
+MIN_PARALLEL_LENGTH = 1 << 20
+# The smallest chunk of text (in characters) sent to a worker.  Texts
+#  are split into about four chunks per worker, so that a slow chunk
+#  does not hold up the rest.
+MIN_CHUNK_SIZE = 1 << 16
+CHUNKS_PER_WORKER = 4
+
+# The worker object of this process (set in worker processes only).
+_worker = None
+
+
+class _ChunkWorker:
+
+    """This class encrypts or decrypts chunks of a message in a worker
+    process.  The cipher's keys are set up once, when the worker
+    starts.
+    """
+
+    def __init__(self, cipher_class, mode, options, pad_offset):
+        """Builds the cipher and gets its keys.
+
+        Arguments:
+        - cipher_class -- the class of the cipher.
+        - mode -- "Encrypt" or "Decrypt".
+        - options -- the cipher's options.
+        - pad_offset -- the offset of the message in the pad file, if
+            one is used.
+        """
+        self.cipher = cipher_class(mode, "", options)
+        self.cipher._get_keys()
+        if options.get("pad_file"):
+            self.pad_file = pads.PadFile(options["pad_file"])
+            self.pad_offset = pad_offset
+            self.pad_code = ""
+        else:
+            self.pad_file = None
+            self.pad_code = self.cipher._get_pad_code()
+        # end if
+    # end method
+
+    def decrypt(self, chunk, start, final):
+        """Decrypts a chunk of the message and removes the pad.
+
+        Arguments:
+        - chunk -- the ciphertext (a whole number of blocks).
+        - start -- the offset of its plaintext in the message.
+        - final -- True if this is the last chunk of the message.
+
+        Returns:  the plaintext.
+        """
+        text = self.cipher._decrypt_text(chunk)
+        if final:
+            text = self.cipher._decrypt_final(text)
+        # end if
+        return self._pad(text, start)
+    # end method
+
+    def encrypt(self, chunk, start):
+        """Applies the pad to a chunk of the message and encrypts it.
+
+        Arguments:
+        - chunk -- the plaintext (a whole number of blocks, except for
+            the last chunk).
+        - start -- its offset in the message.
+
+        Returns:  the ciphertext.
+        """
+        return self.cipher._encrypt_text(self._pad(chunk, start))
+    # end method
+
+    def _pad(self, text, start):
+        """Internal method that applies the one-time pad, if any, to a
+        chunk of plaintext.
+
+        Arguments:
+        - text -- the plaintext.
+        - start -- its offset in the message.
+
+        Returns:  the padded text.
+        """
+        if self.pad_file is not None:
+            # Each chunk reads its own part of the pad file.
+            return self.cipher._apply_pad(text, self.pad_file.read(
+                self.pad_offset + start, len(text)))
+        elif self.pad_code:
+            return self.cipher._apply_pad(text, self.pad_code, start)
+        # end if
+        return text
+    # end method
+
+
+def run(cipher_class, mode, text, options, workers=None):
+    """Runs a cipher headless over a text, splitting the work among
+    several processes.  Texts that are too short, and ciphers without a
+    block_length (except when decrypting a segmented cipher), are run
+    in this process as usual.
+
+    Arguments:
+    - cipher_class -- the class of the cipher.
+    - mode -- "Encrypt" or "Decrypt".
+    - text -- the text to encrypt or decrypt.
+    - options -- the cipher's options (see ciphers.Cipher); a
+        dictionary, as the cipher always runs headless.
+
+    Named arguments:
+    - workers -- the number of processes to use (default None, for one
+        per CPU).
+
+    Returns:  the cipher object, with its result set.  Raises ValueError
+     if a key or the text is invalid.
+    """
+    cipher = cipher_class(mode, text, options)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # end if
+    split = (workers >= 2) and (len(text) >= MIN_PARALLEL_LENGTH)
+    if split:
+        # Get (and check) the keys here first, so that the workers
+        #  cannot fail to.  The length of a block may depend on the
+        #  keys.
+        cipher._get_keys()
+    # end if
+    if split and cipher.segmented and (mode == "Decrypt"):
+        _decrypt_segments(cipher, workers)
+        return cipher
+    # end if (function exits)
+    if (cipher.block_length is None) or not split:
+        if mode == "Encrypt":
+            cipher.encrypt()
+        else:
+            cipher.decrypt()
+        # end if
+        return cipher
+    # end if (function exits)
+    if mode == "Encrypt":
+        _encrypt(cipher, workers)
+    else:
+        _decrypt(cipher, workers)
+    # end if
+    return cipher
+# end function
+
+
+def _chunk_size(length, block, workers):
+    """Works out how long the chunks of a text should be.
+
+    Arguments:
+    - length -- the length of the text.
+    - block -- the length of a block (chunks are whole blocks).
+    - workers -- the number of worker processes.
+
+    Returns:  the chunk size.
+    """
+    size = max(length // (workers * CHUNKS_PER_WORKER), MIN_CHUNK_SIZE)
+    return max(size - (size % block), block)
+# end function
+
+
+def _decrypt(cipher, workers):
+    """Decrypts the ciphertext of a cipher on several processes.
+
+    Arguments:
+    - cipher -- the cipher object, with its keys set up.
+    - workers -- the number of worker processes.
+
+    Returns:  nothing.
+    """
+    cipher._block_input()
+    text = cipher.ciphertext
+    block = cipher.block_length * cipher.cipher_width
+    # Only ciphers that pad the last block need whole blocks.
+    unit = block if cipher.whole_blocks else cipher.cipher_width
+    if len(text) % unit > 0:
+        cipher._abort(
+            "The encrypted text is not a multiple of " + str(unit) +
+            " characters long.")
+    # end if
+    pad_offset = _get_pad(cipher)
+    size = _chunk_size(len(text), block, workers)
+    starts = range(0, len(text), size)
+    with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=_start_worker,
+            initargs=(type(cipher), cipher.mode, cipher.options,
+                      pad_offset)) as executor:
+        cipher.plaintext = "".join(executor.map(
+            _decrypt_chunk, [text[start:start + size] for start in starts],
+            [start // cipher.cipher_width for start in starts],
+            [start + size >= len(text) for start in starts]))
+    # end with
+    cipher._intelligent_decrypt()
+    return
+# end function
+
+
+def _decrypt_chunk(chunk, start, final):
+    """Decrypts a chunk in a worker process.
+
+    Arguments:  as for _ChunkWorker.decrypt.
+
+    Returns:  the plaintext.
+    """
+    return _worker.decrypt(chunk, start, final)
+# end function
+
+
+def _decrypt_segment(piece):
+    """Decrypts a piece of a segmented cipher's ciphertext in a worker
+    process.
+
+    Arguments:
+    - piece -- the piece (which starts at a mark).
+
+    Returns:  the decrypted piece.
+    """
+    return _worker.cipher._decrypt_text(piece)
+# end function
+
+
+def _decrypt_segments(cipher, workers):
+    """Decrypts the ciphertext of a segmented cipher on several
+    processes.  The workers only decrypt the pieces; the one-time pad
+    is removed here, from the whole text.
+
+    Arguments:
+    - cipher -- the cipher object, with its keys set up.
+    - workers -- the number of worker processes.
+
+    Returns:  nothing.
+    """
+    cipher._block_input()
+    text = cipher.ciphertext
+    pieces = cipher._split_ciphertext(
+        text, _chunk_size(len(text), 1, workers))
+    with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=_start_worker,
+            initargs=(type(cipher), cipher.mode, cipher.options,
+                      None)) as executor:
+        cipher.plaintext = cipher._decrypt_final(
+            "".join(executor.map(_decrypt_segment, pieces)))
+    # end with
+    cipher._one_time_pad()
+    cipher._intelligent_decrypt()
+    return
+# end function
+
+
+def _encrypt(cipher, workers):
+    """Encrypts the plaintext of a cipher on several processes.
+
+    Arguments:
+    - cipher -- the cipher object, with its keys set up.
+    - workers -- the number of worker processes.
+
+    Returns:  nothing.
+    """
+    cipher._intelligent_encrypt()
+    cipher._format_plaintext()
+    text = cipher.plaintext
+    pad_offset = _get_pad(cipher)
+    size = _chunk_size(len(text), cipher.block_length, workers)
+    starts = range(0, len(text), size)
+    with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=_start_worker,
+            initargs=(type(cipher), cipher.mode, cipher.options,
+                      pad_offset)) as executor:
+        cipher.ciphertext = "".join(executor.map(
+            _encrypt_chunk, [text[start:start + size] for start in starts],
+            starts))
+    # end with
+    cipher._block_output()
+    return
+# end function
+
+
+def _encrypt_chunk(chunk, start):
+    """Encrypts a chunk in a worker process.
+
+    Arguments:  as for _ChunkWorker.encrypt.
+
+    Returns:  the ciphertext.
+    """
+    return _worker.encrypt(chunk, start)
+# end function
+
+
+def _get_pad(cipher):
+    """Checks the one-time pad options before the workers start.  If a
+    pad file is used, the message's range of it is found here (and
+    reserved, when encrypting); each worker reads its own part of it.
+
+    Arguments:
+    - cipher -- the cipher object.
+
+    Returns:  the offset of the message in the pad file, or None if
+     there is no pad file.
+    """
+    if not cipher.options.get("pad_file"):
+        cipher._get_pad_code()
+        return None
+    # end if (function exits)
+    with pads.PadFile(cipher.options["pad_file"]) as pad_file:
+        cipher._get_pad_offset(pad_file)
+    # end with
+    return cipher.pad_offset
+# end function
+
+
+def _start_worker(cipher_class, mode, options, pad_offset):
+    """Sets up a worker process.
+
+    Arguments:  as for _ChunkWorker.
+
+    Returns:  nothing.
+    """
+    global _worker
+    _worker = _ChunkWorker(cipher_class, mode, options, pad_offset)
+    return
+# end function
@@ -0,0 +1,171 @@
+"""This module rearranges text by transposition.
+
+In a columnar transposition the text is written into rows of a fixed
+width and read off a column at a time, in an order set by a key (or
+left to right, without one), optionally reading every other column
+upward.  In a periodic fractionation (as in the Bifid Cipher) a text
+made of two halves is read a period from the first half, then a period
+from the second, and so on.  Either rearrangement depends only on the
+length of the text and the key or period, so it is worked out once as a
+permutation of indices, kept in a cache of the most recently used, and
+applied to the text with a single gather (operator.itemgetter).
+Decrypting applies the inverse permutation the same way.
+
+    Constants:
+    - CACHE_SIZE:  The number of permutations kept.  (A permutation of
+       a long text takes a lot of memory, so only a few are kept.)
+
+    External functions:
+    - apply:  Rearranges a text by a permutation.
+    - cache_clear:  Empties the cache.
+    - columnar:  Returns the permutation for a columnar transposition.
+    - fractionation:  Returns the permutation for a periodic
+       fractionation.
+    - key_order:  Returns the order in which a key reads the columns.
+"""
+
+import functools
+import itertools
+import operator
+
+CACHE_SIZE = 16
+
+
+def apply(text, permutation):
+    """Rearranges a text by a permutation.
+
+    Arguments:
+    - text -- the text.
+    - permutation -- the permutation (see columnar); the nth character
+        of the result is the character of text at its nth index.
+
+    Returns:  the rearranged text.
+    """
+    if not permutation:
+        return ""
+    # end if (function exits)
+    # (With a single index, itemgetter returns a single character,
+    #  which join leaves as it is.)
+    return "".join(operator.itemgetter(*permutation)(text))
+# end function
+
+
+def cache_clear():
+    """Empties the cache.
+
+    Arguments:  none.
+
+    Returns:  nothing.
+    """
+    columnar.cache_clear()
+    fractionation.cache_clear()
+    return
+# end function
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def columnar(length, width, key=None, alternate=False, inverse=False):
+    """Returns the permutation for a columnar transposition, building it
+    only if it is not in the cache.
+
+    Arguments:
+    - length -- the length of the text.
+    - width -- the width of the rows the text is written into.  (The
+        last row may be short.)
+
+    Named arguments:
+    - key -- a string of width characters whose alphabetical order is
+        the order in which the columns are read (default None, to read
+        them left to right).
+    - alternate -- whether every other column (the second, fourth and
+        so on, in the order read) is read upward (default False).
+    - inverse -- whether to return the inverse permutation, which puts
+        the transposed text back (default False).
+
+    Returns:  a tuple of indices.
+    """
+    if inverse:
+        # Write each column's positions in the transposed text back to
+        #  the column, with slice assignment.
+        positions = [0] * length
+        start = 0
+        for number, column in enumerate(key_order(width, key)):
+            column_length = len(range(column, length, width))
+            indices = range(start, start + column_length)
+            if alternate and (number % 2):
+                indices = reversed(indices)
+            # end if
+            positions[column::width] = indices
+            start += column_length
+        # end for
+        return tuple(positions)
+    # end if (function exits)
+    columns = []
+    for number, column in enumerate(key_order(width, key)):
+        indices = range(column, length, width)
+        if alternate and (number % 2):
+            indices = reversed(indices)
+        # end if
+        columns.append(indices)
+    # end for
+    return tuple(itertools.chain.from_iterable(columns))
+# end function
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def fractionation(length, period, inverse=False):
+    """Returns the permutation for a periodic fractionation, building it
+    only if it is not in the cache.  The text is made of two halves,
+    each length long; the fractionated text takes period characters
+    from the first half, then the same characters of the second half,
+    and so on.  (The last period may be short.)
+
+    Arguments:
+    - length -- the length of each half of the text.
+    - period -- the period.
+
+    Named arguments:
+    - inverse -- whether to return the inverse permutation, which puts
+        the halves back together (default False).
+
+    Returns:  a tuple of indices.
+    """
+    starts = range(0, length, period)
+    if inverse:
+        # Each period of the fractionated text starts at twice the
+        #  start of the period in the halves.
+        return tuple(itertools.chain(
+            itertools.chain.from_iterable(
+                range(2 * start, start + min(start + period, length))
+                for start in starts),
+            itertools.chain.from_iterable(
+                range(start + min(start + period, length),
+                      2 * min(start + period, length))
+                for start in starts)))
+    # end if (function exits)
+    return tuple(itertools.chain.from_iterable(
+        itertools.chain(range(start, min(start + period, length)),
+                        range(length + start,
+                              length + min(start + period, length)))
+        for start in starts))
+# end function
+
+
+def key_order(width, key=None):
+    """Returns the order in which a key reads the columns:  by the
+    alphabetical order of its characters, and left to right among
+    repeated characters.
+
+    Arguments:
+    - width -- the number of columns.
+
+    Named arguments:
+    - key -- the key (default None, for left to right).
+
+    Returns:  a sequence of column indices.
+    """
+    if key is None:
+        return range(width)
+    # end if (function exits)
+    return sorted(range(width), key=key.__getitem__)
+# end function
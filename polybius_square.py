@@ -1,19 +1,47 @@
+import operator
+
 import i_o
+import tables
 
 from ciphers import Cipher
 
 ALPHANUM = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+# The square has six rows and six columns, numbered 1 to 6.  Each
+#  character is encrypted as its row digit followed by its column digit;
+#  ROW_DIGITS and COLUMN_DIGITS translate every character to each.
+#  Going back, ROW_NUMBERS and COLUMN_NUMBERS translate the digits to
+#  the position of the first character of the row (0, 6, ... 30) and
+#  to the position in the row (0-5), whose sum is the position of the
+#  character in ALPHANUM.
+DIGITS = b"123456"
+ROW_DIGITS = bytes.maketrans(
+    ALPHANUM.encode("ascii"), bytes(digit for digit in DIGITS
+                                    for col in range(6)))
+COLUMN_DIGITS = bytes.maketrans(ALPHANUM.encode("ascii"), DIGITS * 6)
+ROW_NUMBERS = bytes.maketrans(DIGITS, bytes(range(0, 36, 6)))
+COLUMN_NUMBERS = bytes.maketrans(DIGITS, bytes(range(6)))
+# Every byte but the numerals, to be deleted from ciphertext.
+NOT_NUMBERS = bytes(
+    byte for byte in range(128) if chr(byte) not in ALPHANUM[26:])
+# Numbers are printed this many to a line, when lines are broken.
+NUMBERS_PER_LINE = 25
 
 
 class PolybiusSquare(Cipher):
     
     """This class implements the Polybius Square Cipher."""
     
-    def __init__(self, mode, text):
+    # Each character is encrypted on its own, into two digits.
+    block_length = 1
+    cipher_width = 2
+    
+    def __init__(self, mode, text, options=None):
         """At initialization, the mode of the object is set and the
-        appropriate attribute is set to the original text.
+        appropriate attribute is set to the original text.  If options
+        are given, the cipher runs headless (see Cipher).
         """
         self.mode = mode
+        self.options = options
         self.name = "Polybius Square"
         if mode == "Encrypt":
             self.plaintext = text
@@ -36,15 +64,15 @@ class PolybiusSquare(Cipher):
         Returns:  nothing.
         """
         # Before doing anything with the ciphertext, strip it of any
-        #  spaces or non-numeric characters, and turn it into a list of
-        #  numbers.
-        working_list = self._block_input()
-        # Loop through the list and decrypt each number.
-        for char in working_list:
-            num = ((int(char[0]) - 1) * 6) + int(char[1]) - 1
-            # Look up the plaintext character and add it.
-            self.plaintext += ALPHANUM[num]
-        # end for
+        #  spaces or non-numeric characters.
+        self._block_input()
+        # Decrypt each two-digit number.
+        text = self._decrypt_text(self.ciphertext)
+        if text is None:
+            # The text was invalid (and the user has been told).
+            return
+        # end if (method exits)
+        self.plaintext = text
         # Finally, allow for a one-time pad.
         self._one_time_pad()
         self._intelligent_decrypt()
@@ -65,50 +93,33 @@ class PolybiusSquare(Cipher):
         # Present the option to use a one-time pad.
         self._one_time_pad()
         # The plaintext is encrypted using the a number substitution.
-        working_list = []
-        for char in self.plaintext:
-            # The assignment can be made in one statement, but for
-            #  readability it is broken down here.  Unlike other ciphers
-            #  the ciphertext is better stored as a list of numbers.
-            index = ALPHANUM.index(char)
-            num = (index // 6 * 10) + (index % 6)
-            # Finally, add 1 to each digit to eliminate any zeroes.
-            working_list.append(num + 11)
-        # end for
+        self.ciphertext = self._encrypt_text(self.plaintext)
         # Separate into 25-number lines if the user
         #  chooses.  (This method is overridden by this class.)
-        self._block_output(working_list)
+        self._block_output()
         return
     # end method
     
     def _block_input(self):
         """Internal method that overrides the base class method.
-        Strips out spaces, non-numeric characters, and breaks the
-        input apart into a series of two-digit numbers.
+        Strips out spaces and non-numeric characters, and drops a last
+        digit that does not make up a two-digit number.
         
         Called by the decrypt method.
         
         Arguments:  none.
         
-        Returns:  a list of numbers.
+        Returns:  nothing.
         """
-        new_list = []
-        held = None
-        for char in self.ciphertext:
-            # Discard any space and any non-alphanumeric characters.
-            if char in ALPHANUM[26:]:
-                if held:
-                    new_list.append(held + char)
-                    held = None
-                else:
-                    held = char
-                # end if
-            # end if
-        # end for
-        return new_list
+        # (Anything that is not ASCII is not a numeral either.)
+        digits = self.ciphertext.encode("ascii", "ignore").translate(
+            None, NOT_NUMBERS)
+        self.ciphertext = digits[:len(digits) - (len(digits) % 2)].decode(
+            "ascii")
+        return
     # end method
     
-    def _block_output(self, working_list):
+    def _block_output(self):
         """Internal method that overrides the base class method.
         Formats the ciphertext in groups of 25 two-digit numbers
         on each line, if the user chooses.  (May also call the base
@@ -116,44 +127,92 @@ class PolybiusSquare(Cipher):
         
         Called by the encrypt method.
         
-        Named arguments:
-        - working_list -- the list of numbers constituting the
-            ciphertext.
+        Arguments:  none.
         
         Returns:  nothing.
         """
-        # Clear the screen.
-        i_o.clear_screen()
-        working_string = ""
-        if i_o.yes_no("Would you like the output separated" +
-                              " into two-digit numbers?"):
-            # If yes, check to see if the user wants line breaks.
-            line_break = i_o.yes_no(
-                    "Would you like the encrypted text to be printed" +
-                    "in\n25-number lines for immproved readability?")
-            # Build an output string of two-digit numbers.
-            # If yes, insert a new line every 25 numbers.
-            working_string = "\n"
-            num = 1
-            while len(working_list) > 0:
-                # Pop numbers off the list one at a time until empty.
-                working_string += str(working_list.pop(0)) + " "
-                if line_break:
-                    # Only use if the user wants line breaks.
-                    if num < 25:
-                        num += 1
-                    else:
-                        working_string += "\n"
-                        num = 1
-                    # end if
-                # end if
-            # end while
-            self.ciphertext = working_string
+        if self.options is not None:
+            # Headless mode:  blocks means two-digit numbers here.
+            separate = self.options.get("blocks", False)
+            line_break = self.options.get("line_break", False)
         else:
-            # If no, dump the entire list into ciphertext as one
-            #  string.
-            self.ciphertext = "".join(str(n) for n in working_list)
-            # Then call the original method.
+            # Clear the screen.
+            i_o.clear_screen()
+            separate = i_o.yes_no("Would you like the output separated" +
+                                  " into two-digit numbers?")
+            if separate:
+                # If yes, check to see if the user wants line breaks.
+                line_break = i_o.yes_no(
+                        "Would you like the encrypted text to be printed" +
+                        "in\n25-number lines for immproved readability?")
+            # end if
+        # end if
+        if not separate:
+            # If no, leave the ciphertext as one string, and call the
+            #  original method.
             super()._block_output()
+            return
+        # end if (method exits)
+        # Build an output string of two-digit numbers, each followed by
+        #  a space, on a new line:  the digits are copied into every
+        #  first and second place of three, leaving the spaces.
+        digits = self.ciphertext.encode("ascii")
+        numbers = bytearray(b" " * (len(digits) // 2 * 3))
+        numbers[0::3] = digits[0::2]
+        numbers[1::3] = digits[1::2]
+        numbers = numbers.decode("ascii")
+        if line_break:
+            # Insert a new line after every 25 numbers (each three
+            #  characters long, with its space).
+            width = NUMBERS_PER_LINE * 3
+            lines = [numbers[pos:pos + width]
+                     for pos in range(0, len(numbers), width)]
+            if lines and (len(lines[-1]) == width):
+                lines.append("")
+            # end if
+            numbers = "\n".join(lines)
+        # end if
+        self.ciphertext = "\n" + numbers
         return
     # end method
+    
+    def _decrypt_text(self, text):
+        """Decrypts a string of two-digit numbers.
+        
+        Arguments:
+        - text -- the string to decrypt (an even number of digits).
+        
+        Returns:  the decrypted string, or None if it includes a digit
+         that is not in the square.
+        """
+        digits = text.encode("ascii")
+        if digits.translate(None, DIGITS):
+            self._abort(
+                "The encrypted text includes numbers that are not in " +
+                "the square.")
+            return None
+        # end if (method exits)
+        # Add the position of the row to the position in the row, and
+        #  look up the character at the sum.
+        return bytes(map(
+            operator.add, digits[0::2].translate(ROW_NUMBERS),
+            digits[1::2].translate(COLUMN_NUMBERS))).translate(
+                tables.TO_CHARS).decode("ascii")
+    # end method
+    
+    def _encrypt_text(self, text):
+        """Encrypts a string into two-digit numbers.
+        
+        Arguments:
+        - text -- the string to encrypt.
+        
+        Returns:  the encrypted string.
+        """
+        chars = text.encode("ascii")
+        digits = bytearray(len(chars) * 2)
+        # The row digits go in the even places, the column digits in the
+        #  odd ones.
+        digits[0::2] = chars.translate(ROW_DIGITS)
+        digits[1::2] = chars.translate(COLUMN_DIGITS)
+        return digits.decode("ascii")
+    # end method
@@ -0,0 +1,324 @@
+"""This module times the stages of the ciphers, and profiles them.
+
+Every cipher runs the same stages:  when encrypting, intelligent
+encryption, formatting the plaintext, the one-time pad, the cipher
+itself and the output in blocks; when decrypting, their mirror images.
+Once timing is enabled, each call of a stage records its wall time, the
+length of the text it was given and the text it produced, and (if
+asked for) the memory it allocated at its peak, for each cipher and
+mode.  The time a cipher spends outside the other stages is reported as
+its "core" stage.  While timing is disabled, the stages cost one check
+of a flag each.
+
+The ciphers' stages are wrapped by Cipher.__init_subclass__, which
+calls instrument for each cipher class.
+
+    External functions:
+    - disable:  Stops recording stage timings.
+    - enable:  Starts recording stage timings.
+    - format_report:  Returns the stage timings as a table.
+    - instrument:  Wraps the stages of a cipher class.
+    - report:  Returns the stage timings.
+    - reset:  Clears the stage timings.
+    - run_profiled:  Runs a function under cProfile, and writes the
+       statistics to a file (for use with pstats).
+"""
+
+import cProfile
+import functools
+import time
+import tracemalloc
+
+# The stages that are timed, with the attributes holding the text each
+#  stage is given and produces.  None means the text is the stage's
+#  argument (or result).
+STAGES = {
+    "encrypt": ("plaintext", "ciphertext"),
+    "decrypt": ("ciphertext", "plaintext"),
+    "_intelligent_encrypt": ("plaintext", "plaintext"),
+    "_format_plaintext": ("plaintext", "plaintext"),
+    "_one_time_pad": ("plaintext", "plaintext"),
+    "_block_output": ("ciphertext", "ciphertext"),
+    "_block_input": ("ciphertext", "ciphertext"),
+    "_intelligent_decrypt": ("plaintext", "plaintext"),
+    "_encrypt_text": (None, None),
+    "_decrypt_text": (None, None)}
+# The stages that are not part of the cipher itself.
+PIPELINE_STAGES = [
+    "_intelligent_encrypt", "_format_plaintext", "_one_time_pad",
+    "_block_output", "_block_input", "_intelligent_decrypt"]
+REPORT_FIELDS = [
+    "cipher", "mode", "stage", "calls", "seconds", "chars_in", "chars_out",
+    "peak_bytes"]
+
+_enabled = False
+_allocations = False
+# The timings, by (cipher, mode, stage):  a list of the number of calls,
+#  total seconds, total characters in and out, and the largest peak of
+#  memory allocated.
+_records = {}
+# The stages running now (so that a stage calling its overridden
+#  version is only timed once), and, when allocations are traced, a
+#  [starting memory, highest peak] pair for each.
+_running = set()
+_memory_stack = []
+
+
+def disable():
+    """Stops recording stage timings (keeping those recorded).
+
+    Arguments:  none.
+
+    Returns:  nothing.
+    """
+    global _enabled, _allocations
+    if _allocations:
+        tracemalloc.stop()
+    # end if
+    _enabled = False
+    _allocations = False
+    return
+# end function
+
+
+def enable(allocations=False):
+    """Starts recording stage timings.
+
+    Arguments:  none.
+
+    Named arguments:
+    - allocations -- whether to trace the memory each stage allocates,
+        with tracemalloc (which slows everything down; default False).
+
+    Returns:  nothing.
+    """
+    global _enabled, _allocations
+    if allocations and not _allocations:
+        tracemalloc.start()
+    # end if
+    _allocations = _allocations or allocations
+    _enabled = True
+    return
+# end function
+
+
+def format_report():
+    """Returns the stage timings as a table, one line per stage.
+
+    Arguments:  none.
+
+    Returns:  the table, as a string.
+    """
+    rows = [[
+        "Cipher", "Mode", "Stage", "Calls", "Seconds", "Chars in",
+        "Chars out", "Peak bytes"]]
+    for record in report():
+        rows.append([
+            record["cipher"], record["mode"], record["stage"],
+            str(record["calls"]), "%.6f" % record["seconds"],
+            str(record["chars_in"]), str(record["chars_out"]),
+            "" if record["peak_bytes"] is None else
+            str(record["peak_bytes"])])
+    # end for
+    widths = [max(len(row[col]) for row in rows) for col in range(8)]
+    lines = []
+    for row in rows:
+        lines.append("  ".join(
+            cell.ljust(width) if col < 3 else cell.rjust(width)
+            for col, (cell, width) in enumerate(zip(row, widths))))
+    # end for
+    return "\n".join(lines)
+# end function
+
+
+def instrument(cipher_class):
+    """Wraps the stages a cipher class defines, so that they can be
+    timed.
+
+    Arguments:
+    - cipher_class -- the class.
+
+    Returns:  nothing.
+    """
+    for name in STAGES:
+        if name in cipher_class.__dict__:
+            setattr(cipher_class, name, _stage(cipher_class.__dict__[name]))
+        # end if
+    # end for
+    return
+# end function
+
+
+def report():
+    """Returns the stage timings, including the time each cipher spent
+    in its core (outside the other stages).
+
+    Arguments:  none.
+
+    Returns:  a list of dictionaries with the keys in REPORT_FIELDS
+     (peak_bytes is None unless allocations were traced).
+    """
+    records = []
+    for (cipher, mode, stage), record in sorted(_records.items()):
+        calls, seconds, chars_in, chars_out, peak = record
+        records.append({
+            "cipher": cipher, "mode": mode, "stage": stage, "calls": calls,
+            "seconds": seconds, "chars_in": chars_in,
+            "chars_out": chars_out, "peak_bytes": peak})
+        if stage in ("encrypt", "decrypt"):
+            # The core is the whole, less the other stages.
+            core = seconds - sum(
+                _records[(cipher, mode, other)][1]
+                for other in PIPELINE_STAGES
+                if (cipher, mode, other) in _records)
+            records.append({
+                "cipher": cipher, "mode": mode, "stage": "core",
+                "calls": calls, "seconds": max(core, 0.0),
+                "chars_in": chars_in, "chars_out": chars_out,
+                "peak_bytes": None})
+        # end if
+    # end for
+    return records
+# end function
+
+
+def reset():
+    """Clears the stage timings.
+
+    Arguments:  none.
+
+    Returns:  nothing.
+    """
+    _records.clear()
+    return
+# end function
+
+
+def run_profiled(path, func, *args, **kwargs):
+    """Runs a function under cProfile, and writes the statistics to a
+    file, which can be read with pstats (or tools such as snakeviz).
+
+    Arguments:
+    - path -- the file to write.
+    - func -- the function to run.
+
+    Other arguments are passed to the function.
+
+    Returns:  the function's result.
+    """
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
+    # end try
+# end function
+
+
+def _length(cipher, attribute, value):
+    """Internal function that finds the length of the text a stage was
+    given or produced.
+
+    Arguments:
+    - cipher -- the cipher object.
+    - attribute -- the attribute holding the text, or None.
+    - value -- the text to use if the attribute is None.
+
+    Returns:  the length, or 0 if there is no text.
+    """
+    if attribute is not None:
+        value = getattr(cipher, attribute, "")
+    # end if
+    try:
+        return len(value)
+    except TypeError:
+        return 0
+    # end try
+# end function
+
+
+def _stage(func):
+    """Internal function that wraps a stage, so that its calls are
+    timed while timing is enabled.
+
+    Arguments:
+    - func -- the stage method.
+
+    Returns:  the wrapped method.
+    """
+    name = func.__name__
+    in_attribute, out_attribute = STAGES[name]
+
+    @functools.wraps(func)
+    def wrapper(cipher, *args, **kwargs):
+        if not _enabled:
+            return func(cipher, *args, **kwargs)
+        # end if (function exits)
+        key = (getattr(cipher, "name", type(cipher).__name__),
+               getattr(cipher, "mode", ""), name)
+        if (id(cipher), name) in _running:
+            # An override calling the method it overrides.
+            return func(cipher, *args, **kwargs)
+        # end if (function exits)
+        chars_in = _length(cipher, in_attribute, args[0] if args else "")
+        _running.add((id(cipher), name))
+        if _allocations:
+            _start_memory()
+        # end if
+        start = time.perf_counter()
+        try:
+            result = func(cipher, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            peak = _stop_memory() if _allocations else None
+            _running.discard((id(cipher), name))
+        # end try
+        record = _records.setdefault(key, [0, 0.0, 0, 0, None])
+        record[0] += 1
+        record[1] += seconds
+        record[2] += chars_in
+        record[3] += _length(cipher, out_attribute, result)
+        if peak is not None:
+            record[4] = max(record[4] or 0, peak)
+        # end if
+        return result
+    # end function
+
+    return wrapper
+# end function
+
+
+def _start_memory():
+    """Internal function that starts measuring the peak memory of a
+    stage.  The peak of the stage that is running, if any, is saved
+    first, since tracemalloc has only one peak.
+
+    Arguments:  none.
+
+    Returns:  nothing.
+    """
+    current, peak = tracemalloc.get_traced_memory()
+    if _memory_stack:
+        _memory_stack[-1][1] = max(_memory_stack[-1][1], peak)
+    # end if
+    tracemalloc.reset_peak()
+    _memory_stack.append([current, current])
+    return
+# end function
+
+
+def _stop_memory():
+    """Internal function that finishes measuring the peak memory of a
+    stage, passing its peak on to the stage that called it, if any.
+
+    Arguments:  none.
+
+    Returns:  the peak memory allocated during the stage, in bytes.
+    """
+    start, peak = _memory_stack.pop()
+    peak = max(peak, tracemalloc.get_traced_memory()[1])
+    if _memory_stack:
+        _memory_stack[-1][1] = max(_memory_stack[-1][1], peak)
+    # end if
+    return peak - start
+# end function
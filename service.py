@@ -0,0 +1,654 @@
+"""This is the network service for Secret Messages!
+-----------------------------------------------------------------------
+It encrypts and decrypts over HTTP, with JSON in and out, so that other
+programs can use the ciphers without driving the interactive script:
+
+    python coder.py serve --port 8000 --workers 4
+
+A request is a POST to /encrypt or /decrypt, whose body is a JSON
+object naming the cipher (as for "python coder.py --cipher"), the text,
+and the cipher's keys and options (see ciphers.Cipher), e.g.:
+
+    {"cipher": "hill", "text": "Attack at dawn.",
+     "options": {"keyword": "SECRET", "intelligent": true}}
+
+The response is a JSON object with the result ({"result": "..."}), or
+with an error message ({"error": "..."}) and a status of 400 for an
+invalid key or text (as coder.py exits with 1), or another 4xx or 5xx
+status for a bad request or an overloaded server.
+
+The service runs on an asyncio event loop, which reads and writes the
+requests of every connection; the ciphers themselves run on a bounded
+pool of processes (or threads), so that a long message does not hold
+up the loop.  Connections are kept alive between requests (unless the
+client asks otherwise), and closed when idle.  Requests with a body
+over the size limit are refused before it is read.  Only so many
+requests can wait for the pool at once; any more are turned away with
+503 (Service Unavailable) and a Retry-After header, rather than
+queued without limit, and each connection is read only as its
+responses are written.  A request whose cipher takes too long gets 504
+(Gateway Timeout).  (A cipher already running cannot be stopped, so
+its place in the pool is taken until it finishes.)  If a worker process
+dies, e.g. out of memory, the requests in the pool get 503 and a new
+pool is started.
+
+    Constants:
+    - IDLE_TIMEOUT:  The number of seconds a connection is kept open
+       waiting for a request (or the rest of one).
+    - LINGER_TIMEOUT:  The number of seconds the rest of a refused
+       request is read (and discarded) before its connection is closed.
+    - MAX_BODY_SIZE:  The largest request body accepted, in bytes.
+    - MAX_HEADER_SIZE:  The largest request head accepted, in bytes.
+    - REQUEST_TIMEOUT:  The number of seconds a cipher is given.
+
+    External classes:
+    - Service:  The service.
+
+    External functions:
+    - main:  Runs the service from the command line.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import http
+import json
+import multiprocessing
+import os
+import signal
+import sys
+
+import coder
+
+IDLE_TIMEOUT = 15
+LINGER_TIMEOUT = 2
+MAX_BODY_SIZE = 16 << 20
+MAX_HEADER_SIZE = 16 << 10
+REQUEST_TIMEOUT = 60
+# The number of requests that can wait for each worker of the pool
+#  before more are turned away.
+PENDING_PER_WORKER = 4
+# Options that are not accepted over the network:  a pad file would be
+#  read from (and reserved on) the server's disk.
+REFUSED_OPTIONS = {"pad_file", "pad_offset"}
+ACTIONS = {"/encrypt": "Encrypt", "/decrypt": "Decrypt"}
+
+
+class _RequestError(Exception):
+
+    """This exception ends a request with an error response.
+
+    Arguments:
+    - status -- the HTTP status.
+    - message -- the error message.
+
+    Named arguments:
+    - close -- whether to close the connection afterwards (default
+        False).
+    - headers -- a list of extra header lines (default None).
+    """
+
+    def __init__(self, status, message, close=False, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.close = close
+        self.headers = headers or []
+    # end method
+
+
+class Service:
+
+    """This class serves encryption and decryption requests.
+
+    Methods:
+    - close:  Shuts down the pool.
+    - handle:  Serves the requests of one connection.
+    - serve:  Serves connections until cancelled.
+    - start:  Starts listening for connections.
+    """
+
+    def __init__(
+            self, workers=None, threads=False, max_body_size=MAX_BODY_SIZE,
+            request_timeout=REQUEST_TIMEOUT, idle_timeout=IDLE_TIMEOUT,
+            max_pending=None):
+        """Sets up the service and its pool.
+
+        Arguments:  none.
+
+        Named arguments:
+        - workers -- the size of the pool (default None, for one per
+            CPU).
+        - threads -- whether the pool is of threads rather than
+            processes (default False).
+        - max_body_size -- the largest request body accepted, in bytes
+            (default MAX_BODY_SIZE).
+        - request_timeout -- the number of seconds a cipher is given
+            (default REQUEST_TIMEOUT).
+        - idle_timeout -- the number of seconds a connection is kept
+            open waiting for a request (default IDLE_TIMEOUT).
+        - max_pending -- the number of requests that can be running or
+            waiting for the pool at once (default None, for
+            PENDING_PER_WORKER for each worker).
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.threads = threads
+        self.executor = self._new_pool()
+        self.max_body_size = max_body_size
+        self.request_timeout = request_timeout
+        self.idle_timeout = idle_timeout
+        self.max_pending = max_pending or self.workers * PENDING_PER_WORKER
+        # The number of requests given to the pool and not yet
+        #  finished there (even if they have timed out).
+        self.pending = 0
+    # end method
+
+    def close(self):
+        """Shuts down the pool.  Requests not yet started are dropped;
+        the ones running are finished first.
+
+        Arguments:  none.
+
+        Returns:  nothing.
+        """
+        self.executor.shutdown(cancel_futures=True)
+        return
+    # end method
+
+    async def handle(self, reader, writer):
+        """Serves the requests of one connection, one at a time, until
+        either side closes it or it is idle too long.
+
+        Arguments:
+        - reader -- the connection's asyncio.StreamReader.
+        - writer -- its asyncio.StreamWriter.
+
+        Returns:  nothing.
+        """
+        try:
+            keep_alive = True
+            while keep_alive:
+                linger = False
+                try:
+                    status, payload, keep_alive, headers = (
+                        await self._serve_request(reader, writer))
+                except _RequestError as err:
+                    status = err.status
+                    payload = {"error": err.message}
+                    keep_alive = not err.close
+                    headers = err.headers
+                    # The client may still be sending the request.
+                    linger = err.close
+                # end try
+                if status is None:
+                    # The client closed the connection, or went quiet.
+                    break
+                # end if
+                writer.write(_response(status, payload, keep_alive, headers))
+                # Read nothing more until the client takes the response.
+                await writer.drain()
+                if linger:
+                    await self._linger(reader, writer)
+                # end if
+            # end while
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # The service is shutting down.  (Nothing waits for this
+            #  task, and asyncio would log its cancellation as an
+            #  error.)
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+            # end try
+        # end try
+        return
+    # end method
+
+    async def serve(self, host, port):
+        """Serves connections until the task is cancelled (which SIGTERM
+        does, where signals are supported).
+
+        Arguments:
+        - host -- the address to listen on.
+        - port -- the port to listen on (0 for any free port).
+
+        Returns:  nothing.
+        """
+        try:
+            asyncio.get_running_loop().add_signal_handler(
+                signal.SIGTERM, asyncio.current_task().cancel)
+        except (NotImplementedError, RuntimeError):
+            pass
+        # end try
+        server = await self.start(host, port)
+        async with server:
+            for sock in server.sockets:
+                print("Serving on http://%s:%d" % sock.getsockname()[:2],
+                      file=sys.stderr)
+            # end for
+            await server.serve_forever()
+        # end with
+        return
+    # end method
+
+    async def start(self, host, port):
+        """Starts listening for connections.
+
+        Arguments:
+        - host -- the address to listen on.
+        - port -- the port to listen on (0 for any free port).
+
+        Returns:  the asyncio.Server.
+        """
+        return await asyncio.start_server(
+            self.handle, host, port, limit=MAX_HEADER_SIZE)
+    # end method
+
+    def _release(self, future):
+        """Internal method that counts a request as finished in the
+        pool.
+
+        Arguments:
+        - future -- the request's future in the pool.
+
+        Returns:  nothing.
+        """
+        self.pending -= 1
+        return
+    # end method
+
+    async def _linger(self, reader, writer):
+        """Internal method that reads and discards the rest of a
+        refused request, for up to LINGER_TIMEOUT seconds, before the
+        connection is closed.  (Closing it with the request unread
+        would reset it, and the client could lose the response.)
+
+        Arguments:
+        - reader -- the connection's asyncio.StreamReader.
+        - writer -- its asyncio.StreamWriter.
+
+        Returns:  nothing.
+        """
+        if writer.can_write_eof():
+            writer.write_eof()
+        # end if
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + LINGER_TIMEOUT
+        try:
+            while True:
+                data = await asyncio.wait_for(
+                    reader.read(1 << 16), max(deadline - loop.time(), 0))
+                if not data:
+                    break
+                # end if
+            # end while
+        except asyncio.TimeoutError:
+            pass
+        # end try
+        return
+    # end method
+
+    def _new_pool(self):
+        """Internal method that starts a pool of workers.
+
+        Arguments:  none.
+
+        Returns:  the concurrent.futures.Executor.
+        """
+        if self.threads:
+            return concurrent.futures.ThreadPoolExecutor(self.workers)
+        # end if (method exits)
+        # Workers forked from the service itself would hold copies of
+        #  its listening socket and open connections, and a connection
+        #  the service closed would not reach the client until they
+        #  exited.  Where it can, the pool forks them from a fresh
+        #  server process instead.
+        context = None
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+        # end if
+        return concurrent.futures.ProcessPoolExecutor(
+            self.workers, mp_context=context)
+    # end method
+
+    async def _read_request(self, reader):
+        """Internal method that reads a request.
+
+        Arguments:
+        - reader -- the connection's asyncio.StreamReader.
+
+        Returns:  the method, path, HTTP version, headers (a dictionary
+         with lower-case names) and body of the request, or None if the
+         client closed the connection (or went quiet) first.  Raises
+         _RequestError if the request is too large or malformed.
+        """
+        try:
+            head = await asyncio.wait_for(
+                reader.readuntil(b"\r\n\r\n"), self.idle_timeout)
+        except asyncio.IncompleteReadError as err:
+            if err.partial.strip():
+                raise _RequestError(400, "Incomplete request.", close=True)
+            # end if (method exits)
+            return None
+        except asyncio.LimitOverrunError:
+            raise _RequestError(
+                431, "The request head is too large.", close=True) from None
+        except asyncio.TimeoutError:
+            return None
+        # end try (method exits)
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        if (len(parts) != 3) or not parts[2].startswith("HTTP/1."):
+            raise _RequestError(400, "Malformed request line.", close=True)
+        # end if (method exits)
+        method, path, version = parts
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, colon, value = line.partition(":")
+                if not colon:
+                    raise _RequestError(
+                        400, "Malformed header.", close=True)
+                # end if (method exits)
+                headers[name.strip().lower()] = value.strip()
+            # end if
+        # end for
+        if "transfer-encoding" in headers:
+            raise _RequestError(
+                501, "Chunked requests are not supported; send a " +
+                "Content-Length.", close=True)
+        # end if (method exits)
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise _RequestError(
+                400, "Invalid Content-Length.", close=True) from None
+        # end try (method exits)
+        if length < 0:
+            raise _RequestError(400, "Invalid Content-Length.", close=True)
+        elif length > self.max_body_size:
+            # The body is not read, so the connection cannot be used
+            #  again.
+            raise _RequestError(
+                413, "The request body is larger than " +
+                str(self.max_body_size) + " bytes.", close=True)
+        # end if (method exits)
+        if headers.get("expect", "").lower() == "100-continue":
+            return method, path, version, headers, length
+        # end if (method exits)
+        body = await self._read_body(reader, length)
+        return method, path, version, headers, body
+    # end method
+
+    async def _read_body(self, reader, length):
+        """Internal method that reads the body of a request.
+
+        Arguments:
+        - reader -- the connection's asyncio.StreamReader.
+        - length -- the length of the body.
+
+        Returns:  the body.  Raises _RequestError if the client stops
+         sending it.
+        """
+        try:
+            return await asyncio.wait_for(
+                reader.readexactly(length), self.idle_timeout)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+            raise _RequestError(
+                400, "Incomplete request body.", close=True) from None
+        # end try
+    # end method
+
+    async def _run(self, action, cipher_name, text, options):
+        """Internal method that runs a cipher in the pool.
+
+        Arguments:
+        - action -- "Encrypt" or "Decrypt".
+        - cipher_name -- the name of the cipher (a key of
+            coder.CIPHER_CLASS).
+        - text -- the text to encrypt or decrypt.
+        - options -- the cipher's keys and options.
+
+        Returns:  the result.  Raises _RequestError if the pool is
+         full or has failed, the cipher takes too long, or a key or the
+         text is invalid.
+        """
+        if self.pending >= self.max_pending:
+            raise _RequestError(
+                503, "The server is busy; try again shortly.",
+                headers=["Retry-After: 1"])
+        # end if (method exits)
+        loop = asyncio.get_running_loop()
+        executor = self.executor
+        try:
+            future = executor.submit(
+                _run_cipher, action, cipher_name, text, options)
+            self.pending += 1
+            future.add_done_callback(
+                lambda done: loop.call_soon_threadsafe(self._release, done))
+            # On a timeout the request is cancelled, if it has not
+            #  started yet.
+            return await asyncio.wait_for(
+                asyncio.wrap_future(future), self.request_timeout)
+        except asyncio.TimeoutError:
+            raise _RequestError(
+                504, "The cipher took longer than " +
+                str(self.request_timeout) + " seconds.") from None
+        except ValueError as err:
+            raise _RequestError(400, str(err)) from None
+        except concurrent.futures.BrokenExecutor:
+            # A worker died (e.g. it ran out of memory), and took the
+            #  pool with it.  The first request to find out starts a new
+            #  one; this one has to be sent again.
+            if executor is self.executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = self._new_pool()
+            # end if
+            raise _RequestError(
+                503, "The worker pool failed and has been restarted; " +
+                "try again.", headers=["Retry-After: 1"]) from None
+        except Exception as err:
+            # Anything else is a bug, but must not take the connection
+            #  down without a response.
+            raise _RequestError(
+                500, "Internal error:  " + type(err).__name__) from None
+        # end try
+    # end method
+
+    async def _serve_request(self, reader, writer):
+        """Internal method that reads a request and works out the
+        response.
+
+        Arguments:
+        - reader -- the connection's asyncio.StreamReader.
+        - writer -- its asyncio.StreamWriter.
+
+        Returns:  the status, the JSON payload, whether to keep the
+         connection alive, and a list of extra header lines (the status
+         is None if there was no request).  Raises _RequestError for an
+         error response.
+        """
+        request = await self._read_request(reader)
+        if request is None:
+            return None, None, False, []
+        # end if (method exits)
+        method, path, version, headers, body = request
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+        # end if
+        # A client still waiting to send the body of a refused request
+        #  will not send it, so the connection is closed.
+        refuse_close = (not keep_alive) or isinstance(body, int)
+        if path not in ACTIONS:
+            raise _RequestError(404, "Not found:  " + path,
+                                close=refuse_close)
+        elif method != "POST":
+            raise _RequestError(
+                405, "Use POST.", close=refuse_close,
+                headers=["Allow: POST"])
+        # end if (method exits)
+        if isinstance(body, int):
+            # The client waits to be told to send the body.
+            writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+            await writer.drain()
+            body = await self._read_body(reader, body)
+        # end if
+        try:
+            cipher_name, text, options = _parse_body(body)
+            result = await self._run(
+                ACTIONS[path], cipher_name, text, options)
+        except _RequestError as err:
+            err.close = err.close or not keep_alive
+            raise
+        # end try
+        return 200, {"cipher": cipher_name, "result": result}, keep_alive, []
+    # end method
+
+
+def main(argv):
+    """Runs the service until it is interrupted.
+
+    Arguments:
+    - argv -- the list of command line arguments (after "serve").
+
+    Returns:  the exit code (0 for success, 1 if the service cannot
+     start, 2 for usage errors).
+    """
+    parser = argparse.ArgumentParser(
+        prog="coder.py serve",
+        description="Serve encryption and decryption over HTTP, as JSON.")
+    parser.add_argument(
+        "--host", default="127.0.0.1",
+        help="the address to listen on (default 127.0.0.1)")
+    parser.add_argument(
+        "--port", type=int, default=8000,
+        help="the port to listen on (default 8000)")
+    parser.add_argument(
+        "--workers", type=int, default=0,
+        help="the size of the worker pool (default 0, for one per CPU)")
+    parser.add_argument(
+        "--threads", action="store_true",
+        help="run the ciphers on threads rather than processes")
+    parser.add_argument(
+        "--max-body", type=int, default=MAX_BODY_SIZE,
+        help="the largest request body accepted, in bytes (default " +
+        str(MAX_BODY_SIZE) + ")")
+    parser.add_argument(
+        "--timeout", type=float, default=REQUEST_TIMEOUT,
+        help="the number of seconds a cipher is given (default " +
+        str(REQUEST_TIMEOUT) + ")")
+    parser.add_argument(
+        "--max-pending", type=int,
+        help="the number of requests that can run or wait at once " +
+        "(default " + str(PENDING_PER_WORKER) + " per worker)")
+    args = parser.parse_args(argv)
+    if (args.workers < 0) or (args.max_body < 0) or (args.timeout <= 0) or (
+            (args.max_pending is not None) and (args.max_pending < 1)):
+        parser.print_usage(sys.stderr)
+        print("coder.py serve: error: the limits must be positive",
+              file=sys.stderr)
+        return 2
+    # end if (function exits)
+    service = Service(
+        workers=args.workers or None, threads=args.threads,
+        max_body_size=args.max_body, request_timeout=args.timeout,
+        max_pending=args.max_pending)
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        pass
+    except OSError as err:
+        print("coder.py serve: error: " + str(err), file=sys.stderr)
+        return 1
+    finally:
+        service.close()
+    # end try
+    return 0
+# end function
+
+
+def _parse_body(body):
+    """Internal function that reads the cipher, text and options from
+    the body of a request.
+
+    Arguments:
+    - body -- the body (JSON, in UTF-8).
+
+    Returns:  the name of the cipher (a key of coder.CIPHER_CLASS), the
+     text and the options.  Raises _RequestError if any is invalid.
+    """
+    try:
+        request = json.loads(body)
+    except (UnicodeDecodeError, ValueError):
+        raise _RequestError(400, "The body is not valid JSON.") from None
+    # end try (function exits)
+    if not isinstance(request, dict):
+        raise _RequestError(400, "The body must be a JSON object.")
+    # end if (function exits)
+    cipher_name = coder.find_cipher(str(request.get("cipher", "")))
+    text = request.get("text")
+    options = request.get("options", {})
+    if cipher_name is None:
+        message = "Unknown cipher:  " + str(request.get("cipher"))
+    elif not isinstance(text, str):
+        message = "The text must be a string."
+    elif not isinstance(options, dict):
+        message = "The options must be a JSON object."
+    elif REFUSED_OPTIONS.intersection(options):
+        message = "Pad files cannot be used over the network."
+    else:
+        return cipher_name, text, options
+    # end if (function exits)
+    raise _RequestError(400, message)
+# end function
+
+
+def _response(status, payload, keep_alive, headers):
+    """Internal function that builds a response.
+
+    Arguments:
+    - status -- the HTTP status.
+    - payload -- the JSON payload.
+    - keep_alive -- whether the connection is kept alive.
+    - headers -- a list of extra header lines.
+
+    Returns:  the response, in bytes.
+    """
+    body = json.dumps(payload).encode("utf-8")
+    lines = [
+        "HTTP/1.1 %d %s" % (status, http.HTTPStatus(status).phrase),
+        "Content-Type: application/json",
+        "Content-Length: " + str(len(body)),
+        "Connection: " + ("keep-alive" if keep_alive else "close")]
+    return ("\r\n".join(lines + headers) + "\r\n\r\n").encode(
+        "latin-1") + body
+# end function
+
+
+def _run_cipher(action, cipher_name, text, options):
+    """Internal function that runs a cipher in the pool.
+
+    Arguments:
+    - action -- "Encrypt" or "Decrypt".
+    - cipher_name -- the name of the cipher (a key of
+        coder.CIPHER_CLASS).
+    - text -- the text to encrypt or decrypt.
+    - options -- the cipher's keys and options.
+
+    Returns:  the ciphertext or plaintext.  Raises ValueError if a key
+     or the text is invalid.
+    """
+    cipher = coder._run(action, cipher_name, text, options)
+    if action == "Encrypt":
+        return cipher.ciphertext
+    # end if (function exits)
+    return cipher.plaintext
+# end function
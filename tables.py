@@ -0,0 +1,74 @@
+"""This module builds and applies translation tables for the
+substitution ciphers.
+
+A translation table maps every character of one alphabet onto the
+character in the same position of another, and is applied to a whole
+string in a single call, instead of looking up one character at a time.
+
+    Constants:
+    - SHIFT_TABLES:  One table for each shift of ALPHANUM, so that
+       SHIFT_TABLES[n] moves every character n places forward.
+    - TO_NUMBERS, TO_CHARS:  Tables that turn each character of
+       ALPHANUM into its position (0-35) and back again.  TO_CHARS
+       takes any byte, reducing it mod 36 first, so sums of two
+       positions can be turned straight back into characters.
+
+    External functions:
+    - shift_table:  Returns the table for a shift of any size.
+    - substitution_table:  Builds a table from two alphabets.
+    - translate:  Applies a table to a string.
+"""
+
+ALPHANUM = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+
+
+def substitution_table(source, target):
+    """Builds a translation table mapping one alphabet onto another.
+
+    Arguments:
+    - source -- the alphabet of the text to be translated.
+    - target -- the alphabet to translate it into (the same length).
+
+    Returns:  the table, for use with translate.
+    """
+    return bytes.maketrans(source.encode("ascii"), target.encode("ascii"))
+# end function
+
+
+def shift_table(shift):
+    """Returns the translation table for a shift of ALPHANUM.
+
+    Arguments:
+    - shift -- the number of places to shift each character forward
+        (may be negative, or larger than the alphabet).
+
+    Returns:  the table, for use with translate.
+    """
+    return SHIFT_TABLES[shift % len(ALPHANUM)]
+# end function
+
+
+def translate(text, table):
+    """Applies a translation table to a string.  Characters not in the
+    table's source alphabet pass through unchanged.
+
+    Arguments:
+    - text -- the string to translate (ASCII only, as all formatted
+        plaintext and ciphertext is).
+    - table -- a table built by substitution_table.
+
+    Returns:  the translated string.
+    """
+    return text.encode("ascii").translate(table).decode("ascii")
+# end function
+
+
+# Every shift is used by the Caesar Cipher and the one-time pad, so all
+#  of them are built once, here.
+SHIFT_TABLES = [
+    substitution_table(ALPHANUM, ALPHANUM[shift:] + ALPHANUM[:shift])
+    for shift in range(len(ALPHANUM))]
+TO_NUMBERS = bytes.maketrans(
+    ALPHANUM.encode("ascii"), bytes(range(len(ALPHANUM))))
+TO_CHARS = bytes(
+    ord(ALPHANUM[num % len(ALPHANUM)]) for num in range(256))
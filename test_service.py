@@ -0,0 +1,219 @@
+"""These are the tests of the network service (service.py).
+-----------------------------------------------------------------------
+Each test starts the service on a free port of localhost, with a pool
+of one thread (or process), and sends it requests over a real
+connection:
+
+    python -m unittest test_service
+"""
+
+import asyncio
+import concurrent.futures
+import json
+import os
+import time
+import unittest
+from unittest import mock
+
+import service
+
+# The number of seconds the slow cipher of the busy and timeout tests
+#  takes.
+SLOW_SECONDS = 0.5
+# The number of seconds a client waits for the whole response (to the
+#  end of the connection).
+RESPONSE_TIMEOUT = 5
+
+
+def _slow_cipher(action, cipher_name, text, options):
+    """Stands in for service._run_cipher, taking SLOW_SECONDS.
+
+    Arguments:
+    - action -- "Encrypt" or "Decrypt".
+    - cipher_name -- the name of the cipher.
+    - text -- the text.
+    - options -- the cipher's keys and options.
+
+    Returns:  the text.
+    """
+    time.sleep(SLOW_SECONDS)
+    return text
+# end function
+
+
+class ServiceTest(unittest.IsolatedAsyncioTestCase):
+
+    """This class tests the responses of the service."""
+
+    async def asyncTearDown(self):
+        """Stops the service started by the test.
+
+        Arguments:  none.
+
+        Returns:  nothing.
+        """
+        self.server.close()
+        await self.server.wait_closed()
+        self.service.close()
+        return
+    # end method
+
+    async def _start(self, threads=True, **kwargs):
+        """Starts the service on a free port.
+
+        Arguments:  none.
+
+        Named arguments:
+        - threads -- whether the pool is of threads rather than
+            processes (default True).
+        - kwargs -- the other keyword arguments of service.Service
+            (other than workers).
+
+        Returns:  nothing.
+        """
+        self.service = service.Service(
+            workers=1, threads=threads, **kwargs)
+        self.server = await self.service.start("127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return
+    # end method
+
+    async def _post(self, body, path="/encrypt"):
+        """Sends one request, on its own connection, and reads the
+        response.
+
+        Arguments:
+        - body -- the body of the request (bytes, or an object to send
+            as JSON).
+
+        Named arguments:
+        - path -- the path of the request (default "/encrypt").
+
+        Returns:  the status and the JSON payload of the response.
+        """
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        # end if
+        reader, writer = await asyncio.open_connection(
+            "127.0.0.1", self.port)
+        try:
+            writer.write((
+                "POST " + path + " HTTP/1.1\r\nHost: localhost\r\n" +
+                "Connection: close\r\nContent-Length: " + str(len(body)) +
+                "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+            response = await asyncio.wait_for(
+                reader.read(), RESPONSE_TIMEOUT)
+        finally:
+            writer.close()
+            await writer.wait_closed()
+        # end try
+        head, _, payload = response.partition(b"\r\n\r\n")
+        return int(head.split(b" ")[1]), json.loads(payload)
+    # end method
+
+    async def test_ok(self):
+        """Encrypts a message."""
+        await self._start()
+        status, payload = await self._post({
+            "cipher": "caesar", "text": "Attack at dawn."})
+        self.assertEqual(status, 200)
+        self.assertEqual(payload["cipher"], "Caesar")
+        self.assertTrue(payload["result"])
+        return
+    # end method
+
+    async def test_bad_request(self):
+        """Refuses a body that is not JSON, and an invalid key."""
+        await self._start()
+        status, payload = await self._post(b"not json")
+        self.assertEqual(status, 400)
+        self.assertIn("error", payload)
+        status, payload = await self._post({
+            "cipher": "affine", "text": "Attack at dawn.",
+            "options": {"key1": 2, "key2": 8}})
+        self.assertEqual(status, 400)
+        return
+    # end method
+
+    async def test_too_large(self):
+        """Refuses a large body, which the client sends in full before
+        reading the response."""
+        await self._start(max_body_size=1000)
+        status, payload = await self._post(b"x" * (1 << 20))
+        self.assertEqual(status, 413)
+        self.assertIn("error", payload)
+        return
+    # end method
+
+    async def test_busy(self):
+        """Turns a request away while the pool is full."""
+        await self._start(max_pending=1)
+        message = {"cipher": "caesar", "text": "Attack at dawn."}
+        with mock.patch("service._run_cipher", _slow_cipher):
+            results = await asyncio.gather(
+                self._post(message),
+                self._delayed(SLOW_SECONDS / 5, self._post(message)))
+        # end with
+        self.assertEqual(results[0][0], 200)
+        self.assertEqual(results[1][0], 503)
+        return
+    # end method
+
+    async def test_timeout(self):
+        """Gives up on a cipher that takes too long."""
+        await self._start(request_timeout=SLOW_SECONDS / 5)
+        with mock.patch("service._run_cipher", _slow_cipher):
+            status, payload = await self._post({
+                "cipher": "caesar", "text": "Attack at dawn."})
+        # end with
+        self.assertEqual(status, 504)
+        self.assertIn("error", payload)
+        return
+    # end method
+
+    async def test_process_pool(self):
+        """Closes the connection of a request that started the pool's
+        worker process (which must not keep it open)."""
+        await self._start(threads=False)
+        status, payload = await self._post({
+            "cipher": "caesar", "text": "Attack at dawn."})
+        self.assertEqual(status, 200)
+        self.assertTrue(payload["result"])
+        return
+    # end method
+
+    async def test_pool_failure(self):
+        """Starts a new pool when a worker process dies."""
+        await self._start(threads=False)
+        message = {"cipher": "caesar", "text": "Attack at dawn."}
+        self.assertEqual((await self._post(message))[0], 200)
+        # Kill the worker, as running out of memory would.
+        with self.assertRaises(concurrent.futures.BrokenExecutor):
+            await asyncio.wrap_future(
+                self.service.executor.submit(os._exit, 1))
+        # end with
+        status, payload = await self._post(message)
+        self.assertEqual(status, 503)
+        self.assertIn("error", payload)
+        self.assertEqual((await self._post(message))[0], 200)
+        return
+    # end method
+
+    async def _delayed(self, delay, awaitable):
+        """Waits, then awaits something.
+
+        Arguments:
+        - delay -- the number of seconds to wait.
+        - awaitable -- what to await.
+
+        Returns:  its result.
+        """
+        await asyncio.sleep(delay)
+        return await awaitable
+    # end method
+
+
+if __name__ == "__main__":
+    unittest.main()
+# end if
@@ -1,20 +1,28 @@
+import permutation
+
 from ciphers import Cipher
 
 ALPHANUM = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789"
+# The number of columns in the grid, unless the width option gives
+#  another.
 GRID_WIDTH = 7
+MIN_WIDTH = 2
 
 
 class Transposition(Cipher):
     
     """This class implements a Transposition Cipher."""
     
-    def __init__(self, mode, text):
+    def __init__(self, mode, text, options=None):
         """At initialization, the mode of the object is set and the
-        appropriate attribute is set to the original text.
+        appropriate attribute is set to the original text.  If options
+        are given, the cipher runs headless (see Cipher).
         """
         self.mode = mode
+        self.options = options
         self.name = "Transposition"
         self.keyword = ""
+        self.width = GRID_WIDTH
         if mode == "Encrypt":
             self.plaintext = text
             self.ciphertext = ""
@@ -34,49 +42,15 @@ class Transposition(Cipher):
         
         Returns:  nothing.
         """
+        # Get the width of the grid.
+        self._get_keys()
+        if self.width is None:
+            return
+        # end if (method exits)
         # Format the ciphertext for decryption.
         self._block_input()
-        # Calculate the number of rows needed.
-        grid_height = (len(self.ciphertext) // GRID_WIDTH)
-        xtra = len(self.ciphertext) % GRID_WIDTH
-        if xtra:
-            grid_height += 1
-        working_list = []
-        xtra = len(self.ciphertext) - ((GRID_WIDTH - 1) * grid_height)
-        # Slice the ciphertext into rows (lists).
-        # If the length of the message divides evenly into the number of
-        #  columns, all segments will be equal length.  Otherwise, the
-        #  bottom row(s) will be one character shorter.
-        while GRID_WIDTH < len(self.ciphertext):
-            if xtra:
-                working_list.append(self.ciphertext[:GRID_WIDTH])
-                self.ciphertext = self.ciphertext[GRID_WIDTH:]
-                xtra -= 1
-            else:
-                working_list.append(self.ciphertext[:GRID_WIDTH-1])
-                self.ciphertext = self.ciphertext[GRID_WIDTH-1:]
-            # end if
-        # end while
-        # Add the last partial line to the list.
-        working_list.append(self.ciphertext)
-        # Reverse every odd-indexed list.
-        for row in range(len(working_list)):
-            if row % 2:
-                working_list[row] = working_list[row][::-1]
-            # end if
-        # end for
-        # Now add the characters into plaintext going down successive
-        #  columns.
-        for row in range(GRID_WIDTH):
-            for col in range(grid_height):
-                try:
-                    self.plaintext += working_list[col][row]
-                except IndexError:
-                    # ignore errors of not enough characters in column.
-                    pass
-                # end try
-            # end for
-        # end for
+        # Put each character back where encryption took it from.
+        self.plaintext = self._decrypt_text(self.ciphertext)
         # Finally, allow for a one-time pad.
         self._one_time_pad()
         self._intelligent_decrypt()
@@ -90,35 +64,85 @@ class Transposition(Cipher):
         
         Returns:  nothing.
         """
+        # Get the width of the grid.
+        self._get_keys()
+        if self.width is None:
+            return
+        # end if (method exits)
         # Present the option to perform intelligent encryption.
         self._intelligent_encrypt()
         # Format the plaintext for processing.
         self._format_plaintext()
         # Present the option to use a one-time pad.
         self._one_time_pad()
-        # Determine the size of the grid to use.
-        grid_height = (len(self.plaintext) // GRID_WIDTH)
-        if len(self.plaintext) % GRID_WIDTH > 0:
-            grid_height += 1
-        working_list = ["" for _ in range(grid_height)]
-        # Write the plaintext down (into successive rows).
-        row = 0
-        for char in self.plaintext:
-            working_list[row] += char
-            row = (row + 1) % grid_height
-            # end if
-        # end for
-        # Combine lists into string boustrophedonically, starting with
-        #  left to right (i.e., reverse every other row).
-        for row, string in enumerate(working_list):
-            if row % 2 == 0:
-                self.ciphertext += string
-            else:
-                self.ciphertext += string[::-1]
-            # end if
-        # end for
+        # Transpose the plaintext.
+        self.ciphertext = self._encrypt_text(self.plaintext)
         # Finally, separate into five-character blocks if the user
         #  chooses.
         self._block_output()
         return
     # end method
+    
+    def _decrypt_text(self, text):
+        """Puts each character of a string back where encryption took
+        it from.
+        
+        Arguments:
+        - text -- the string to decrypt.
+        
+        Returns:  the decrypted string.
+        """
+        length = len(text)
+        return permutation.apply(text, permutation.columnar(
+            length, self._grid_height(length), alternate=True,
+            inverse=True))
+    # end method
+    
+    def _encrypt_text(self, text):
+        """Writes a string down successive columns of the grid, then
+        reads the rows off boustrophedonically, starting with left to
+        right (i.e., reverse every other row).  Each row of the grid is
+        a column of the permutation, so the permutation is built in one
+        pass for any width.
+        
+        Arguments:
+        - text -- the string to encrypt.
+        
+        Returns:  the encrypted string.
+        """
+        length = len(text)
+        return permutation.apply(text, permutation.columnar(
+            length, self._grid_height(length), alternate=True))
+    # end method
+    
+    def _get_keys(self):
+        """Gets the width of the grid from the user (or from the width
+        option, in headless mode, where GRID_WIDTH is used if it is not
+        given).  If the user aborts, the width is set to None.
+        
+        Arguments:  none.
+        
+        Returns:  nothing.
+        """
+        if self.options is None:
+            self.width = self._get_keynumber(
+                "Please enter the width of the grid (" + str(MIN_WIDTH) +
+                " or more; the usual\n width is " + str(GRID_WIDTH) +
+                "):  ", lbound=MIN_WIDTH, option="width")
+        elif self.options.get("width") is not None:
+            self.width = self._get_keynumber(
+                "", lbound=MIN_WIDTH, option="width")
+        # end if
+        return
+    # end method
+    
+    def _grid_height(self, length):
+        """Works out the number of rows in the grid.
+        
+        Arguments:
+        - length -- the length of the text.
+        
+        Returns:  the number of rows (at least 1).
+        """
+        return max(-(-length // self.width), 1)
+    # end method